@@ -0,0 +1,234 @@
+import functools
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from decoupage import decouper_en_positions
+from budget_tokens import compter_tokens, budget_sortie, caracteres_par_token, estimer_cout, estimer_latence
+from routage import choisir_route
+from segments import formater_temps
+
+MODELE_ANALYSE = "gpt-4o-mini"
+
+# Taille des morceaux envoyés en parallèle (phase map)
+TAILLE_CHUNK_TOKENS = 3000
+CHEVAUCHEMENT_TOKENS = 200
+MAX_TOKENS_RESUME_CHUNK = 600
+MAX_WORKERS_MAP = 4
+
+# Au-delà de ce nombre de tokens, l'analyse passe en mode extractif ou map-reduce
+BUDGET_ANALYSE_DIRECTE = 12000
+
+# Modes d'analyse des transcriptions longues
+MODE_EXTRACTIF = "extractif"
+MODE_MAP_REDUCE = "map_reduce"
+
+# Part du budget laissée aux horodatages ajoutés devant les extraits
+MARGE_EXTRAITS = 0.05
+
+SYSTEME_ANALYSE = "Tu es un assistant expert en analyse de contenu qui extrait les idées essentielles de manière claire et structurée."
+
+FORMAT_ANALYSE = """Organise ta réponse de la manière suivante :
+1. Résumé principal (2-3 phrases)
+2. Idées clés (liste à puces des points importants)
+3. Concepts principaux abordés
+4. Conclusions ou points à retenir"""
+
+
+@functools.lru_cache(maxsize=None)
+def tokens_consigne():
+    """Tokens de la consigne autour de la transcription (système + format + marge)
+
+    Compté au premier appel et non à l'import : tiktoken n'est chargé que si une
+    analyse est demandée.
+    """
+    return compter_tokens(SYSTEME_ANALYSE + FORMAT_ANALYSE, MODELE_ANALYSE) + 50
+
+
+def prompt_analyse(texte, extraits=False):
+    """Construit la consigne d'analyse directe d'une transcription (ou de ses extraits)"""
+    if extraits:
+        return f"""Voici les phrases les plus représentatives d'une longue transcription YouTube,
+choisies sur toute la durée de la vidéo et données dans l'ordre. Chaque passage commence
+par son horodatage [mm:ss] quand il est connu, sinon par « … ». Analyse l'ensemble et extrais les idées essentielles de toute la vidéo.
+Quand c'est utile, indique entre crochets le moment de la vidéo concerné (ex. [12:34]).
+
+{FORMAT_ANALYSE}
+
+Extraits de la transcription :
+{texte}"""
+
+    return f"""Analyse la transcription suivante et extrais les idées essentielles.
+
+{FORMAT_ANALYSE}
+
+Transcription :
+{texte}"""
+
+
+def requete_analyse_directe(texte, max_tokens, nb_tokens=None):
+    """Paramètres de l'appel d'analyse directe d'une transcription (sans stream)"""
+    if nb_tokens is None:
+        nb_tokens = compter_tokens(texte, MODELE_ANALYSE)
+
+    return dict(
+        model=MODELE_ANALYSE,
+        messages=[
+            {"role": "system", "content": SYSTEME_ANALYSE},
+            {"role": "user", "content": prompt_analyse(texte)}
+        ],
+        temperature=0.7,
+        max_tokens=budget_sortie(MODELE_ANALYSE, nb_tokens + tokens_consigne(), max_tokens)
+    )
+
+
+def requete_analyse_extractive(texte, max_tokens, transcription=None):
+    """Paramètres de l'appel d'analyse d'une longue transcription, sur ses phrases les plus informatives"""
+    # numpy n'est importé que pour les transcriptions longues
+    from extraction import resume_extractif
+
+    extraits = resume_extractif(texte, int(BUDGET_ANALYSE_DIRECTE * (1 - MARGE_EXTRAITS)), transcription)
+    tokens_entree = compter_tokens(extraits, MODELE_ANALYSE) + tokens_consigne()
+    return dict(
+        model=MODELE_ANALYSE,
+        messages=[
+            {"role": "system", "content": SYSTEME_ANALYSE},
+            {"role": "user", "content": prompt_analyse(extraits, extraits=True)}
+        ],
+        temperature=0.7,
+        max_tokens=budget_sortie(MODELE_ANALYSE, tokens_entree, max_tokens)
+    )
+
+
+def analyser_directement(client, texte, max_tokens, nb_tokens=None):
+    """Analyse une transcription en un seul appel streamé"""
+    return client.chat.completions.create(**requete_analyse_directe(texte, max_tokens, nb_tokens), stream=True)
+
+
+def analyser_extractif(client, texte, max_tokens, transcription=None):
+    """Analyse une longue transcription en un seul appel, sur ses phrases les plus informatives"""
+    return client.chat.completions.create(
+        **requete_analyse_extractive(texte, max_tokens, transcription), stream=True
+    )
+
+
+def modele_route_analyse(tokens_entree, tokens_sortie, latence_cible=None):
+    """Modèle que la table de routage retiendra pour un appel d'analyse de cette taille"""
+    route = choisir_route("analyse", tokens_entree, tokens_sortie, latence_cible)
+    return route["modele"] if route is not None else MODELE_ANALYSE
+
+
+def estimer_analyse(nb_tokens, max_tokens, max_workers=MAX_WORKERS_MAP, mode_longue=MODE_EXTRACTIF,
+                    latence_cible=None):
+    """Estime le coût (dollars) et la durée (secondes) de l'analyse d'une transcription"""
+    if nb_tokens <= BUDGET_ANALYSE_DIRECTE or mode_longue == MODE_EXTRACTIF:
+        tokens_entree = min(nb_tokens, BUDGET_ANALYSE_DIRECTE) + tokens_consigne()
+        modele = modele_route_analyse(tokens_entree, max_tokens, latence_cible)
+        return (
+            estimer_cout(modele, tokens_entree, max_tokens),
+            estimer_latence(modele, tokens_entree, max_tokens)
+        )
+
+    # Map : morceaux résumés par vagues de max_workers ; reduce : une synthèse
+    nb_chunks = math.ceil(nb_tokens / (TAILLE_CHUNK_TOKENS - CHEVAUCHEMENT_TOKENS))
+    entree_chunk = TAILLE_CHUNK_TOKENS + tokens_consigne()
+    entree_reduce = nb_chunks * MAX_TOKENS_RESUME_CHUNK + tokens_consigne()
+    modele_chunk = modele_route_analyse(entree_chunk, MAX_TOKENS_RESUME_CHUNK, latence_cible)
+    modele_reduce = modele_route_analyse(entree_reduce, max_tokens, latence_cible)
+
+    cout = (
+        nb_chunks * estimer_cout(modele_chunk, entree_chunk, MAX_TOKENS_RESUME_CHUNK)
+        + estimer_cout(modele_reduce, entree_reduce, max_tokens)
+    )
+    duree = (
+        math.ceil(nb_chunks / max_workers) * estimer_latence(modele_chunk, entree_chunk, MAX_TOKENS_RESUME_CHUNK)
+        + estimer_latence(modele_reduce, entree_reduce, max_tokens)
+    )
+    return cout, duree
+
+
+def resumer_chunk(client, chunk, titre):
+    """Résume un morceau de transcription (appel non streamé)"""
+    prompt = f"""Voici la {titre} d'une transcription YouTube.
+Résume-la fidèlement en conservant les idées, arguments, exemples et conclusions importants.
+Réponds uniquement avec le résumé, sous forme de points concis.
+
+{titre} :
+{chunk}"""
+
+    response = client.chat.completions.create(
+        model=MODELE_ANALYSE,
+        messages=[
+            {"role": "system", "content": SYSTEME_ANALYSE},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=budget_sortie(
+            MODELE_ANALYSE,
+            compter_tokens(prompt, MODELE_ANALYSE) + tokens_consigne(),
+            MAX_TOKENS_RESUME_CHUNK
+        )
+    )
+    return response.choices[0].message.content or ""
+
+
+def resumer_chunks(client, chunks, titres, max_workers=MAX_WORKERS_MAP):
+    """Phase map : résume tous les morceaux en parallèle, dans l'ordre d'origine"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(resumer_chunk, client, chunk, titre)
+            for chunk, titre in zip(chunks, titres)
+        ]
+        return [future.result() for future in futures]
+
+
+def analyser_map_reduce(client, texte, max_tokens, max_workers=MAX_WORKERS_MAP, transcription=None):
+    """Analyse une longue transcription : résumés parallèles puis synthèse streamée
+
+    Si la transcription indexée est fournie, chaque partie est située dans la vidéo
+    et la synthèse peut renvoyer aux horodatages.
+    """
+    positions = decouper_en_positions(
+        texte, TAILLE_CHUNK_TOKENS, CHEVAUCHEMENT_TOKENS, caracteres_par_token(texte, MODELE_ANALYSE)
+    )
+    chunks = [texte[debut:fin].strip() for debut, fin in positions]
+
+    titres = []
+    for i, (debut, fin) in enumerate(positions):
+        titre = f"Partie {i + 1}/{len(positions)}"
+        if transcription is not None:
+            titre += (
+                f" [{formater_temps(transcription.temps_a_la_position(debut))}"
+                f" - {formater_temps(transcription.temps_a_la_position(fin))}]"
+            )
+        titres.append(titre)
+
+    resumes = resumer_chunks(client, chunks, titres, max_workers)
+
+    parties = "\n\n".join(
+        f"--- {titre} ---\n{resume}"
+        for titre, resume in zip(titres, resumes)
+    )
+    consigne_temps = ""
+    if transcription is not None:
+        consigne_temps = "\nQuand c'est utile, indique entre crochets le moment de la vidéo concerné (ex. [12:34]).\n"
+
+    prompt = f"""Voici les résumés successifs des parties d'une longue transcription YouTube.
+Analyse l'ensemble et extrais les idées essentielles de toute la vidéo.
+{consigne_temps}
+{FORMAT_ANALYSE}
+
+Résumés des parties :
+{parties}"""
+
+    # Phase reduce : une seule réponse streamée au format habituel
+    tokens_entree = compter_tokens(prompt, MODELE_ANALYSE) + tokens_consigne()
+    return client.chat.completions.create(
+        model=MODELE_ANALYSE,
+        messages=[
+            {"role": "system", "content": SYSTEME_ANALYSE},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=budget_sortie(MODELE_ANALYSE, tokens_entree, max_tokens),
+        stream=True
+    )
@@ -0,0 +1,211 @@
+"""Analyse de vidéos YouTube en ligne de commande, sans Streamlit
+
+    python -m analyser_videos https://youtu.be/... https://www.youtube.com/watch?v=...
+    cat urls.txt | python -m analyser_videos --sortie resultats.jsonl
+    python -m analyser_videos --differe --nettoyage --playlist PLAYLIST_ID
+
+Une ligne JSON par vidéo, écrite dès qu'elle est terminée (avec --differe : dès que
+sa transcription échoue, puis toutes ensemble à la fin du lot). La clé OpenAI est lue
+dans OPENAI_API_KEY (inutile avec --transcription-seule).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyse_longue import MODE_EXTRACTIF, MODE_MAP_REDUCE
+from nettoyage_parallele import MODE_EDITIONS, MODE_REECRITURE
+from pipeline_youtube import (
+    extraire_video_id, obtenir_transcription, analyser_transcription, analyser_en_differe, lire_stream
+)
+from pre_nettoyage import pre_nettoyer_segments
+from selection_langue import lire_langues, LANGUES_PRIORITAIRES
+from traitement_differe import INTERVALLE_SONDAGE
+from traitement_lot import (
+    extraire_playlist_id, lister_videos_playlist, lire_liste_urls, traiter_lot,
+    MAX_WORKERS_TRANSCRIPTIONS, MAX_WORKERS_ANALYSES
+)
+
+
+def lire_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m analyser_videos",
+        description="Récupère et analyse des transcriptions YouTube (sortie JSON lines)"
+    )
+    parser.add_argument("urls", nargs="*", help="URLs ou IDs de vidéos (lues sur l'entrée standard si absentes)")
+    parser.add_argument("--playlist", action="append", default=[], help="URL ou ID de playlist (répétable)")
+    parser.add_argument("--langues", default=",".join(LANGUES_PRIORITAIRES),
+                        help="Langues de transcription par ordre de préférence")
+    parser.add_argument("--transcription-seule", action="store_true", help="Ne pas appeler OpenAI")
+    parser.add_argument("--sans-pre-nettoyage", action="store_true",
+                        help="Garder les annotations et répétitions des sous-titres")
+    parser.add_argument("--max-tokens", type=int, default=1500, help="Longueur maximale de l'analyse")
+    parser.add_argument("--map-reduce", action="store_true",
+                        help="Transcriptions longues : résumé par partie puis synthèse (au lieu des extraits)")
+    parser.add_argument("--differe", action="store_true",
+                        help="API Batch d'OpenAI : moitié prix, résultats sous 24 h "
+                             "(incompatible avec --map-reduce et --latence-cible)")
+    parser.add_argument("--nettoyage", action="store_true",
+                        help="Avec --differe : ajouter la transcription nettoyée par l'IA")
+    parser.add_argument("--reecriture", action="store_true",
+                        help="Avec --nettoyage : faire réécrire tout le texte au lieu de demander les corrections")
+    parser.add_argument("--intervalle-sondage", type=float, default=INTERVALLE_SONDAGE,
+                        help="Avec --differe : secondes entre deux lectures de l'état du lot")
+    parser.add_argument("--ignorer-cache", action="store_true",
+                        help="Ne pas réutiliser les réponses en cache (--differe ne lit jamais le cache)")
+    parser.add_argument("--latence-cible", type=float,
+                        help="Latence visée par appel (secondes) : choisit un modèle plus rapide si besoin")
+    parser.add_argument("--transcriptions-paralleles", type=int, default=MAX_WORKERS_TRANSCRIPTIONS)
+    parser.add_argument("--analyses-paralleles", type=int, default=MAX_WORKERS_ANALYSES)
+    parser.add_argument("--sortie", help="Fichier JSON lines (par défaut : sortie standard)")
+    args = parser.parse_args(argv)
+    # Le lot ne contient qu'un appel d'analyse par vidéo, sans contrainte de latence
+    if args.differe and args.map_reduce:
+        parser.error("--map-reduce n'est pas disponible avec --differe")
+    if args.differe and args.latence_cible is not None:
+        parser.error("--latence-cible n'a pas de sens avec --differe (résultats sous 24 h)")
+    return args
+
+
+def lister_video_ids(args):
+    """IDs des vidéos à traiter (arguments, entrée standard, playlists), sans doublons"""
+    entrees = args.urls
+    if not entrees and not args.playlist:
+        entrees = lire_liste_urls(sys.stdin.read())
+
+    video_ids = []
+    for entree in entrees:
+        video_id = extraire_video_id(entree)
+        if video_id:
+            video_ids.append(video_id)
+        else:
+            print(f"Entrée ignorée (URL invalide) : {entree}", file=sys.stderr)
+
+    for playlist in args.playlist:
+        playlist_id = extraire_playlist_id(playlist)
+        if not playlist_id:
+            print(f"Identifiant de playlist invalide : {playlist}", file=sys.stderr)
+            continue
+        try:
+            video_ids += lister_videos_playlist(playlist_id)
+        except Exception as e:
+            print(f"Erreur lors de la lecture de la playlist {playlist_id} : {e}", file=sys.stderr)
+
+    return list(dict.fromkeys(video_ids))
+
+
+def traiter_en_differe(args, video_ids, recuperer_transcription, api_key):
+    """Récupère les transcriptions, puis les analyse en un lot différé (même format que traiter_lot)
+
+    Avec --nettoyage, un échec du nettoyage est indiqué dans erreur_nettoyage :
+    l'analyse obtenue reste valable (statut "ok").
+    """
+    transcriptions = {}
+    with ThreadPoolExecutor(max_workers=args.transcriptions_paralleles) as executor:
+        for video_id, (transcription, erreur) in zip(video_ids, executor.map(recuperer_transcription, video_ids)):
+            if erreur:
+                yield {"video_id": video_id, "statut": "erreur", "etape": "transcription",
+                       "erreur": erreur, "transcription": None, "analyse": None}
+            else:
+                transcriptions[video_id] = transcription
+    if not transcriptions:
+        return
+
+    def suivre(lot):
+        comptes = lot.request_counts
+        print(
+            f"Lot {lot.id} : {lot.status}"
+            + (f" ({comptes.completed + comptes.failed}/{comptes.total})" if comptes else ""),
+            file=sys.stderr
+        )
+
+    videos, erreur = analyser_en_differe(
+        transcriptions, api_key, args.max_tokens, args.nettoyage,
+        intervalle=args.intervalle_sondage, suivi=suivre,
+        mode_nettoyage=MODE_REECRITURE if args.reecriture else MODE_EDITIONS
+    )
+    for video_id, transcription in transcriptions.items():
+        video = videos[video_id] if videos else {"erreur": erreur}
+        resultat = {
+            "video_id": video_id,
+            "statut": "erreur" if video["erreur"] else "ok",
+            "etape": "analyse",
+            "erreur": video["erreur"],
+            "transcription": transcription.texte,
+            "analyse": video.get("analyse"),
+        }
+        if args.nettoyage:
+            resultat["transcription_nettoyee"] = video.get("transcription_nettoyee")
+            resultat["erreur_nettoyage"] = video.get("erreur_nettoyage", erreur)
+        yield resultat
+
+
+def main(argv=None):
+    debut = time.perf_counter()
+    args = lire_arguments(argv)
+    langues = lire_langues(args.langues)
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not args.transcription_seule and not api_key:
+        print("OPENAI_API_KEY n'est pas défini (ou utilisez --transcription-seule).", file=sys.stderr)
+        return 2
+
+    video_ids = lister_video_ids(args)
+    if not video_ids:
+        print("Aucune vidéo à traiter.", file=sys.stderr)
+        return 2
+
+    def recuperer_transcription(video_id):
+        transcription, erreur = obtenir_transcription(video_id, langues)
+        if erreur:
+            return None, erreur
+        if not args.sans_pre_nettoyage:
+            transcription, _ = pre_nettoyer_segments(transcription)
+        return transcription, None
+
+    def recuperer(video_id):
+        transcription, erreur = recuperer_transcription(video_id)
+        return (transcription.texte if transcription is not None else None), erreur
+
+    def analyser(texte):
+        if args.transcription_seule:
+            return None, None
+        response_stream, erreur = analyser_transcription(
+            texte, api_key, args.max_tokens, args.ignorer_cache,
+            mode_longue=MODE_MAP_REDUCE if args.map_reduce else MODE_EXTRACTIF,
+            latence_cible=args.latence_cible
+        )
+        if erreur:
+            return None, erreur
+        return lire_stream(response_stream), None
+
+    if args.differe and not args.transcription_seule:
+        resultats = traiter_en_differe(args, video_ids, recuperer_transcription, api_key)
+    else:
+        resultats = traiter_lot(
+            video_ids, recuperer, analyser, args.transcriptions_paralleles, args.analyses_paralleles
+        )
+
+    sortie = open(args.sortie, "w", encoding="utf-8") if args.sortie else sys.stdout
+    nb_erreurs = 0
+    try:
+        for resultat in resultats:
+            nb_erreurs += resultat["statut"] != "ok" or bool(resultat.get("erreur_nettoyage"))
+            sortie.write(json.dumps(resultat, ensure_ascii=False) + "\n")
+            sortie.flush()
+    finally:
+        if sortie is not sys.stdout:
+            sortie.close()
+
+    print(
+        f"{len(video_ids) - nb_erreurs} vidéo(s) traitée(s), {nb_erreurs} en échec "
+        f"en {time.perf_counter() - debut:.1f}s",
+        file=sys.stderr
+    )
+    return 1 if nb_erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Benchmark hors ligne du pipeline : transcription → pré-nettoyage → analyse (→ nettoyage)
+
+YouTube et OpenAI sont remplacés par des services locaux (voir faux_services.py) :
+aucune clé ni accès réseau n'est nécessaire.
+
+    python -m benchmark.bench_pipeline --durees 1 10 60 300 --concurrence 1 4 16
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches disque du benchmark dans un dossier temporaire (jamais ceux de l'application)
+os.environ.setdefault("YOUTUBE_ANALYZER_CACHE", tempfile.mkdtemp(prefix="benchmark-cache-"))
+
+from analyse_longue import BUDGET_ANALYSE_DIRECTE, MODELE_ANALYSE, MODE_EXTRACTIF, MODE_MAP_REDUCE
+from budget_tokens import compter_tokens
+from pipeline_youtube import obtenir_transcription, analyser_transcription, nettoyer_transcription
+from nettoyage_parallele import MODE_EDITIONS, MODE_REECRITURE
+from pre_nettoyage import pre_nettoyer_segments
+
+from benchmark.faux_services import FauxYouTubeTranscriptApi, FauxServeurOpenAI
+
+# Le faux serveur accepte n'importe quelle clé
+CLE_BENCHMARK = "cle-benchmark"
+
+
+def percentile(valeurs, q):
+    """Percentile par interpolation linéaire (None si aucune valeur)"""
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    rang = (len(valeurs) - 1) * q
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas)
+
+
+def executer_session(api, base_url, max_tokens, avec_nettoyage, mode_longue=MODE_EXTRACTIF,
+                     mode_nettoyage=MODE_EDITIONS):
+    """Une session utilisateur complète ; retourne ses mesures"""
+    video_id = uuid.uuid4().hex[:11]
+    session = uuid.uuid4().hex
+    mesures = {"video_id": video_id, "erreur": None}
+    debut = time.perf_counter()
+
+    try:
+        transcription, erreur = obtenir_transcription(video_id, api=api)
+        if erreur:
+            raise RuntimeError(erreur)
+        mesures["fetch"] = time.perf_counter() - debut
+
+        transcription, _ = pre_nettoyer_segments(transcription, MODELE_ANALYSE)
+        texte = transcription.texte
+        nb_tokens = compter_tokens(texte, MODELE_ANALYSE)
+        mesures["tokens_transcription"] = nb_tokens
+
+        # Sans cache des réponses : chaque session paie les appels OpenAI
+        debut_analyse = time.perf_counter()
+        stream, erreur = analyser_transcription(
+            texte, CLE_BENCHMARK, max_tokens, ignorer_cache=True, nb_tokens=nb_tokens,
+            transcription=transcription, session=session, base_url=base_url, mode_longue=mode_longue
+        )
+        if erreur:
+            raise RuntimeError(erreur)
+        mesures["mode"] = mode_longue if nb_tokens > BUDGET_ANALYSE_DIRECTE else "direct"
+
+        caracteres = 0
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if "premier_token" not in mesures:
+                    mesures["premier_token"] = time.perf_counter() - debut_analyse
+                caracteres += len(chunk.choices[0].delta.content)
+        mesures["analyse"] = time.perf_counter() - debut_analyse
+        mesures["caracteres_analyse"] = caracteres
+
+        if avec_nettoyage:
+            debut_nettoyage = time.perf_counter()
+            morceaux, erreur = nettoyer_transcription(
+                texte, CLE_BENCHMARK, ignorer_cache=True, session=session, base_url=base_url,
+                mode_nettoyage=mode_nettoyage
+            )
+            if erreur:
+                raise RuntimeError(erreur)
+            for _ in morceaux:
+                pass
+            mesures["nettoyage"] = time.perf_counter() - debut_nettoyage
+
+    except Exception as e:
+        mesures["erreur"] = f"{type(e).__name__}: {e}"
+
+    mesures["total"] = time.perf_counter() - debut
+    return mesures
+
+
+def executer_scenario(duree_minutes, concurrence, sessions, serveur, args):
+    """Lance `sessions` sessions, `concurrence` à la fois, sur des vidéos de duree_minutes"""
+    api = FauxYouTubeTranscriptApi(
+        duree_minutes=duree_minutes,
+        latence=args.latence_youtube,
+        taux_erreur=args.erreurs_youtube,
+    )
+    def lancer_session(_):
+        return executer_session(
+            api, serveur.base_url, args.max_tokens, args.nettoyage, args.mode_longue, args.mode_nettoyage
+        )
+
+    # Session d'échauffement non mesurée : imports paresseux (tiktoken...), encodeurs
+    # et connexions sont prêts avant le chronomètre et tracemalloc
+    lancer_session(None)
+    requetes_avant = serveur.nb_requetes
+
+    tracemalloc.start()
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as executor:
+        resultats = list(executor.map(lancer_session, range(sessions)))
+    duree = time.perf_counter() - debut
+    _, pic_memoire = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    reussies = [r for r in resultats if r["erreur"] is None]
+    totaux = [r["total"] for r in reussies]
+    premiers_tokens = [r["premier_token"] for r in reussies if "premier_token" in r]
+    return {
+        "duree_video_minutes": duree_minutes,
+        "concurrence": concurrence,
+        "sessions": sessions,
+        "erreurs": len(resultats) - len(reussies),
+        "exemples_erreurs": sorted({r["erreur"] for r in resultats if r["erreur"]})[:3],
+        "modes": sorted({r["mode"] for r in reussies if "mode" in r}),
+        "tokens_transcription": reussies[0]["tokens_transcription"] if reussies else None,
+        "total_p50": percentile(totaux, 0.5),
+        "total_p95": percentile(totaux, 0.95),
+        "premier_token_p50": percentile(premiers_tokens, 0.5),
+        "premier_token_p95": percentile(premiers_tokens, 0.95),
+        "fetch_p50": percentile([r["fetch"] for r in reussies], 0.5),
+        "debit_sessions_par_minute": 60 * len(reussies) / duree if duree else None,
+        "requetes_openai": serveur.nb_requetes - requetes_avant,
+        "pic_memoire_python_mo": pic_memoire / 1e6,
+        "duree_scenario": duree,
+    }
+
+
+def formater(valeur, suffixe="s"):
+    if valeur is None:
+        return "-"
+    return f"{valeur:.2f}{suffixe}"
+
+
+def afficher_resultats(resultats):
+    entetes = ("vidéo", "conc.", "mode", "tokens", "E2E p50", "E2E p95", "TTFT p50", "TTFT p95",
+               "sess/min", "req.", "mém. Mo", "erreurs")
+    print(" | ".join(entetes))
+    for r in resultats:
+        print(" | ".join((
+            f"{r['duree_video_minutes']} min",
+            str(r["concurrence"]),
+            "/".join(r["modes"]) or "-",
+            str(r["tokens_transcription"] or "-"),
+            formater(r["total_p50"]),
+            formater(r["total_p95"]),
+            formater(r["premier_token_p50"]),
+            formater(r["premier_token_p95"]),
+            formater(r["debit_sessions_par_minute"], ""),
+            str(r["requetes_openai"]),
+            formater(r["pic_memoire_python_mo"], ""),
+            f"{r['erreurs']}/{r['sessions']}",
+        )))
+        for erreur in r["exemples_erreurs"]:
+            print(f"    ! {erreur}")
+
+
+def lire_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du pipeline YouTube → OpenAI")
+    parser.add_argument("--durees", type=float, nargs="+", default=[1, 10, 60, 300],
+                        help="Durées des vidéos simulées, en minutes")
+    parser.add_argument("--concurrence", type=int, nargs="+", default=[1, 4],
+                        help="Nombres de sessions simultanées")
+    parser.add_argument("--sessions", type=int, default=None,
+                        help="Sessions par scénario (par défaut : 2 × la concurrence)")
+    parser.add_argument("--max-tokens", type=int, default=1500)
+    parser.add_argument("--mode-longue", choices=[MODE_EXTRACTIF, MODE_MAP_REDUCE], default=MODE_EXTRACTIF,
+                        help="Analyse des transcriptions longues")
+    parser.add_argument("--nettoyage", action="store_true", help="Inclure le nettoyage parallèle")
+    parser.add_argument("--mode-nettoyage", choices=[MODE_EDITIONS, MODE_REECRITURE], default=MODE_EDITIONS,
+                        help="Corrections appliquées localement, ou réécriture complète des morceaux")
+    parser.add_argument("--latence-youtube", type=float, default=0.2)
+    parser.add_argument("--erreurs-youtube", type=float, default=0.0, help="Taux d'erreur YouTube (0-1)")
+    parser.add_argument("--premier-token", type=float, default=0.3, help="Latence avant le premier token (s)")
+    parser.add_argument("--tokens-par-seconde", type=float, default=80)
+    parser.add_argument("--tokens-par-chunk", type=int, default=3)
+    parser.add_argument("--tokens-reponse", type=int, default=400, help="Longueur maximale des réponses")
+    parser.add_argument("--erreurs-openai", type=float, default=0.0, help="Taux de 429/500 OpenAI (0-1)")
+    parser.add_argument("--json", help="Écrire les résultats dans ce fichier JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = lire_arguments(argv)
+    serveur = FauxServeurOpenAI(
+        premier_token=args.premier_token,
+        tokens_par_seconde=args.tokens_par_seconde,
+        tokens_par_chunk=args.tokens_par_chunk,
+        tokens_reponse=args.tokens_reponse,
+        taux_erreur=args.erreurs_openai,
+    )
+
+    resultats = []
+    with serveur:
+        for duree_minutes in args.durees:
+            for concurrence in args.concurrence:
+                sessions = args.sessions or 2 * concurrence
+                resultats.append(executer_scenario(duree_minutes, concurrence, sessions, serveur, args))
+                print(f"… {duree_minutes} min × {concurrence} : {resultats[-1]['duree_scenario']:.1f}s",
+                      file=sys.stderr)
+
+    afficher_resultats(resultats)
+    # ru_maxrss est en kilo-octets sous Linux
+    print(f"\nPic RSS du processus : {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fichier:
+            json.dump({"parametres": vars(args), "resultats": resultats}, fichier, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as politique_email
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from nettoyage_editions import RATIO_SORTIE_EDITIONS
+
+# Débit de parole moyen d'une vidéo (mots par seconde) et durée des segments
+MOTS_PAR_SECONDE = 2.5
+DUREE_SEGMENT = 4.0
+
+VOCABULAIRE = (
+    "alors aujourd'hui on va parler de économie énergie climat données réseau "
+    "modèle apprentissage transition politique histoire santé école recherche "
+    "important exemple question réponse problème solution idée projet"
+).split()
+
+
+class FauxSnippet(SimpleNamespace):
+    """Même attributs que FetchedTranscriptSnippet (text, start, duration)"""
+
+
+class FausseTranscriptionRecuperee(list):
+    """Liste de snippets avec le code de langue, comme FetchedTranscript"""
+
+    def __init__(self, snippets, language_code):
+        super().__init__(snippets)
+        self.language_code = language_code
+
+
+class FaussePiste:
+    """Piste de sous-titres renvoyée par FauxYouTubeTranscriptApi.list"""
+
+    def __init__(self, api, video_id, language_code, is_generated):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.is_translatable = True
+        self.translation_languages = [{"language": "English", "language_code": "en"}]
+
+    def translate(self, language_code):
+        return FaussePiste(self.api, self.video_id, language_code, self.is_generated)
+
+    def fetch(self):
+        self.api._attendre()
+        return FausseTranscriptionRecuperee(
+            generer_snippets(self.api.duree_minutes, graine=self.video_id),
+            self.language_code
+        )
+
+
+def generer_snippets(duree_minutes, graine=None):
+    """Snippets de sous-titres automatiques pour une vidéo de duree_minutes"""
+    aleatoire = random.Random(graine)
+    mots_par_segment = int(MOTS_PAR_SECONDE * DUREE_SEGMENT)
+    snippets = []
+    debut = 0.0
+    while debut < duree_minutes * 60:
+        mots = [aleatoire.choice(VOCABULAIRE) for _ in range(mots_par_segment)]
+        if aleatoire.random() < 0.02:
+            mots.insert(0, "[Musique]")
+        snippets.append(FauxSnippet(text=" ".join(mots), start=debut, duration=DUREE_SEGMENT))
+        debut += DUREE_SEGMENT
+    return snippets
+
+
+class FauxYouTubeTranscriptApi:
+    """Remplaçant local de YouTubeTranscriptApi : latence, erreurs et longueur configurables"""
+
+    def __init__(self, duree_minutes=10, latence=0.2, taux_erreur=0.0, langue="fr"):
+        self.duree_minutes = duree_minutes
+        self.latence = latence
+        self.taux_erreur = taux_erreur
+        self.langue = langue
+
+    def _attendre(self):
+        time.sleep(self.latence)
+        if random.random() < self.taux_erreur:
+            raise ConnectionError("Erreur simulée de YouTube")
+
+    def list(self, video_id):
+        self._attendre()
+        return [FaussePiste(self, video_id, self.langue, is_generated=True)]
+
+    def fetch(self, video_id, languages=("en",)):
+        return self.list(video_id)[0].fetch()
+
+
+class _GestionnaireOpenAI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _repondre_json(self, code, corps, entetes=None):
+        donnees = json.dumps(corps).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(donnees)))
+        for nom, valeur in (entetes or {}).items():
+            self.send_header(nom, valeur)
+        self.end_headers()
+        self.wfile.write(donnees)
+
+    def _repondre_octets(self, donnees, type_contenu="application/octet-stream"):
+        self.send_response(200)
+        self.send_header("Content-Type", type_contenu)
+        self.send_header("Content-Length", str(len(donnees)))
+        self.end_headers()
+        self.wfile.write(donnees)
+
+    def do_POST(self):
+        config = self.server.config
+        longueur = int(self.headers.get("Content-Length", 0))
+        corps = self.rfile.read(longueur)
+        chemin = self.path.rstrip("/")
+
+        if chemin.endswith("/files"):
+            self._televerser_fichier(corps)
+            return
+
+        requete = json.loads(corps or b"{}")
+        if chemin.endswith("/chat/completions"):
+            self._chat_completions(config, requete)
+        elif chemin.endswith("/batches"):
+            self._creer_lot(requete)
+        else:
+            self._repondre_json(404, {"error": {"message": f"Route inconnue : {self.path}"}})
+
+    def do_GET(self):
+        morceaux = self.path.rstrip("/").split("/")
+        if len(morceaux) >= 3 and morceaux[-3] == "files" and morceaux[-1] == "content":
+            contenu = self.server.fichiers.get(morceaux[-2])
+            if contenu is None:
+                self._repondre_json(404, {"error": {"message": f"Fichier inconnu : {morceaux[-2]}"}})
+            else:
+                self._repondre_octets(contenu["octets"])
+        elif len(morceaux) >= 2 and morceaux[-2] == "batches":
+            lot = self.server.lots.get(morceaux[-1])
+            if lot is None:
+                self._repondre_json(404, {"error": {"message": f"Lot inconnu : {morceaux[-1]}"}})
+            else:
+                with self.server.verrou:
+                    self._repondre_json(200, dict(lot))
+        else:
+            self._repondre_json(404, {"error": {"message": f"Route inconnue : {self.path}"}})
+
+    def _televerser_fichier(self, corps):
+        # Formulaire multipart (champs purpose et file), comme l'envoie le client OpenAI
+        message = BytesParser(policy=politique_email).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + corps
+        )
+        champs = {}
+        for partie in message.iter_parts():
+            champs[partie.get_param("name", header="content-disposition")] = (
+                partie.get_filename(), partie.get_payload(decode=True)
+            )
+
+        nom, octets = champs.get("file", ("fichier", b""))
+        purpose = (champs.get("purpose", (None, b""))[1] or b"").decode("utf-8")
+        fichier = self.server.ajouter_fichier(octets, nom or "fichier", purpose)
+        self._repondre_json(200, fichier)
+
+    def _creer_lot(self, requete):
+        entree = self.server.fichiers.get(requete.get("input_file_id"))
+        if entree is None:
+            self._repondre_json(400, {"error": {"message": "input_file_id inconnu"}})
+            return
+
+        lot = {
+            "id": f"batch_{next(self.server.compteur)}",
+            "object": "batch",
+            "endpoint": requete.get("endpoint", "/v1/chat/completions"),
+            "completion_window": requete.get("completion_window", "24h"),
+            "input_file_id": requete["input_file_id"],
+            "output_file_id": None,
+            "error_file_id": None,
+            "status": "validating",
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": requete.get("metadata"),
+        }
+        with self.server.verrou:
+            self.server.lots[lot["id"]] = lot
+        threading.Thread(
+            target=self.server.traiter_lot, args=(lot["id"], entree["octets"]), daemon=True, name="faux-lot"
+        ).start()
+        self._repondre_json(200, lot)
+
+    def _chat_completions(self, config, requete):
+        with self.server.verrou:
+            self.server.nb_requetes += 1
+
+        # Erreurs simulées : surcharge (429) avec Retry-After, ou erreur serveur
+        if random.random() < config.taux_erreur:
+            if random.random() < 0.5:
+                self._repondre_json(429, {"error": {"message": "Rate limit simulée"}},
+                                    {"Retry-After": str(config.retry_after)})
+            else:
+                self._repondre_json(500, {"error": {"message": "Erreur simulée"}})
+            return
+
+        nb_tokens = nb_tokens_reponse(config, requete)
+        mots = [random.choice(VOCABULAIRE) + " " for _ in range(nb_tokens)]
+
+        time.sleep(config.premier_token)
+        modele = requete.get("model", "gpt-4o-mini")
+
+        if not requete.get("stream"):
+            time.sleep(nb_tokens / config.tokens_par_seconde)
+            self._repondre_json(200, reponse_chat(requete, mots))
+            return
+
+        # Streaming SSE, par morceaux de config.tokens_par_chunk tokens
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def envoyer(ligne):
+            donnees = ligne.encode("utf-8")
+            self.wfile.write(f"{len(donnees):X}\r\n".encode("ascii") + donnees + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            for debut in range(0, nb_tokens, config.tokens_par_chunk):
+                morceau = mots[debut:debut + config.tokens_par_chunk]
+                envoyer("data: " + json.dumps({
+                    "id": "chatcmpl-faux",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": modele,
+                    "choices": [{"index": 0, "delta": {"content": "".join(morceau)}, "finish_reason": None}],
+                }) + "\n\n")
+                time.sleep(len(morceau) / config.tokens_par_seconde)
+
+            envoyer("data: " + json.dumps({
+                "id": "chatcmpl-faux",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": modele,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }) + "\n\n")
+            envoyer("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti en cours de stream (abandon, timeout) : rien de plus à envoyer
+            self.close_connection = True
+
+
+def nb_tokens_reponse(config, requete):
+    max_tokens = requete.get("max_tokens") or requete.get("max_completion_tokens") or 1000
+    if (requete.get("response_format") or {}).get("type") == "json_object":
+        # Liste de corrections : proportionnelle au prompt, pas au plafond demandé
+        tokens_prompt = sum(len(m.get("content") or "") for m in requete.get("messages", [])) // 4
+        max_tokens = min(max_tokens, int(tokens_prompt * RATIO_SORTIE_EDITIONS))
+    return min(max_tokens, config.tokens_reponse)
+
+
+def reponse_chat(requete, mots):
+    """Corps d'une réponse chat.completion non streamée
+
+    Avec response_format json_object, le contenu est une liste d'éditions (une
+    « paragraphe » pour ~10 tokens), comme en attend le nettoyage par corrections.
+    """
+    contenu = "".join(mots)
+    if (requete.get("response_format") or {}).get("type") == "json_object":
+        contenu = json.dumps({"editions": [{"op": "paragraphe", "p": p} for p in range(1, len(mots) // 10 + 1)]})
+    tokens_prompt = sum(len(m.get("content") or "") for m in requete.get("messages", [])) // 4
+    return {
+        "id": "chatcmpl-faux",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": requete.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": contenu},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": tokens_prompt,
+            "completion_tokens": len(mots),
+            "total_tokens": tokens_prompt + len(mots),
+        },
+    }
+
+
+class _ServeurHTTP(ThreadingHTTPServer):
+    """Serveur et état partagé : fichiers téléversés et lots (API Batch)"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Une connexion coupée par le client n'est pas une erreur du faux service
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def ajouter_fichier(self, octets, nom, purpose):
+        fichier = {
+            "id": f"file-{next(self.compteur)}",
+            "object": "file",
+            "bytes": len(octets),
+            "created_at": int(time.time()),
+            "filename": nom,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.verrou:
+            self.fichiers[fichier["id"]] = dict(fichier, octets=octets)
+        return fichier
+
+    def traiter_lot(self, lot_id, octets):
+        """Exécute un lot en config.duree_lot secondes ; les erreurs simulées vont dans le fichier d'erreurs"""
+        config = self.config
+        lignes = [json.loads(ligne) for ligne in octets.decode("utf-8").splitlines() if ligne.strip()]
+        lot = self.lots[lot_id]
+        with self.verrou:
+            lot["status"] = "in_progress"
+            lot["request_counts"]["total"] = len(lignes)
+
+        sorties = []
+        erreurs = []
+        for ligne in lignes:
+            time.sleep(config.duree_lot / max(1, len(lignes)))
+            if random.random() < config.taux_erreur:
+                erreurs.append({
+                    "id": f"batch_req_{next(self.compteur)}",
+                    "custom_id": ligne["custom_id"],
+                    "response": {"status_code": 500, "request_id": "faux",
+                                 "body": {"error": {"message": "Erreur simulée"}}},
+                    "error": None,
+                })
+                compteur = "failed"
+            else:
+                corps = ligne["body"]
+                mots = [random.choice(VOCABULAIRE) + " " for _ in range(nb_tokens_reponse(config, corps))]
+                sorties.append({
+                    "id": f"batch_req_{next(self.compteur)}",
+                    "custom_id": ligne["custom_id"],
+                    "response": {"status_code": 200, "request_id": "faux", "body": reponse_chat(corps, mots)},
+                    "error": None,
+                })
+                compteur = "completed"
+            with self.verrou:
+                self.nb_requetes += 1
+                lot["request_counts"][compteur] += 1
+
+        def jsonl(elements):
+            return "".join(json.dumps(element) + "\n" for element in elements).encode("utf-8")
+
+        sortie = self.ajouter_fichier(jsonl(sorties), "sortie.jsonl", "batch_output") if sorties else None
+        erreur = self.ajouter_fichier(jsonl(erreurs), "erreurs.jsonl", "batch_output") if erreurs else None
+        with self.verrou:
+            lot["output_file_id"] = sortie and sortie["id"]
+            lot["error_file_id"] = erreur and erreur["id"]
+            lot["completed_at"] = int(time.time())
+            lot["status"] = "completed"
+
+
+class FauxServeurOpenAI:
+    """Serveur HTTP local compatible avec l'API OpenAI (chat.completions, streaming ou non,
+    et API Batch : files, batches)
+
+    Utilisable comme contexte : l'URL à passer en base_url est self.base_url.
+    """
+
+    def __init__(self, premier_token=0.3, tokens_par_seconde=80, tokens_par_chunk=3,
+                 tokens_reponse=400, taux_erreur=0.0, retry_after=0.1, duree_lot=1.0, port=0):
+        self.config = SimpleNamespace(
+            premier_token=premier_token,
+            tokens_par_seconde=tokens_par_seconde,
+            tokens_par_chunk=tokens_par_chunk,
+            tokens_reponse=tokens_reponse,
+            taux_erreur=taux_erreur,
+            retry_after=retry_after,
+            duree_lot=duree_lot,
+        )
+        self.serveur = _ServeurHTTP(("127.0.0.1", port), self.classe_gestionnaire())
+        self.serveur.config = self.config
+        self.serveur.verrou = threading.Lock()
+        self.serveur.nb_requetes = 0
+        self.serveur.compteur = itertools.count(1)
+        self.serveur.fichiers = {}
+        self.serveur.lots = {}
+        self._thread = None
+
+    def classe_gestionnaire(self):
+        return _GestionnaireOpenAI
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.serveur.server_address[1]}/v1"
+
+    @property
+    def nb_requetes(self):
+        return self.serveur.nb_requetes
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self.serveur.serve_forever, daemon=True, name="faux-openai")
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
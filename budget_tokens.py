@@ -0,0 +1,97 @@
+import functools
+
+from decoupage import CARACTERES_PAR_TOKEN, estimer_tokens
+
+# Caractéristiques des modèles : fenêtre de contexte, sortie maximale,
+# prix en dollars par million de tokens et débit approximatif
+MODELES = {
+    "gpt-4o-mini": {
+        "contexte": 128000,
+        "sortie_max": 16384,
+        "prix_entree": 0.15,
+        "prix_sortie": 0.60,
+        "tokens_par_seconde": 80,
+        "latence_premier_token": 0.6,
+    },
+    "gpt-4o": {
+        "contexte": 128000,
+        "sortie_max": 16384,
+        "prix_entree": 2.50,
+        "prix_sortie": 10.00,
+        "tokens_par_seconde": 60,
+        "latence_premier_token": 0.8,
+    },
+    "o3-mini": {
+        "contexte": 200000,
+        "sortie_max": 100000,
+        "prix_entree": 1.10,
+        "prix_sortie": 4.40,
+        "tokens_par_seconde": 120,
+        "latence_premier_token": 4.0,
+        "raisonnement": True,
+    },
+}
+
+# Débit de lecture du prompt (prefill), bien plus rapide que la génération
+TOKENS_ENTREE_PAR_SECONDE = 5000
+
+# Marge de sécurité pour le formatage des messages
+MARGE_TOKENS = 100
+
+
+@functools.lru_cache(maxsize=None)
+def _encodage(modele):
+    # tiktoken n'est importé qu'au premier comptage (démarrage plus rapide)
+    try:
+        import tiktoken
+    except ImportError:  # Comptage approximatif si tiktoken n'est pas installé
+        return None
+    try:
+        return tiktoken.encoding_for_model(modele)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def compter_tokens(texte, modele="gpt-4o-mini"):
+    """Compte les tokens d'un texte pour un modèle (estimation si tiktoken est absent)"""
+    if not texte:
+        return 0
+    encodage = _encodage(modele)
+    if encodage is None:
+        return estimer_tokens(texte)
+    return len(encodage.encode(texte, disallowed_special=()))
+
+
+def caracteres_par_token(texte, modele="gpt-4o-mini"):
+    """Nombre moyen de caractères par token du texte, pour découper en morceaux d'une taille en tokens
+
+    Mesuré sur le texte lui-même : le ratio varie selon la langue (le français
+    coûte plus de tokens que l'anglais à longueur égale).
+    """
+    nb_tokens = compter_tokens(texte, modele)
+    if not nb_tokens:
+        return CARACTERES_PAR_TOKEN
+    return len(texte) / nb_tokens
+
+
+def budget_sortie(modele, tokens_entree, max_tokens_souhaite):
+    """Ajuste max_tokens pour que l'entrée et la sortie tiennent dans le contexte du modèle"""
+    infos = MODELES[modele]
+    disponible = infos["contexte"] - tokens_entree - MARGE_TOKENS
+    return max(1, min(max_tokens_souhaite, infos["sortie_max"], disponible))
+
+
+def estimer_cout(modele, tokens_entree, tokens_sortie):
+    """Estime le coût d'un appel en dollars"""
+    infos = MODELES[modele]
+    return (tokens_entree * infos["prix_entree"] + tokens_sortie * infos["prix_sortie"]) / 1_000_000
+
+
+def estimer_latence(modele, tokens_entree, tokens_sortie):
+    """Estime la durée d'un appel en secondes (premier token, lecture, génération)"""
+    infos = MODELES[modele]
+    return (
+        infos["latence_premier_token"]
+        + tokens_entree / TOKENS_ENTREE_PAR_SECONDE
+        + tokens_sortie / infos["tokens_par_seconde"]
+    )
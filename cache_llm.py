@@ -0,0 +1,89 @@
+import hashlib
+import json
+from types import SimpleNamespace
+
+from metriques import enregistrer_cache
+
+# Taille des morceaux rejoués lors d'un hit (pas de pause entre les morceaux)
+TAILLE_MORCEAU_REJEU = 400
+
+
+def cle_requete(params):
+    """Calcule l'empreinte d'une requête (modèle, prompts, température, max_tokens...)"""
+    contenu = {cle: valeur for cle, valeur in params.items() if cle != "stream"}
+    brut = json.dumps(contenu, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+def chunk_texte(texte, depuis_cache=False):
+    """Construit un chunk au même format que ceux du streaming OpenAI"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=texte))], depuis_cache=depuis_cache
+    )
+
+
+def reponse_texte(texte, depuis_cache=False):
+    """Construit une réponse au même format qu'un appel OpenAI non streamé"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=texte))], depuis_cache=depuis_cache
+    )
+
+
+def est_reponse_complete(texte, fin):
+    """Seule une réponse non vide et terminée normalement (pas tronquée par max_tokens,
+    ni filtrée) peut être mise en cache
+    """
+    return bool(texte) and fin == "stop"
+
+
+def rejouer(texte):
+    """Rejoue une réponse en cache sous forme de stream, à pleine vitesse"""
+    for debut in range(0, len(texte), TAILLE_MORCEAU_REJEU):
+        yield chunk_texte(texte[debut:debut + TAILLE_MORCEAU_REJEU], depuis_cache=True)
+
+
+def enregistrer_stream(stream, cache, cle):
+    """Transmet un stream tel quel et l'enregistre en cache s'il va jusqu'au bout"""
+    morceaux = []
+    fin = None
+    for chunk in stream:
+        if chunk.choices:
+            if chunk.choices[0].delta.content:
+                morceaux.append(chunk.choices[0].delta.content)
+            fin = getattr(chunk.choices[0], "finish_reason", None) or fin
+        yield chunk
+
+    # Un stream interrompu (erreur ou abandon) n'est jamais mis en cache
+    texte = "".join(morceaux)
+    if est_reponse_complete(texte, fin):
+        cache.ecrire(cle, texte)
+
+
+class ClientEnCache:
+    """Enveloppe un client OpenAI pour mettre en cache les réponses de chat.completions"""
+
+    def __init__(self, client, cache, ignorer_cache=False):
+        self.client = client
+        self.cache = cache
+        self.ignorer_cache = ignorer_cache
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        cle = cle_requete(params)
+        stream = params.get("stream", False)
+
+        if not self.ignorer_cache:
+            en_cache = self.cache.lire(cle)
+            enregistrer_cache("reponses_llm", en_cache is not None)
+            if en_cache is not None:
+                return rejouer(en_cache) if stream else reponse_texte(en_cache, depuis_cache=True)
+
+        response = self.client.chat.completions.create(**params)
+        if stream:
+            return enregistrer_stream(response, self.cache, cle)
+
+        texte = response.choices[0].message.content or ""
+        if est_reponse_complete(texte, getattr(response.choices[0], "finish_reason", None)):
+            self.cache.ecrire(cle, texte)
+        return response
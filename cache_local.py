@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Dossier des caches persistants (partagés entre sessions et redémarrages)
+DOSSIER_CACHE = os.environ.get("YOUTUBE_ANALYZER_CACHE", ".cache")
+
+
+class CacheLocal:
+    """Cache clé/valeur persistant sur disque (SQLite) avec TTL et éviction LRU"""
+
+    def __init__(self, chemin, ttl=None, max_entrees=1000):
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        self.chemin = chemin
+        self.ttl = ttl
+        self.max_entrees = max_entrees
+        self.hits = 0
+        self.misses = 0
+        self._verrou = threading.Lock()
+
+        # Une seule connexion partagée entre les threads de Streamlit
+        self._conn = sqlite3.connect(chemin, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entrees (
+                cle TEXT PRIMARY KEY,
+                valeur BLOB NOT NULL,
+                cree REAL NOT NULL,
+                utilise REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_utilise ON entrees(utilise)")
+        self._conn.commit()
+
+    def lire(self, cle):
+        """Retourne la valeur associée à la clé, ou None si absente ou expirée"""
+        maintenant = time.time()
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT valeur, cree FROM entrees WHERE cle = ?", (cle,)
+            ).fetchone()
+
+            if ligne is None:
+                self.misses += 1
+                return None
+
+            valeur, cree = ligne
+            if self.ttl is not None and maintenant - cree > self.ttl:
+                self._conn.execute("DELETE FROM entrees WHERE cle = ?", (cle,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            # Mettre à jour la date d'utilisation pour l'éviction LRU
+            self._conn.execute(
+                "UPDATE entrees SET utilise = ? WHERE cle = ?", (maintenant, cle)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return valeur
+
+    def ecrire(self, cle, valeur):
+        """Enregistre une valeur puis évince les entrées les moins récemment utilisées"""
+        maintenant = time.time()
+        with self._verrou:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entrees (cle, valeur, cree, utilise) VALUES (?, ?, ?, ?)",
+                (cle, valeur, maintenant, maintenant)
+            )
+
+            if self.max_entrees is not None:
+                self._conn.execute(
+                    """DELETE FROM entrees WHERE cle IN (
+                        SELECT cle FROM entrees ORDER BY utilise DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entrees,)
+                )
+            self._conn.commit()
+
+    def supprimer(self, cle):
+        """Supprime une entrée du cache"""
+        with self._verrou:
+            self._conn.execute("DELETE FROM entrees WHERE cle = ?", (cle,))
+            self._conn.commit()
+
+    def vider(self):
+        """Supprime toutes les entrées et remet les compteurs à zéro"""
+        with self._verrou:
+            self._conn.execute("DELETE FROM entrees")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def statistiques(self):
+        """Retourne le nombre d'entrées et les compteurs de hits/misses"""
+        with self._verrou:
+            entrees = self._conn.execute("SELECT COUNT(*) FROM entrees").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entrees": entrees,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_hit": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,133 @@
+import datetime
+import email.utils
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# httpx et openai ne sont importés qu'à la création du premier client :
+# importer ce module (CLI, benchmark, transcription seule) reste rapide
+
+# Délais réseau (secondes) : connexion courte, lecture longue pour le streaming
+TIMEOUT_CONNEXION = float(os.environ.get("OPENAI_TIMEOUT_CONNEXION", 5.0))
+TIMEOUT_LECTURE = float(os.environ.get("OPENAI_TIMEOUT_LECTURE", 120.0))
+
+# Pool de connexions HTTP keep-alive partagé par toutes les sessions
+MAX_CONNEXIONS = 50
+MAX_CONNEXIONS_KEEPALIVE = 20
+DUREE_KEEPALIVE = 60.0
+
+# Reprises sur 429 / 5xx / erreurs réseau (backoff exponentiel avec jitter)
+MAX_TENTATIVES = 5
+DELAI_BASE = 0.5
+DELAI_MAX = 30.0
+CODES_A_REPRENDRE = {408, 409, 429, 500, 502, 503, 504}
+
+_clients = {}
+_verrou_clients = threading.Lock()
+
+
+def lire_retry_after(erreur):
+    """Retourne le délai demandé par l'API (en-têtes retry-after-ms / Retry-After), ou None"""
+    reponse = getattr(erreur, "response", None)
+    if reponse is None:
+        return None
+    entetes = reponse.headers
+
+    try:
+        if "retry-after-ms" in entetes:
+            return float(entetes["retry-after-ms"]) / 1000
+    except ValueError:
+        pass
+
+    valeur = entetes.get("retry-after")
+    if not valeur:
+        return None
+    try:
+        return float(valeur)
+    except ValueError:
+        pass
+
+    # Format date HTTP (ValueError si la date est illisible depuis Python 3.10)
+    try:
+        date = email.utils.parsedate_to_datetime(valeur)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, date.timestamp() - time.time())
+
+
+def est_a_reprendre(erreur):
+    """Indique si une erreur est transitoire (limite de débit, surcharge, réseau)"""
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(erreur, APIConnectionError):
+        return True
+    if isinstance(erreur, APIStatusError):
+        return erreur.status_code in CODES_A_REPRENDRE
+    return False
+
+
+def calculer_delai(tentative, retry_after=None):
+    """Backoff exponentiel avec jitter complet, en respectant Retry-After s'il est fourni"""
+    if retry_after is not None:
+        return min(DELAI_MAX, retry_after + random.uniform(0, DELAI_BASE))
+    return random.uniform(0, min(DELAI_MAX, DELAI_BASE * 2 ** tentative))
+
+
+class ClientAvecReprise:
+    """Enveloppe un client OpenAI pour reprendre les requêtes en échec transitoire"""
+
+    def __init__(self, client, max_tentatives=MAX_TENTATIVES):
+        self.client = client
+        self.max_tentatives = max_tentatives
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        tentative = 0
+        while True:
+            try:
+                return self.client.chat.completions.create(**params)
+            except Exception as e:
+                tentative += 1
+                if tentative >= self.max_tentatives or not est_a_reprendre(e):
+                    raise
+                time.sleep(calculer_delai(tentative - 1, lire_retry_after(e)))
+
+
+def obtenir_client(api_key, timeout_connexion=TIMEOUT_CONNEXION, timeout_lecture=TIMEOUT_LECTURE,
+                   base_url=None):
+    """Retourne le client OpenAI partagé du processus (créé au premier appel)
+
+    base_url permet de viser un serveur compatible (ex. le faux serveur du benchmark).
+    """
+    cle = (api_key, timeout_connexion, timeout_lecture, base_url)
+    with _verrou_clients:
+        client = _clients.get(cle)
+        if client is None:
+            import httpx
+            from openai import OpenAI
+
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNEXIONS,
+                    max_keepalive_connections=MAX_CONNEXIONS_KEEPALIVE,
+                    keepalive_expiry=DUREE_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(timeout_lecture, connect=timeout_connexion)
+            )
+            # Les reprises sont gérées par ClientAvecReprise
+            client = ClientAvecReprise(OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=http_client,
+                timeout=httpx.Timeout(timeout_lecture, connect=timeout_connexion),
+                max_retries=0
+            ))
+            _clients[cle] = client
+        return client
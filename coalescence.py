@@ -0,0 +1,120 @@
+import threading
+from types import SimpleNamespace
+
+from cache_llm import cle_requete
+from metriques import COALESCENCE
+from travaux import Travail
+
+
+class UnSeulVol:
+    """Exécute une seule fois les appels identiques simultanés (même clé)
+
+    Le premier appelant exécute la fonction ; ceux qui arrivent pendant
+    l'exécution attendent et reçoivent le même résultat (ou la même exception).
+    """
+
+    def __init__(self, nom):
+        self.nom = nom
+        self._en_vol = {}
+        self._verrou = threading.Lock()
+
+    def executer(self, cle, fonction):
+        with self._verrou:
+            vol = self._en_vol.get(cle)
+            meneur = vol is None
+            if meneur:
+                vol = SimpleNamespace(fini=threading.Event(), resultat=None, exception=None)
+                self._en_vol[cle] = vol
+        COALESCENCE.inc(type=self.nom, role="meneur" if meneur else "abonne")
+
+        if not meneur:
+            vol.fini.wait()
+            if vol.exception is not None:
+                raise vol.exception
+            return vol.resultat
+
+        try:
+            vol.resultat = fonction()
+            return vol.resultat
+        except Exception as e:
+            vol.exception = e
+            raise
+        finally:
+            with self._verrou:
+                del self._en_vol[cle]
+            vol.fini.set()
+
+    def en_vol(self):
+        """Nombre d'appels en cours d'exécution"""
+        with self._verrou:
+            return len(self._en_vol)
+
+
+# Requêtes OpenAI en cours, partagées par tous les clients du processus
+_requetes_en_vol = {}
+_verrou_requetes = threading.Lock()
+
+
+def requetes_en_vol():
+    """Nombre de requêtes OpenAI distinctes en cours"""
+    with _verrou_requetes:
+        return len(_requetes_en_vol)
+
+
+def diffuser(travail):
+    """Stream d'un abonné : les morceaux déjà reçus, puis les suivants au fil de l'eau"""
+    for chunk in travail.lire():
+        yield chunk
+    if travail.exception is not None:
+        raise travail.exception
+
+
+class ClientCoalescent:
+    """Enveloppe un client OpenAI pour partager les requêtes identiques en cours
+
+    La première requête est exécutée dans un thread qui garde tous les chunks
+    reçus ; chaque appelant (y compris le premier) lit ce tampon depuis le début,
+    puis en direct. N lecteurs simultanés coûtent un seul appel.
+
+    cle calcule l'identité d'une requête à partir de ses paramètres ; elle doit
+    couvrir tout ce qui change la réponse en aval (modèle routé, cache ignoré...).
+    """
+
+    def __init__(self, client, cle=cle_requete):
+        self.client = client
+        self.cle = cle
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        stream = params.get("stream", False)
+        cle = (self.cle(params), stream)
+
+        with _verrou_requetes:
+            travail = _requetes_en_vol.get(cle)
+            meneur = travail is None
+            if meneur:
+                travail = Travail(cle, lambda: self._produire(cle, params))
+                _requetes_en_vol[cle] = travail
+                threading.Thread(target=travail.executer, daemon=True, name="requete-openai").start()
+        COALESCENCE.inc(type="llm", role="meneur" if meneur else "abonne")
+
+        if stream:
+            return diffuser(travail)
+
+        travail.attendre()
+        if travail.exception is not None:
+            raise travail.exception
+        return travail.morceaux[0]
+
+    def _produire(self, cle, params):
+        try:
+            response = self.client.chat.completions.create(**params)
+            if params.get("stream"):
+                yield from response
+            else:
+                yield response
+        finally:
+            # Les requêtes suivantes passeront par le cache (ou un nouvel appel)
+            with _verrou_requetes:
+                _requetes_en_vol.pop(cle, None)
@@ -0,0 +1,108 @@
+import re
+
+# Estimation grossière : ~4 caractères par token pour le français et l'anglais
+CARACTERES_PAR_TOKEN = 4
+
+
+def estimer_tokens(texte):
+    """Estime le nombre de tokens d'un texte"""
+    if not texte:
+        return 0
+    return max(1, len(texte) // CARACTERES_PAR_TOKEN)
+
+
+def decouper_en_positions(texte, taille_tokens=3000, chevauchement_tokens=200,
+                          caracteres_par_token=CARACTERES_PAR_TOKEN):
+    """Positions (début, fin) de morceaux d'environ taille_tokens avec chevauchement
+
+    caracteres_par_token : ratio mesuré sur le texte (budget_tokens.caracteres_par_token),
+    l'estimation fixe de 4 caractères par défaut.
+    """
+    taille = max(1, int(taille_tokens * caracteres_par_token))
+    chevauchement = min(int(chevauchement_tokens * caracteres_par_token), taille // 2)
+    longueur = len(texte)
+
+    positions = []
+    debut = 0
+    while debut < longueur:
+        fin = min(debut + taille, longueur)
+
+        # Couper sur un espace plutôt qu'au milieu d'un mot
+        if fin < longueur:
+            espace = texte.rfind(' ', debut + taille // 2, fin)
+            if espace != -1:
+                fin = espace
+
+        if texte[debut:fin].strip():
+            positions.append((debut, fin))
+        if fin >= longueur:
+            break
+
+        # Reculer du chevauchement puis se réaligner sur le début d'un mot
+        suivant = fin - chevauchement
+        espace = texte.find(' ', suivant, fin)
+        suivant = espace + 1 if espace != -1 else suivant
+        debut = max(suivant, debut + 1)
+
+    return positions
+
+
+def decouper_en_chunks(texte, taille_tokens=3000, chevauchement_tokens=200,
+                       caracteres_par_token=CARACTERES_PAR_TOKEN):
+    """Découpe un texte en morceaux d'environ taille_tokens avec chevauchement"""
+    return [
+        texte[debut:fin].strip()
+        for debut, fin in decouper_en_positions(texte, taille_tokens, chevauchement_tokens, caracteres_par_token)
+    ]
+
+
+# Fin de phrase : ponctuation forte suivie d'un espace
+FIN_DE_PHRASE = re.compile(r'(?<=[.!?…])\s+')
+
+# Sous-titres automatiques sans ponctuation : « phrases » d'au plus 40 mots
+MOTS_PAR_PHRASE_MAX = 40
+PATTERN_BLOC_MOTS = re.compile(r"\S+(?:\s+\S+){0,%d}" % (MOTS_PAR_PHRASE_MAX - 1))
+
+
+def decouper_phrases(texte):
+    """Positions (début, fin) des phrases ; les passages sans ponctuation sont coupés par blocs de mots"""
+    phrases = []
+    debut = 0
+    for separateur in FIN_DE_PHRASE.finditer(texte):
+        phrases.extend(_blocs(texte, debut, separateur.start()))
+        debut = separateur.end()
+    phrases.extend(_blocs(texte, debut, len(texte)))
+    return phrases
+
+
+def _blocs(texte, debut, fin):
+    if fin - debut <= MOTS_PAR_PHRASE_MAX * 8:
+        return [(debut, fin)] if texte[debut:fin].strip() else []
+    return [(debut + m.start(), debut + m.end()) for m in PATTERN_BLOC_MOTS.finditer(texte[debut:fin])]
+
+
+def decouper_en_phrases(texte, taille_tokens=1500, caracteres_par_token=CARACTERES_PAR_TOKEN):
+    """Découpe un texte en morceaux d'environ taille_tokens, sur des fins de phrases"""
+    taille = max(1, int(taille_tokens * caracteres_par_token))
+
+    morceaux = []
+    courant = []
+    longueur_courante = 0
+    for phrase in FIN_DE_PHRASE.split(texte):
+        # Sous-titres automatiques sans ponctuation : découper sur les mots
+        if len(phrase) > taille:
+            sous_phrases = decouper_en_chunks(phrase, taille_tokens, 0, caracteres_par_token)
+        else:
+            sous_phrases = [phrase]
+
+        for sous_phrase in sous_phrases:
+            if courant and longueur_courante + len(sous_phrase) + 1 > taille:
+                morceaux.append(' '.join(courant))
+                courant = []
+                longueur_courante = 0
+            courant.append(sous_phrase)
+            longueur_courante += len(sous_phrase) + 1
+
+    if courant:
+        morceaux.append(' '.join(courant))
+    return [morceau for morceau in morceaux if morceau.strip()]
@@ -0,0 +1,129 @@
+import re
+
+import numpy as np
+
+from budget_tokens import compter_tokens
+from decoupage import decouper_phrases
+from segments import formater_temps
+
+# Compromis entre représentativité et redondance (MMR) : 0 = pas de pénalité
+POIDS_REDONDANCE = 0.6
+
+PATTERN_MOT = re.compile(r"\w+", re.UNICODE)
+
+# Mots trop fréquents pour décrire une phrase (en plus de la pondération IDF)
+MOTS_VIDES = frozenset("""
+le la les un une des de du d l et ou en à au aux ce ces cet cette c est sont ça qui que qu
+on il ils elle elles je j tu vous nous ne n pas plus pour par sur dans avec se s y a ai
+as avait été être fait faire bon alors donc voilà mais comme très tout tous
+euh hum bah ben hein
+the a an and or of to in on at is are was were be it this that i you we they he she
+not for with as so do just like yeah okay uh um
+""".split())
+
+
+def vectoriser(texte, phrases):
+    """Matrice TF-IDF creuse (lignes, colonnes, poids) des phrases, normalisée par ligne"""
+    vocabulaire = {}
+    lignes = []
+    colonnes = []
+    for ligne, (debut, fin) in enumerate(phrases):
+        for mot in PATTERN_MOT.findall(texte[debut:fin].lower()):
+            if mot in MOTS_VIDES or len(mot) < 2:
+                continue
+            lignes.append(ligne)
+            colonnes.append(vocabulaire.setdefault(mot, len(vocabulaire)))
+
+    nb_phrases = len(phrases)
+    if not colonnes:
+        vide = np.zeros(0, dtype=np.int64)
+        return vide, vide, np.zeros(0), 0
+
+    # Occurrences de chaque (phrase, mot), puis tf sous-linéaire × idf
+    cles = np.asarray(lignes, dtype=np.int64) * len(vocabulaire) + np.asarray(colonnes, dtype=np.int64)
+    cles, occurrences = np.unique(cles, return_counts=True)
+    lignes = cles // len(vocabulaire)
+    colonnes = cles % len(vocabulaire)
+
+    df = np.bincount(colonnes, minlength=len(vocabulaire))
+    idf = np.log((1 + nb_phrases) / (1 + df)) + 1
+    poids = (1 + np.log(occurrences)) * idf[colonnes]
+
+    normes = np.sqrt(np.bincount(lignes, poids * poids, minlength=nb_phrases))
+    poids = poids / normes[lignes]
+    return lignes, colonnes, poids, len(vocabulaire)
+
+
+def selectionner_phrases(texte, phrases, budget_tokens, poids_redondance=POIDS_REDONDANCE):
+    """Indices des phrases retenues (ordre d'origine) : proches du centroïde, peu redondantes,
+    jusqu'à remplir budget_tokens
+
+    Les phrases sans aucun mot porteur (mots vides, hésitations) ne sont jamais retenues.
+    """
+    nb_phrases = len(phrases)
+    # Même comptage que le budget de l'appel, plus le séparateur entre deux phrases
+    tokens = np.array([compter_tokens(texte[debut:fin]) + 1 for debut, fin in phrases], dtype=np.float64)
+    if tokens.sum() <= budget_tokens:
+        return list(range(nb_phrases))
+
+    lignes, colonnes, poids, taille_vocabulaire = vectoriser(texte, phrases)
+    if not taille_vocabulaire:
+        return []
+
+    # Représentativité : similarité cosinus avec le centroïde de la transcription
+    centroide = np.bincount(colonnes, poids, minlength=taille_vocabulaire) / nb_phrases
+    centroide /= np.linalg.norm(centroide) or 1.0
+    score = np.bincount(lignes, poids * centroide[colonnes], minlength=nb_phrases)
+
+    # MMR : à chaque étape, la meilleure phrase pénalisée par sa similarité aux phrases retenues
+    debuts_lignes = np.searchsorted(lignes, np.arange(nb_phrases + 1))
+    similarite_max = np.zeros(nb_phrases)
+    disponible = (tokens <= budget_tokens) & (score > 0)
+    restant = budget_tokens
+    retenues = []
+    vecteur = np.zeros(taille_vocabulaire)
+
+    while restant > 0:
+        valeurs = np.where(disponible, score - poids_redondance * similarite_max, -np.inf)
+        meilleure = int(np.argmax(valeurs))
+        if not np.isfinite(valeurs[meilleure]):
+            break
+
+        retenues.append(meilleure)
+        restant -= tokens[meilleure]
+        disponible[meilleure] = False
+        disponible &= tokens <= restant
+
+        # Similarité de toutes les phrases avec la phrase retenue (produit creux)
+        debut, fin = debuts_lignes[meilleure], debuts_lignes[meilleure + 1]
+        vecteur[colonnes[debut:fin]] = poids[debut:fin]
+        similarite = np.bincount(lignes, poids * vecteur[colonnes], minlength=nb_phrases)
+        vecteur[colonnes[debut:fin]] = 0.0
+        np.maximum(similarite_max, similarite, out=similarite_max)
+
+    return sorted(retenues)
+
+
+def resume_extractif(texte, budget_tokens, transcription=None):
+    """Phrases les plus informatives de toute la transcription, dans l'ordre, dans budget_tokens
+
+    Chaque passage non contigu commence par son horodatage si la transcription
+    indexée est fournie (sinon par « … »).
+    """
+    phrases = decouper_phrases(texte)
+    morceaux = []
+    precedente = None
+    for indice in selectionner_phrases(texte, phrases, budget_tokens):
+        debut, fin = phrases[indice]
+        if precedente is not None and indice == precedente + 1:
+            morceaux.append(" ")
+        else:
+            if morceaux:
+                morceaux.append("\n")
+            if transcription is not None:
+                morceaux.append(f"[{formater_temps(transcription.temps_a_la_position(debut))}] ")
+            elif precedente is not None or indice > 0:
+                morceaux.append("… ")
+        morceaux.append(texte[debut:fin].strip())
+        precedente = indice
+    return "".join(morceaux)
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Regroupement des segments en passages d'environ 30 secondes pour l'index
+DUREE_PASSAGE = 30.0
+
+
+def construire_requete(recherche):
+    """Transforme une saisie libre en requête FTS5 sûre (chaque mot entre guillemets)"""
+    mots = recherche.split()
+    return ' '.join('"' + mot.replace('"', '""') + '"' for mot in mots)
+
+
+def decouper_en_passages(transcription, duree=DUREE_PASSAGE):
+    """Regroupe les segments consécutifs en passages (début, texte) d'environ duree secondes"""
+    passages = []
+    debut_passage = None
+    morceaux = []
+    for debut, _, texte in transcription.segments():
+        if debut_passage is None:
+            debut_passage = debut
+        elif debut - debut_passage >= duree:
+            passages.append((debut_passage, ' '.join(morceaux)))
+            debut_passage = debut
+            morceaux = []
+        morceaux.append(texte)
+
+    if morceaux:
+        passages.append((debut_passage, ' '.join(morceaux)))
+    return passages
+
+
+class IndexRecherche:
+    """Index plein texte (SQLite FTS5) de toutes les transcriptions récupérées"""
+
+    def __init__(self, chemin):
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+        self._verrou = threading.Lock()
+        self._conn = sqlite3.connect(chemin, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                empreinte TEXT NOT NULL,
+                langue TEXT,
+                indexe REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                debut REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_passages_video ON passages(video_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                texte,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        self._conn.commit()
+
+    def est_indexee(self, video_id):
+        """Indique si la vidéo est déjà présente dans l'index"""
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT 1 FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return ligne is not None
+
+    def indexer(self, video_id, transcription, langue=None):
+        """Ajoute ou met à jour une transcription (sans rien faire si elle n'a pas changé)"""
+        empreinte = hashlib.sha1(transcription.texte.encode("utf-8")).hexdigest()
+
+        with self._verrou:
+            ligne = self._conn.execute(
+                "SELECT empreinte FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if ligne is not None and ligne[0] == empreinte:
+                return False
+
+            with self._conn:
+                self._supprimer(video_id)
+                for debut, texte in decouper_en_passages(transcription):
+                    curseur = self._conn.execute(
+                        "INSERT INTO passages (video_id, debut) VALUES (?, ?)", (video_id, debut)
+                    )
+                    self._conn.execute(
+                        "INSERT INTO passages_fts (rowid, texte) VALUES (?, ?)",
+                        (curseur.lastrowid, texte)
+                    )
+                self._conn.execute(
+                    "INSERT INTO videos (video_id, empreinte, langue, indexe) VALUES (?, ?, ?, ?)",
+                    (video_id, empreinte, langue, time.time())
+                )
+        return True
+
+    def supprimer(self, video_id):
+        """Retire une vidéo de l'index"""
+        with self._verrou, self._conn:
+            self._supprimer(video_id)
+
+    def _supprimer(self, video_id):
+        self._conn.execute(
+            "DELETE FROM passages_fts WHERE rowid IN (SELECT id FROM passages WHERE video_id = ?)",
+            (video_id,)
+        )
+        self._conn.execute("DELETE FROM passages WHERE video_id = ?", (video_id,))
+        self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+
+    def rechercher(self, recherche, max_videos=20, max_passages_par_video=5):
+        """Recherche classée (BM25) : liste de vidéos avec leurs passages horodatés"""
+        requete = construire_requete(recherche)
+        if not requete:
+            return []
+
+        with self._verrou:
+            lignes = self._conn.execute(
+                """SELECT p.video_id, p.debut,
+                          snippet(passages_fts, 0, '**', '**', '…', 16),
+                          bm25(passages_fts) AS score
+                   FROM passages_fts
+                   JOIN passages p ON p.id = passages_fts.rowid
+                   WHERE passages_fts MATCH ?
+                   ORDER BY score
+                   LIMIT ?""",
+                (requete, max_videos * max_passages_par_video * 4)
+            ).fetchall()
+
+        # Regrouper par vidéo en conservant l'ordre de pertinence
+        resultats = {}
+        for video_id, debut, extrait, score in lignes:
+            if video_id not in resultats:
+                if len(resultats) >= max_videos:
+                    continue
+                resultats[video_id] = {"video_id": video_id, "score": -score, "passages": []}
+            passages = resultats[video_id]["passages"]
+            if len(passages) < max_passages_par_video:
+                passages.append({"debut": debut, "extrait": extrait})
+
+        for resultat in resultats.values():
+            resultat["passages"].sort(key=lambda passage: passage["debut"])
+        return list(resultats.values())
+
+    def statistiques(self):
+        """Nombre de vidéos et de passages indexés"""
+        with self._verrou:
+            nb_videos = self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+            nb_passages = self._conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return {"videos": nb_videos, "passages": nb_passages}
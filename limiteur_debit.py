@@ -0,0 +1,196 @@
+import itertools
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from decoupage import estimer_tokens
+from metriques import ATTENTE_FILE
+
+# Limites par modèle : (requêtes par minute, tokens par minute)
+LIMITES_MODELES = {
+    "gpt-4o-mini": (int(os.environ.get("OPENAI_RPM_GPT_4O_MINI", 500)),
+                    int(os.environ.get("OPENAI_TPM_GPT_4O_MINI", 200000))),
+    "o3-mini": (int(os.environ.get("OPENAI_RPM_O3_MINI", 500)),
+                int(os.environ.get("OPENAI_TPM_O3_MINI", 200000))),
+}
+LIMITES_PAR_DEFAUT = (500, 200000)
+
+# Au-delà de cette attente dans la file, la demande est refusée
+ATTENTE_MAX = float(os.environ.get("OPENAI_ATTENTE_MAX", 120))
+
+
+class LimiteDebitDepassee(Exception):
+    """La demande a attendu trop longtemps dans la file du limiteur"""
+
+
+class SeauJetons:
+    """Seau à jetons : capacité par minute, rechargé en continu"""
+
+    def __init__(self, par_minute):
+        self.capacite = float(par_minute)
+        self.jetons = float(par_minute)
+        self.debit = par_minute / 60.0
+        self.maj = time.monotonic()
+
+    def recharger(self, maintenant):
+        self.jetons = min(self.capacite, self.jetons + (maintenant - self.maj) * self.debit)
+        self.maj = maintenant
+
+    def delai(self, quantite):
+        """Secondes à attendre avant de disposer de quantite jetons"""
+        manque = min(quantite, self.capacite) - self.jetons
+        return max(0.0, manque / self.debit)
+
+
+class LimiteurDebit:
+    """Limiteur partagé requêtes/minute et tokens/minute avec file d'attente équitable
+
+    Chaque demande prend un ticket classé par (rang dans sa session, ordre d'arrivée) :
+    une session qui envoie beaucoup de requêtes d'un coup (map-reduce, nettoyage)
+    ne bloque pas la première requête d'une autre session.
+    """
+
+    def __init__(self, requetes_par_minute, tokens_par_minute, attente_max=ATTENTE_MAX):
+        self.requetes = SeauJetons(requetes_par_minute)
+        self.tokens = SeauJetons(tokens_par_minute)
+        self.attente_max = attente_max
+        self._condition = threading.Condition()
+        self._file = []
+        self._compteur = itertools.count()
+
+    def _tete(self):
+        return min(self._file, key=lambda ticket: (ticket.rang, ticket.ordre))
+
+    def acquerir(self, tokens, session=None):
+        """Attend son tour et la disponibilité des jetons, ou lève LimiteDebitDepassee"""
+        with self._condition:
+            rang = sum(1 for ticket in self._file if ticket.session == session and session is not None)
+            ticket = SimpleNamespace(session=session, rang=rang, ordre=next(self._compteur))
+            self._file.append(ticket)
+            limite = time.monotonic() + self.attente_max
+
+            try:
+                while True:
+                    maintenant = time.monotonic()
+                    if self._tete() is ticket:
+                        self.requetes.recharger(maintenant)
+                        self.tokens.recharger(maintenant)
+                        delai = max(self.requetes.delai(1), self.tokens.delai(tokens))
+                        if delai == 0:
+                            self.requetes.jetons -= 1
+                            self.tokens.jetons -= min(tokens, self.tokens.capacite)
+                            return
+                    else:
+                        delai = self.attente_max
+
+                    if maintenant >= limite:
+                        raise LimiteDebitDepassee(
+                            "Trop de demandes en cours vers OpenAI, réessayez dans quelques instants."
+                        )
+                    self._condition.wait(min(delai, limite - maintenant))
+            finally:
+                self._file.remove(ticket)
+                self._condition.notify_all()
+
+    def rembourser(self, tokens):
+        """Rend les tokens réservés mais non consommés (max_tokens surestimé)"""
+        if tokens <= 0:
+            return
+        with self._condition:
+            self.tokens.recharger(time.monotonic())
+            self.tokens.jetons = min(self.tokens.capacite, self.tokens.jetons + tokens)
+            self._condition.notify_all()
+
+    def position(self, session):
+        """Nombre de demandes servies avant la prochaine demande de la session (None si aucune)"""
+        with self._condition:
+            ordre = sorted(self._file, key=lambda ticket: (ticket.rang, ticket.ordre))
+            for position, ticket in enumerate(ordre):
+                if ticket.session == session:
+                    return position
+        return None
+
+    def taille_file(self):
+        """Nombre de demandes en attente"""
+        with self._condition:
+            return len(self._file)
+
+
+_limiteurs = {}
+_verrou_limiteurs = threading.Lock()
+
+
+def obtenir_limiteur(modele):
+    """Retourne le limiteur partagé du processus pour un modèle"""
+    with _verrou_limiteurs:
+        limiteur = _limiteurs.get(modele)
+        if limiteur is None:
+            limiteur = LimiteurDebit(*LIMITES_MODELES.get(modele, LIMITES_PAR_DEFAUT))
+            _limiteurs[modele] = limiteur
+        return limiteur
+
+
+def position_en_file(session):
+    """Position de la session dans la file d'attente, tous modèles confondus (None si absente)"""
+    with _verrou_limiteurs:
+        limiteurs = list(_limiteurs.values())
+    positions = [p for p in (limiteur.position(session) for limiteur in limiteurs) if p is not None]
+    return min(positions) if positions else None
+
+
+def estimer_tokens_prompt(params):
+    """Estimation des tokens du prompt d'une requête"""
+    return sum(estimer_tokens(message.get("content") or "") for message in params.get("messages", []))
+
+
+def max_tokens_requete(params):
+    """Tokens de sortie réservés pour une requête (max_tokens demandé)"""
+    return params.get("max_tokens") or params.get("max_completion_tokens") or 1000
+
+
+def suivre_stream(stream, limiteur, tokens_prompt, reserve):
+    """Transmet un stream puis rend au limiteur les tokens de sortie non consommés"""
+    morceaux = []
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                morceaux.append(chunk.choices[0].delta.content)
+            yield chunk
+    finally:
+        limiteur.rembourser(reserve - tokens_prompt - estimer_tokens("".join(morceaux)))
+
+
+class ClientLimite:
+    """Enveloppe un client OpenAI pour faire passer chaque requête par le limiteur du modèle
+
+    À placer sous ClientAvecReprise : chaque reprise après un 429 reprend son tour.
+    """
+
+    def __init__(self, client, session=None):
+        self.client = client
+        self.session = session
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        limiteur = obtenir_limiteur(params.get("model"))
+        tokens_prompt = estimer_tokens_prompt(params)
+        reserve = tokens_prompt + max_tokens_requete(params)
+        debut = time.perf_counter()
+        limiteur.acquerir(reserve, self.session)
+        ATTENTE_FILE.observer(time.perf_counter() - debut, modele=params.get("model"))
+
+        try:
+            response = self.client.chat.completions.create(**params)
+        except Exception:
+            limiteur.rembourser(reserve)
+            raise
+
+        if params.get("stream"):
+            return suivre_stream(response, limiteur, tokens_prompt, reserve)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            limiteur.rembourser(reserve - usage.total_tokens)
+        return response
@@ -0,0 +1,370 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from decoupage import estimer_tokens
+
+# Bornes des histogrammes de durée (secondes)
+BORNES_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Bornes des histogrammes de taille (tokens)
+BORNES_TOKENS = (10, 100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+# Bornes des débits (tokens par seconde)
+BORNES_DEBIT = (5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+
+
+def _cle_labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(cle, extra=None):
+    paires = list(cle) + (extra or [])
+    if not paires:
+        return ""
+    return "{" + ",".join(f'{nom}="{str(valeur)}"' for nom, valeur in paires) + "}"
+
+
+class Compteur:
+    """Compteur monotone, éventuellement découpé par labels"""
+
+    type = "counter"
+
+    def __init__(self, nom, aide):
+        self.nom = nom
+        self.aide = aide
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, valeur=1, **labels):
+        cle = _cle_labels(labels)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def valeurs(self):
+        with self._verrou:
+            return dict(self._valeurs)
+
+    def lignes_prometheus(self):
+        return [f"{self.nom}{_format_labels(cle)} {valeur}" for cle, valeur in self.valeurs().items()]
+
+    def instantane(self):
+        return [{"labels": dict(cle), "valeur": valeur} for cle, valeur in self.valeurs().items()]
+
+
+class Histogramme:
+    """Histogramme cumulatif (somme, nombre d'observations et buckets) par labels"""
+
+    type = "histogram"
+
+    def __init__(self, nom, aide, bornes=BORNES_SECONDES):
+        self.nom = nom
+        self.aide = aide
+        self.bornes = bornes
+        self._series = {}
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur, **labels):
+        cle = _cle_labels(labels)
+        with self._verrou:
+            serie = self._series.get(cle)
+            if serie is None:
+                serie = {"somme": 0.0, "nombre": 0, "buckets": [0] * len(self.bornes)}
+                self._series[cle] = serie
+            serie["somme"] += valeur
+            serie["nombre"] += 1
+            for i, borne in enumerate(self.bornes):
+                if valeur <= borne:
+                    serie["buckets"][i] += 1
+
+    def series(self):
+        with self._verrou:
+            return {cle: {**serie, "buckets": list(serie["buckets"])} for cle, serie in self._series.items()}
+
+    def quantile(self, q, **labels):
+        """Quantile approché (borne du bucket qui le contient), None sans observation"""
+        serie = self.series().get(_cle_labels(labels))
+        if not serie or not serie["nombre"]:
+            return None
+        rang = q * serie["nombre"]
+        for borne, cumul in zip(self.bornes, serie["buckets"]):
+            if cumul >= rang:
+                return borne
+        return float("inf")
+
+    def lignes_prometheus(self):
+        lignes = []
+        for cle, serie in self.series().items():
+            for borne, cumul in zip(self.bornes, serie["buckets"]):
+                lignes.append(f"{self.nom}_bucket{_format_labels(cle, [('le', borne)])} {cumul}")
+            lignes.append(f"{self.nom}_bucket{_format_labels(cle, [('le', '+Inf')])} {serie['nombre']}")
+            lignes.append(f"{self.nom}_sum{_format_labels(cle)} {serie['somme']}")
+            lignes.append(f"{self.nom}_count{_format_labels(cle)} {serie['nombre']}")
+        return lignes
+
+    def instantane(self):
+        return [
+            {"labels": dict(cle), "somme": serie["somme"], "nombre": serie["nombre"]}
+            for cle, serie in self.series().items()
+        ]
+
+
+class Jauge:
+    """Valeur instantanée calculée au moment de l'export (taille d'un cache, taux de hit...)"""
+
+    type = "gauge"
+
+    def __init__(self, nom, aide, fonction):
+        self.nom = nom
+        self.aide = aide
+        self.fonction = fonction
+
+    def valeurs(self):
+        try:
+            valeurs = self.fonction()
+        except Exception:
+            return {}
+        # Une valeur seule, ou une liste de (labels, valeur)
+        if isinstance(valeurs, (list, tuple)):
+            return {_cle_labels(labels): valeur for labels, valeur in valeurs}
+        return {(): valeurs}
+
+    def lignes_prometheus(self):
+        return [f"{self.nom}{_format_labels(cle)} {valeur}" for cle, valeur in self.valeurs().items()]
+
+    def instantane(self):
+        return [{"labels": dict(cle), "valeur": valeur} for cle, valeur in self.valeurs().items()]
+
+
+class Registre:
+    """Registre des métriques du processus"""
+
+    def __init__(self):
+        self._metriques = {}
+        self._verrou = threading.Lock()
+
+    def _enregistrer(self, metrique):
+        with self._verrou:
+            return self._metriques.setdefault(metrique.nom, metrique)
+
+    def compteur(self, nom, aide):
+        return self._enregistrer(Compteur(nom, aide))
+
+    def histogramme(self, nom, aide, bornes=BORNES_SECONDES):
+        return self._enregistrer(Histogramme(nom, aide, bornes))
+
+    def jauge(self, nom, aide, fonction):
+        """Déclare (ou remplace) une jauge calculée par fonction() au moment de l'export"""
+        jauge = Jauge(nom, aide, fonction)
+        with self._verrou:
+            self._metriques[nom] = jauge
+        return jauge
+
+    def metriques(self):
+        with self._verrou:
+            return list(self._metriques.values())
+
+    def exporter_prometheus(self):
+        """Export au format texte Prometheus"""
+        lignes = []
+        for metrique in self.metriques():
+            lignes.append(f"# HELP {metrique.nom} {metrique.aide}")
+            lignes.append(f"# TYPE {metrique.nom} {metrique.type}")
+            lignes.extend(metrique.lignes_prometheus())
+        return "\n".join(lignes) + "\n"
+
+    def instantane(self):
+        """Toutes les métriques sous forme de dictionnaire sérialisable"""
+        return {
+            "horodatage": time.time(),
+            "metriques": {metrique.nom: metrique.instantane() for metrique in self.metriques()},
+        }
+
+    def exporter_jsonl(self, chemin):
+        """Ajoute un instantané des métriques au fichier JSON lines"""
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        with open(chemin, "a", encoding="utf-8") as fichier:
+            fichier.write(json.dumps(self.instantane(), ensure_ascii=False) + "\n")
+
+
+REGISTRE = Registre()
+
+DUREE_ETAPES = REGISTRE.histogramme(
+    "youtube_analyzer_etape_duree_secondes", "Durée des étapes du pipeline"
+)
+APPELS_ETAPES = REGISTRE.compteur(
+    "youtube_analyzer_etape_total", "Nombre d'appels des étapes du pipeline, par résultat"
+)
+CACHE_EVENEMENTS = REGISTRE.compteur(
+    "youtube_analyzer_cache_total", "Hits et misses des caches"
+)
+LLM_PREMIER_TOKEN = REGISTRE.histogramme(
+    "youtube_analyzer_llm_premier_token_secondes", "Délai avant le premier token OpenAI"
+)
+LLM_DUREE = REGISTRE.histogramme(
+    "youtube_analyzer_llm_duree_secondes", "Durée totale des appels OpenAI"
+)
+LLM_DEBIT = REGISTRE.histogramme(
+    "youtube_analyzer_llm_tokens_par_seconde", "Débit de génération OpenAI", BORNES_DEBIT
+)
+LLM_TOKENS_PROMPT = REGISTRE.histogramme(
+    "youtube_analyzer_llm_tokens_prompt", "Taille estimée des prompts", BORNES_TOKENS
+)
+LLM_TOKENS_REPONSE = REGISTRE.histogramme(
+    "youtube_analyzer_llm_tokens_reponse", "Taille estimée des réponses", BORNES_TOKENS
+)
+LLM_ERREURS = REGISTRE.compteur(
+    "youtube_analyzer_llm_erreurs_total", "Erreurs des appels OpenAI"
+)
+ATTENTE_FILE = REGISTRE.histogramme(
+    "youtube_analyzer_attente_file_secondes", "Attente dans la file du limiteur de débit"
+)
+COALESCENCE = REGISTRE.compteur(
+    "youtube_analyzer_coalescence_total", "Requêtes identiques simultanées : exécutées (meneur) ou partagées (abonne)"
+)
+ROUTE_APPELS = REGISTRE.compteur(
+    "youtube_analyzer_route_total", "Appels par route et modèle (ok, secours, erreur)"
+)
+ROUTE_DUREE = REGISTRE.histogramme(
+    "youtube_analyzer_route_duree_secondes", "Durée des appels par route et modèle"
+)
+ROUTE_COUT = REGISTRE.compteur(
+    "youtube_analyzer_route_cout_dollars_total", "Coût estimé des appels par route et modèle"
+)
+LOT_REQUETES = REGISTRE.compteur(
+    "youtube_analyzer_lot_requetes_total", "Requêtes traitées par l'API Batch, par tâche et résultat"
+)
+EDITIONS_NETTOYAGE = REGISTRE.compteur(
+    "youtube_analyzer_editions_nettoyage_total",
+    "Éditions de nettoyage appliquées ou rejetées, et morceaux gardés tels quels (morceau_refuse)"
+)
+RENDU_STREAM = REGISTRE.histogramme(
+    "youtube_analyzer_rendu_stream_secondes", "Durée d'affichage des réponses streamées"
+)
+
+
+def enregistrer_etape(etape, debut, resultat, **labels):
+    """Enregistre la durée (depuis debut) et le résultat (ok / erreur) d'une étape"""
+    DUREE_ETAPES.observer(time.perf_counter() - debut, etape=etape, **labels)
+    APPELS_ETAPES.inc(etape=etape, resultat=resultat, **labels)
+
+
+@contextmanager
+def chronometre(etape, **labels):
+    """Mesure la durée d'une étape et compte son résultat (ok / erreur)"""
+    debut = time.perf_counter()
+    resultat = "ok"
+    try:
+        yield
+    except BaseException:
+        resultat = "erreur"
+        raise
+    finally:
+        enregistrer_etape(etape, debut, resultat, **labels)
+
+
+def chronometrer_stream(stream, etape, debut, **labels):
+    """Transmet un stream et mesure l'étape de debut jusqu'à sa fin (ou son abandon)"""
+    resultat = "ok"
+    try:
+        yield from stream
+    except Exception:
+        resultat = "erreur"
+        raise
+    finally:
+        enregistrer_etape(etape, debut, resultat, **labels)
+
+
+def enregistrer_cache(cache, hit):
+    """Compte un hit ou un miss d'un cache nommé"""
+    CACHE_EVENEMENTS.inc(cache=cache, resultat="hit" if hit else "miss")
+
+
+def _mesurer_stream(stream, operation, modele, debut):
+    premier_token = None
+    morceaux = []
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if premier_token is None:
+                    premier_token = time.perf_counter() - debut
+                    LLM_PREMIER_TOKEN.observer(premier_token, operation=operation, modele=modele)
+                morceaux.append(chunk.choices[0].delta.content)
+            yield chunk
+    except Exception:
+        LLM_ERREURS.inc(operation=operation, modele=modele)
+        raise
+    finally:
+        duree = time.perf_counter() - debut
+        tokens = estimer_tokens("".join(morceaux))
+        LLM_DUREE.observer(duree, operation=operation, modele=modele)
+        LLM_TOKENS_REPONSE.observer(tokens, operation=operation, modele=modele)
+        if premier_token is not None and duree > premier_token:
+            LLM_DEBIT.observer(tokens / (duree - premier_token), operation=operation, modele=modele)
+
+
+class ClientMesure:
+    """Enveloppe un client OpenAI pour mesurer latence, premier token, débit et tailles"""
+
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        modele = params.get("model", "inconnu")
+        tokens_prompt = sum(estimer_tokens(m.get("content") or "") for m in params.get("messages", []))
+        LLM_TOKENS_PROMPT.observer(tokens_prompt, operation=self.operation, modele=modele)
+
+        debut = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**params)
+        except Exception:
+            LLM_ERREURS.inc(operation=self.operation, modele=modele)
+            raise
+
+        if params.get("stream"):
+            return _mesurer_stream(response, self.operation, modele, debut)
+
+        duree = time.perf_counter() - debut
+        tokens = estimer_tokens(response.choices[0].message.content or "")
+        LLM_DUREE.observer(duree, operation=self.operation, modele=modele)
+        LLM_TOKENS_REPONSE.observer(tokens, operation=self.operation, modele=modele)
+        if duree > 0:
+            LLM_DEBIT.observer(tokens / duree, operation=self.operation, modele=modele)
+        return response
+
+
+class _GestionnaireMetriques(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        corps = REGISTRE.exporter_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_serveur = None
+_verrou_serveur = threading.Lock()
+
+
+def demarrer_serveur_metriques(port):
+    """Expose /metrics (format Prometheus) dans un thread, une seule fois par processus"""
+    global _serveur
+    with _verrou_serveur:
+        if _serveur is None:
+            _serveur = ThreadingHTTPServer(("0.0.0.0", port), _GestionnaireMetriques)
+            threading.Thread(target=_serveur.serve_forever, daemon=True, name="metriques").start()
+        return _serveur
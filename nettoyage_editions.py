@@ -0,0 +1,206 @@
+"""Nettoyage par corrections : le modèle renvoie des éditions, appliquées localement
+
+Au lieu de réécrire tout le morceau, le modèle reçoit les phrases numérotées et
+ne renvoie qu'une liste JSON de corrections. Chaque édition est vérifiée avant
+d'être appliquée, et le résultat est comparé à l'original : une réponse
+inexploitable ou un morceau trop modifié lève EditionsInexploitables, pour que
+l'appelant réessaie en réécriture complète ou signale le morceau. Le coût suit le nombre de corrections, pas la
+longueur de la transcription.
+"""
+import difflib
+import json
+import re
+
+from budget_tokens import compter_tokens, budget_sortie
+from decoupage import decouper_phrases
+from metriques import EDITIONS_NETTOYAGE
+from pre_nettoyage import PATTERN_ESPACES, PATTERN_ESPACE_PONCTUATION
+
+MODELE_EDITIONS = "gpt-4o-mini"
+
+SYSTEME_EDITIONS = "Tu es un correcteur de transcriptions : tu indiques les corrections à faire, sans jamais reformuler le contenu."
+
+# Sortie attendue : ~15 % de l'entrée ; max_tokens plafonné à 40 % (au moins 300 tokens)
+RATIO_SORTIE_EDITIONS = 0.15
+RATIO_SORTIE_EDITIONS_MAX = 0.4
+MIN_TOKENS_EDITIONS = 300
+TOKENS_CONSIGNE_EDITIONS = 300
+
+SIGNES_PONCTUATION = {".", ",", ";", ":", "!", "?", "…"}
+
+PATTERN_MOT = re.compile(r"\w+")
+
+# Un remplacement corrige l'orthographe ou la casse : il doit rester proche du passage remplacé
+SIMILARITE_REMPLACEMENT_MIN = 0.5
+# En dessous de cette similarité (en mots) avec l'original, le morceau n'est pas modifié
+SIMILARITE_MORCEAU_MIN = 0.8
+
+
+class EditionsInexploitables(Exception):
+    """La réponse du modèle ne permet pas de nettoyer le morceau par corrections"""
+
+
+def numeroter_phrases(texte):
+    """Positions des phrases du morceau et texte numéroté envoyé au modèle"""
+    positions = decouper_phrases(texte)
+    numerote = "\n".join(f"[{numero}] {texte[debut:fin]}" for numero, (debut, fin) in enumerate(positions))
+    return positions, numerote
+
+
+def prompt_editions(numerote):
+    """Construit la consigne de nettoyage par corrections pour un morceau numéroté"""
+    return f"""Voici une transcription YouTube découpée en phrases numérotées.
+Indique uniquement les corrections nécessaires pour la nettoyer, sans modifier le contenu :
+ne résume pas, ne traduis pas, ne reformule pas. Enlève juste les détails qui ne font pas partie
+du texte (annotations, hésitations, répétitions), corrige la ponctuation et découpe en paragraphes.
+
+Réponds en JSON {{"editions": [...]}}, chaque édition étant l'une de :
+- {{"op": "supprimer", "p": N, "texte": "passage exact à retirer"}}
+- {{"op": "remplacer", "p": N, "texte": "passage exact", "par": "correction"}} (orthographe, majuscules)
+- {{"op": "ponctuer", "p": N, "apres": "passage exact", "signe": "."}}
+- {{"op": "paragraphe", "p": N}} (nouveau paragraphe avant la phrase N)
+"texte" et "apres" recopient des mots exacts de la phrase N. Sans correction : {{"editions": []}}.
+
+Phrases :
+{numerote}"""
+
+
+def requete_editions(numerote):
+    """Paramètres de l'appel de nettoyage par corrections d'un morceau numéroté (non streamé)"""
+    tokens_entree = compter_tokens(numerote, MODELE_EDITIONS) + TOKENS_CONSIGNE_EDITIONS
+    max_tokens = budget_sortie(
+        MODELE_EDITIONS,
+        tokens_entree,
+        max(MIN_TOKENS_EDITIONS, int(tokens_entree * RATIO_SORTIE_EDITIONS_MAX))
+    )
+
+    return dict(
+        model=MODELE_EDITIONS,
+        messages=[
+            {"role": "system", "content": SYSTEME_EDITIONS},
+            {"role": "user", "content": prompt_editions(numerote)}
+        ],
+        temperature=0,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"}
+    )
+
+
+def lire_editions(contenu):
+    """Liste des éditions de la réponse du modèle, ou None si elle n'est pas exploitable"""
+    try:
+        donnees = json.loads(contenu[contenu.index("{"):contenu.rindex("}") + 1])
+    except ValueError:
+        return None
+    editions = donnees.get("editions") if isinstance(donnees, dict) else None
+    return editions if isinstance(editions, list) else None
+
+
+def appliquer_edition(phrases, paragraphes, edition):
+    """Applique une édition aux phrases (en place) si elle est valide ; retourne True si appliquée"""
+    if not isinstance(edition, dict):
+        return False
+    numero = edition.get("p")
+    if not isinstance(numero, int) or not 0 <= numero < len(phrases):
+        return False
+
+    operation = edition.get("op")
+    if operation == "paragraphe":
+        paragraphes.add(numero)
+        return True
+
+    phrase = phrases[numero]
+    passage = edition.get("apres") if operation == "ponctuer" else edition.get("texte")
+    if not isinstance(passage, str) or not passage.strip():
+        return False
+    # Le passage doit couvrir des mots entiers (« um » ne doit pas couper « humain »)
+    trouve = re.search(r"(?<!\w)" + re.escape(passage) + r"(?!\w)", phrase)
+    if trouve is None:
+        return False
+    position, fin = trouve.span()
+
+    if operation == "supprimer":
+        remplacement = ""
+    elif operation == "remplacer":
+        remplacement = edition.get("par")
+        if not isinstance(remplacement, str) or difflib.SequenceMatcher(
+            None, passage.lower(), remplacement.lower()
+        ).ratio() < SIMILARITE_REMPLACEMENT_MIN:
+            return False
+    elif operation == "ponctuer":
+        signe = edition.get("signe")
+        if signe not in SIGNES_PONCTUATION:
+            return False
+        # Le signe est ajouté après le passage, sans doubler une ponctuation existante
+        # ni couper un mot
+        suivant = phrase[fin:fin + 1]
+        if suivant in SIGNES_PONCTUATION or suivant.isalnum() or suivant == "_":
+            return False
+        position, remplacement = fin, signe
+    else:
+        return False
+
+    phrases[numero] = phrase[:position] + remplacement + phrase[fin:]
+    return True
+
+
+def recomposer(texte, positions, phrases, paragraphes):
+    """Texte du morceau à partir des phrases éditées (séparateurs d'origine, paragraphes ajoutés)"""
+    morceaux = []
+    fin_precedente = 0
+    nouveau_paragraphe = False
+    for numero, (debut, fin) in enumerate(positions):
+        separateur = texte[fin_precedente:debut]
+        fin_precedente = fin
+        nouveau_paragraphe = nouveau_paragraphe or numero in paragraphes
+
+        phrase = PATTERN_ESPACE_PONCTUATION.sub(r"\1", PATTERN_ESPACES.sub(" ", phrases[numero])).strip()
+        if not phrase:
+            continue
+        if morceaux:
+            morceaux.append("\n\n" if nouveau_paragraphe else separateur or " ")
+        morceaux.append(phrase)
+        nouveau_paragraphe = False
+    return "".join(morceaux)
+
+
+def similarite_mots(original, nettoye):
+    """Proportion de mots communs (dans l'ordre, sans casse ni ponctuation) entre l'original et le nettoyé"""
+    return difflib.SequenceMatcher(
+        None, PATTERN_MOT.findall(original.lower()), PATTERN_MOT.findall(nettoye.lower()), autojunk=False
+    ).ratio()
+
+
+def appliquer_editions(texte, positions, editions):
+    """Applique les éditions valides au morceau et retourne le texte nettoyé
+
+    Lève EditionsInexploitables si le résultat s'éloigne trop de l'original.
+    """
+    phrases = [texte[debut:fin] for debut, fin in positions]
+    paragraphes = set()
+    for edition in editions:
+        appliquee = appliquer_edition(phrases, paragraphes, edition)
+        EDITIONS_NETTOYAGE.inc(resultat="appliquee" if appliquee else "rejetee")
+
+    nettoye = recomposer(texte, positions, phrases, paragraphes)
+    if similarite_mots(texte, nettoye) < SIMILARITE_MORCEAU_MIN:
+        EDITIONS_NETTOYAGE.inc(resultat="morceau_refuse")
+        raise EditionsInexploitables("Corrections trop éloignées du texte d'origine")
+    return nettoye
+
+
+def nettoyer_par_editions(texte, contenu):
+    """Morceau nettoyé d'après la réponse du modèle (EditionsInexploitables si elle ne l'est pas)"""
+    positions, _ = numeroter_phrases(texte)
+    editions = lire_editions(contenu or "")
+    if editions is None:
+        EDITIONS_NETTOYAGE.inc(resultat="morceau_refuse")
+        raise EditionsInexploitables("Réponse sans liste de corrections JSON")
+    return appliquer_editions(texte, positions, editions)
+
+
+def nettoyer_chunk_editions(client, chunk):
+    """Nettoie un morceau de transcription par corrections (appel non streamé)"""
+    _, numerote = numeroter_phrases(chunk)
+    response = client.chat.completions.create(**requete_editions(numerote))
+    return nettoyer_par_editions(chunk, response.choices[0].message.content)
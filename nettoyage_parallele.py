@@ -0,0 +1,102 @@
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from decoupage import decouper_en_phrases
+from budget_tokens import compter_tokens, budget_sortie, caracteres_par_token, estimer_cout, estimer_latence
+from nettoyage_editions import (
+    nettoyer_chunk_editions, EditionsInexploitables, RATIO_SORTIE_EDITIONS, TOKENS_CONSIGNE_EDITIONS
+)
+
+MODELE_NETTOYAGE = "gpt-4o-mini"
+
+# Taille des morceaux nettoyés en parallèle
+TAILLE_CHUNK_NETTOYAGE = 1500
+MAX_WORKERS_NETTOYAGE = 4
+
+# Modes de nettoyage : liste de corrections appliquées localement, ou réécriture complète
+MODE_EDITIONS = "editions"
+MODE_REECRITURE = "reecriture"
+
+SYSTEME_NETTOYAGE = "Tu es un assistant qui nettoie et formate des transcriptions sans en modifier le contenu."
+
+# La sortie nettoyée fait à peu près la taille de l'entrée (+30 % de marge)
+RATIO_SORTIE_NETTOYAGE = 1.3
+TOKENS_CONSIGNE_NETTOYAGE = 150
+
+
+def prompt_nettoyage(texte):
+    """Construit la consigne de nettoyage pour un morceau de transcription"""
+    return f"""Nettoie cette transcription YouTube sans modifier le contenu(
+         Ne modifie PAS le contenu, ne résume PAS, ne traduis pas, enlève juste les détails qui ne font pas partie du texte)
+
+, Voici la transcription :
+{texte}"""
+
+
+def requete_nettoyage(chunk):
+    """Paramètres de l'appel de nettoyage d'un morceau de transcription (non streamé)"""
+    tokens_entree = compter_tokens(chunk, MODELE_NETTOYAGE) + TOKENS_CONSIGNE_NETTOYAGE
+    max_tokens = budget_sortie(
+        MODELE_NETTOYAGE,
+        tokens_entree,
+        int(tokens_entree * RATIO_SORTIE_NETTOYAGE)
+    )
+
+    return dict(
+        model=MODELE_NETTOYAGE,
+        messages=[
+            {"role": "system", "content": SYSTEME_NETTOYAGE},
+            {"role": "user", "content": prompt_nettoyage(chunk)}
+        ],
+        temperature=0.3,
+        max_tokens=max_tokens
+    )
+
+
+def nettoyer_chunk(client, chunk):
+    """Nettoie un morceau de transcription (appel non streamé)"""
+    response = client.chat.completions.create(**requete_nettoyage(chunk))
+    return response.choices[0].message.content or ""
+
+
+def nettoyer_chunk_avec_repli(client, chunk):
+    """Nettoie un morceau par corrections, ou en réécriture complète si la réponse est inexploitable"""
+    try:
+        return nettoyer_chunk_editions(client, chunk)
+    except EditionsInexploitables:
+        return nettoyer_chunk(client, chunk)
+
+
+def decouper_nettoyage(texte):
+    """Morceaux de transcription nettoyés séparément, dans l'ordre (taille mesurée en vrais tokens)"""
+    return decouper_en_phrases(texte, TAILLE_CHUNK_NETTOYAGE, caracteres_par_token(texte, MODELE_NETTOYAGE))
+
+
+def estimer_nettoyage(nb_tokens, max_workers=MAX_WORKERS_NETTOYAGE, mode=MODE_EDITIONS):
+    """Estime le coût (dollars) et la durée (secondes) du nettoyage d'une transcription"""
+    nb_chunks = max(1, math.ceil(nb_tokens / TAILLE_CHUNK_NETTOYAGE))
+    if mode == MODE_EDITIONS:
+        entree_chunk = min(nb_tokens, TAILLE_CHUNK_NETTOYAGE) + TOKENS_CONSIGNE_EDITIONS
+        sortie_chunk = int(entree_chunk * RATIO_SORTIE_EDITIONS)
+    else:
+        entree_chunk = min(nb_tokens, TAILLE_CHUNK_NETTOYAGE) + TOKENS_CONSIGNE_NETTOYAGE
+        sortie_chunk = int(entree_chunk * RATIO_SORTIE_NETTOYAGE)
+
+    cout = nb_chunks * estimer_cout(MODELE_NETTOYAGE, entree_chunk, sortie_chunk)
+    duree = math.ceil(nb_chunks / max_workers) * estimer_latence(MODELE_NETTOYAGE, entree_chunk, sortie_chunk)
+    return cout, duree
+
+
+def nettoyer_en_parallele(client, texte, max_workers=MAX_WORKERS_NETTOYAGE, mode=MODE_EDITIONS):
+    """Nettoie les morceaux en parallèle et produit (index, total, texte) dès qu'ils sont prêts"""
+    chunks = decouper_nettoyage(texte)
+    total = len(chunks)
+    nettoyer = nettoyer_chunk_avec_repli if mode == MODE_EDITIONS else nettoyer_chunk
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(nettoyer, client, chunk): i
+            for i, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            yield futures[future], total, future.result()
@@ -0,0 +1,278 @@
+"""Pipeline sans interface : récupération, nettoyage et analyse des transcriptions
+
+Utilisé par l'application Streamlit, la ligne de commande (analyser_videos.py)
+et le benchmark. openai et youtube_transcript_api ne sont importés qu'au premier
+appel qui en a besoin.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+from analyse_longue import (
+    analyser_directement, analyser_extractif, analyser_map_reduce,
+    BUDGET_ANALYSE_DIRECTE, MODELE_ANALYSE, MODE_EXTRACTIF, MODE_MAP_REDUCE
+)
+from budget_tokens import compter_tokens
+from cache_llm import ClientEnCache, cle_requete, est_reponse_complete
+from cache_local import CacheLocal, DOSSIER_CACHE
+from client_openai import ClientAvecReprise, obtenir_client
+from coalescence import ClientCoalescent, UnSeulVol
+from index_recherche import IndexRecherche
+from limiteur_debit import ClientLimite
+from routage import ClientRoute, parametres_route
+from metriques import ClientMesure, chronometre, chronometrer_stream, enregistrer_cache, enregistrer_etape
+from nettoyage_parallele import nettoyer_en_parallele, MAX_WORKERS_NETTOYAGE, MODE_EDITIONS
+from segments import TranscriptionIndexee
+from selection_langue import lister_transcriptions, choisir_transcription, LANGUES_PRIORITAIRES
+from traitement_differe import executer_lots, regrouper_par_video, requetes_video, INTERVALLE_SONDAGE
+
+# Durée de validité et taille maximale du cache des transcriptions
+TTL_CACHE_TRANSCRIPTIONS = 7 * 24 * 3600
+MAX_TRANSCRIPTIONS_EN_CACHE = 5000
+
+# Cache des réponses IA (TTL optionnel : None = pas d'expiration)
+TTL_CACHE_REPONSES = None
+MAX_REPONSES_EN_CACHE = 2000
+
+# Récupérations YouTube en cours : une seule par vidéo, partagée par les sessions
+_vols_transcriptions = UnSeulVol("transcription")
+
+_ressources = {}
+_verrou_ressources = threading.Lock()
+
+
+def _ressource(nom, fabrique):
+    """Instance unique par processus, créée au premier appel"""
+    with _verrou_ressources:
+        ressource = _ressources.get(nom)
+        if ressource is None:
+            ressource = fabrique()
+            _ressources[nom] = ressource
+        return ressource
+
+
+def extraire_video_id(url):
+    """Extrait l'ID de la vidéo depuis différents formats d'URL YouTube"""
+    patterns = [
+        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
+        r'(?:embed\/)([0-9A-Za-z_-]{11})',
+        r'^([0-9A-Za-z_-]{11})$'
+    ]
+
+    with chronometre("extraire_video_id"):
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return match.group(1)
+        return None
+
+
+def obtenir_cache_transcriptions():
+    """Ouvre le cache disque des transcriptions (une seule instance par processus)"""
+    return _ressource("transcriptions", lambda: CacheLocal(
+        os.path.join(DOSSIER_CACHE, "transcriptions.sqlite3"),
+        ttl=TTL_CACHE_TRANSCRIPTIONS,
+        max_entrees=MAX_TRANSCRIPTIONS_EN_CACHE
+    ))
+
+
+def obtenir_cache_reponses():
+    """Ouvre le cache disque des réponses OpenAI (une seule instance par processus)"""
+    return _ressource("reponses_llm", lambda: CacheLocal(
+        os.path.join(DOSSIER_CACHE, "reponses_llm.sqlite3"),
+        ttl=TTL_CACHE_REPONSES,
+        max_entrees=MAX_REPONSES_EN_CACHE
+    ))
+
+
+def obtenir_index_recherche():
+    """Ouvre l'index de recherche SQLite FTS5 (une seule instance par processus)"""
+    return _ressource("recherche", lambda: IndexRecherche(os.path.join(DOSSIER_CACHE, "recherche.sqlite3")))
+
+
+def obtenir_transcription(video_id, langues=LANGUES_PRIORITAIRES, api=None):
+    """Récupère la transcription horodatée d'une vidéo YouTube (depuis le cache si possible)
+
+    Les demandes simultanées pour la même vidéo partagent une seule récupération.
+    api remplace YouTubeTranscriptApi (ex. le faux service du benchmark).
+    """
+    return _vols_transcriptions.executer(
+        (video_id, tuple(langues)),
+        lambda: _obtenir_transcription(video_id, langues, api)
+    )
+
+
+def _obtenir_transcription(video_id, langues, api):
+    cache = obtenir_cache_transcriptions()
+    cle_cache = f"{video_id}:{','.join(langues)}"
+
+    index = obtenir_index_recherche()
+
+    en_cache = cache.lire(cle_cache)
+    enregistrer_cache("transcriptions", en_cache is not None)
+    if en_cache is not None:
+        donnees = json.loads(en_cache)
+        transcription = TranscriptionIndexee.depuis_dict(donnees)
+        if not index.est_indexee(video_id):
+            index.indexer(video_id, transcription, donnees.get("langue"))
+        return transcription, None
+
+    from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+
+    try:
+        if api is None:
+            from youtube_transcript_api import YouTubeTranscriptApi
+
+            # Créer une instance de l'API
+            api = YouTubeTranscriptApi()
+
+        # Une seule requête de liste, puis choix de la meilleure piste selon les langues
+        with chronometre("fetch_youtube"):
+            piste = choisir_transcription(lister_transcriptions(api, video_id), langues)
+            if piste is None:
+                return None, "Aucune transcription disponible pour cette vidéo."
+            fetched_transcript = piste.fetch()
+
+        # Garder le texte complet et l'horodatage de chaque segment
+        # Les objets FetchedTranscriptSnippet utilisent des attributs, pas des clés
+        transcription = TranscriptionIndexee.depuis_snippets(fetched_transcript)
+
+        cache.ecrire(cle_cache, json.dumps({
+            **transcription.vers_dict(),
+            "langue": fetched_transcript.language_code
+        }))
+        index.indexer(video_id, transcription, fetched_transcript.language_code)
+
+        return transcription, None
+
+    except TranscriptsDisabled:
+        return None, "Les sous-titres sont désactivés pour cette vidéo."
+    except NoTranscriptFound:
+        return None, "Aucune transcription disponible pour cette vidéo."
+    except Exception as e:
+        return None, f"Erreur lors de la récupération : {str(e)}"
+
+
+def creer_client(api_key, operation, session=None, ignorer_cache=False, base_url=None, latence_cible=None):
+    """Client OpenAI partagé du processus, limité en débit et mesuré, derrière le cache des réponses
+
+    Le modèle est choisi par la table de routage selon l'opération, la taille du prompt
+    et la latence visée (secondes), avant le cache : la clé d'une réponse contient le
+    modèle qui l'a produite. Les requêtes identiques en cours (autres sessions, mêmes
+    morceaux) sont partagées ; leur clé est celle de la requête routée, avec le choix
+    d'ignorer le cache, pour ne jamais servir la réponse d'un autre modèle. Chaque
+    tentative (reprises sur 429 / 5xx comprises) passe par le limiteur de débit.
+    """
+    def cle(params):
+        return cle_requete(parametres_route(operation, params, latence_cible)), ignorer_cache
+
+    return ClientCoalescent(ClientRoute(
+        ClientEnCache(
+            ClientMesure(ClientAvecReprise(
+                ClientLimite(obtenir_client(api_key, base_url=base_url).client, session)
+            ), operation),
+            obtenir_cache_reponses(),
+            ignorer_cache
+        ),
+        operation,
+        latence_cible
+    ), cle)
+
+
+def analyser_transcription(texte, api_key, max_tokens=1500, ignorer_cache=False, nb_tokens=None,
+                           transcription=None, session=None, base_url=None, mode_longue=MODE_EXTRACTIF,
+                           latence_cible=None):
+    """Utilise OpenAI pour extraire les idées principales
+
+    Au-delà de BUDGET_ANALYSE_DIRECTE tokens : phrases les plus informatives en un
+    appel (MODE_EXTRACTIF), ou résumés parallèles puis synthèse (MODE_MAP_REDUCE).
+    """
+    debut = time.perf_counter()
+    mode = "direct"
+    try:
+        client = creer_client(api_key, "analyse", session, ignorer_cache, base_url, latence_cible)
+
+        if nb_tokens is None:
+            nb_tokens = compter_tokens(texte, MODELE_ANALYSE)
+
+        if nb_tokens > BUDGET_ANALYSE_DIRECTE and mode_longue == MODE_MAP_REDUCE:
+            mode = "map_reduce"
+            stream = analyser_map_reduce(client, texte, max_tokens, transcription=transcription)
+        elif nb_tokens > BUDGET_ANALYSE_DIRECTE:
+            mode = "extractif"
+            stream = analyser_extractif(client, texte, max_tokens, transcription)
+        else:
+            stream = analyser_directement(client, texte, max_tokens, nb_tokens)
+
+        # La durée mesurée va jusqu'à la fin du stream, pas seulement jusqu'à sa création
+        return chronometrer_stream(stream, "analyser_transcription", debut, mode=mode), None
+
+    except Exception as e:
+        enregistrer_etape("analyser_transcription", debut, "erreur", mode=mode)
+        return None, f"Erreur lors de l'analyse : {str(e)}"
+
+
+def nettoyer_transcription(texte, api_key, max_workers=MAX_WORKERS_NETTOYAGE, ignorer_cache=False,
+                           session=None, base_url=None, mode_nettoyage=MODE_EDITIONS, latence_cible=None):
+    """Nettoie la transcription sans modifier le contenu, par morceaux en parallèle
+
+    MODE_EDITIONS : le modèle ne renvoie que les corrections, appliquées et vérifiées localement.
+    """
+    try:
+        client = creer_client(api_key, "nettoyage", session, ignorer_cache, base_url, latence_cible)
+
+        # Générateur de (index, total, texte nettoyé) dans l'ordre de fin des requêtes
+        return nettoyer_en_parallele(client, texte, max_workers, mode_nettoyage), None
+
+    except Exception as e:
+        return None, f"Erreur lors du nettoyage : {str(e)}"
+
+
+def analyser_en_differe(transcriptions, api_key, max_tokens=1500, nettoyage=False, base_url=None,
+                        intervalle=INTERVALLE_SONDAGE, suivi=None, mode_nettoyage=MODE_EDITIONS):
+    """Analyse (et nettoie) des transcriptions {video_id: TranscriptionIndexee} en différé avec l'API Batch
+
+    Retourne ({video_id: {"analyse", "transcription_nettoyee", "erreur", "erreur_nettoyage"}}, erreur).
+    Les réponses alimentent le cache : une analyse interactive identique est ensuite immédiate.
+    """
+    try:
+        requetes = [
+            requete
+            for video_id, transcription in transcriptions.items()
+            for requete in requetes_video(video_id, transcription, max_tokens, nettoyage, mode_nettoyage)
+        ]
+        # Client OpenAI sans enveloppe : l'API Batch passe par files et batches, pas par chat
+        client = obtenir_client(api_key, base_url=base_url).client
+        with chronometre("analyser_en_differe"):
+            resultats = executer_lots(client, requetes, intervalle, suivi)
+
+        cache = obtenir_cache_reponses()
+        for custom_id, params in requetes:
+            contenu, erreur, fin = resultats[custom_id]
+            if erreur is None and est_reponse_complete(contenu, fin):
+                cache.ecrire(cle_requete(params), contenu)
+
+        textes = {video_id: transcription.texte for video_id, transcription in transcriptions.items()}
+        return regrouper_par_video(textes, resultats, mode_nettoyage), None
+
+    except Exception as e:
+        return None, f"Erreur lors du traitement en différé : {str(e)}"
+
+
+def assembler_nettoyage(morceaux):
+    """Remet dans l'ordre les (index, total, texte) produits par nettoyer_transcription"""
+    resultats = {}
+    for index, _, texte in morceaux:
+        resultats[index] = texte
+    return "\n\n".join(resultats[i] for i in sorted(resultats))
+
+
+def lire_stream(response_stream):
+    """Concatène le contenu d'une réponse streamée (sans affichage)"""
+    return "".join(
+        chunk.choices[0].delta.content or ""
+        for chunk in response_stream
+        if chunk.choices
+    )
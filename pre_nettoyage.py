@@ -0,0 +1,110 @@
+import re
+
+from budget_tokens import compter_tokens
+from segments import TranscriptionIndexee
+
+# Annotations des sous-titres automatiques : [Musique], [Applause], (rires), ♪...
+PATTERN_ANNOTATIONS = re.compile(
+    r'\[[^\]\n]{0,40}\]'
+    r'|\((?:musique|music|rires?|laughter|applaudissements|applause|inaudible)\)'
+    r'|[♪♫]+',
+    re.IGNORECASE
+)
+# Marqueurs de changement d'interlocuteur
+PATTERN_LOCUTEUR = re.compile(r'>>+|-{2,}')
+# Mots de remplissage isolés (avec la virgule ou les points de suspension qui suivent)
+PATTERN_REMPLISSAGE = re.compile(
+    r'\b(?:euh+|heu+|hum+|hmm+|uh+|um+|uhm+|erm+)\b[,.…]*',
+    re.IGNORECASE
+)
+PATTERN_ESPACES = re.compile(r'\s+')
+PATTERN_ESPACE_PONCTUATION = re.compile(r'\s+([,.])')
+
+# Longueur (en mots) des répétitions recherchées dans les sous-titres déroulants
+MIN_MOTS_REPETITION = 2
+MAX_MOTS_REPETITION = 20
+
+
+def indices_sans_repetitions(mots, min_mots=MIN_MOTS_REPETITION, max_mots=MAX_MOTS_REPETITION):
+    """Indices des mots à garder une fois les séquences répétées immédiatement retirées
+
+    « a b c a b c » ne garde que la seconde occurrence de « a b c ».
+    """
+    gardes = []
+    i = 0
+    n = len(mots)
+    while i < n:
+        repetition = 0
+        # Chercher la plus longue séquence répétée qui commence ici
+        for k in range(min(max_mots, (n - i) // 2), min_mots - 1, -1):
+            if mots[i] == mots[i + k] and mots[i:i + k] == mots[i + k:i + 2 * k]:
+                repetition = k
+                break
+
+        if repetition:
+            # Sauter la première occurrence, la seconde sera examinée à son tour
+            i += repetition
+        else:
+            gardes.append(i)
+            i += 1
+    return gardes
+
+
+def supprimer_repetitions(mots, min_mots=MIN_MOTS_REPETITION, max_mots=MAX_MOTS_REPETITION):
+    """Supprime les séquences de mots répétées immédiatement (« a b c a b c » -> « a b c »)"""
+    return [mots[i] for i in indices_sans_repetitions(mots, min_mots, max_mots)]
+
+
+def retirer_motifs(texte):
+    """Retire les annotations, marqueurs d'interlocuteur et mots de remplissage"""
+    texte = PATTERN_ANNOTATIONS.sub(' ', texte)
+    texte = PATTERN_LOCUTEUR.sub(' ', texte)
+    return PATTERN_REMPLISSAGE.sub(' ', texte)
+
+
+def normaliser_espaces(texte):
+    """Réduit les espaces multiples et retire les espaces avant la ponctuation"""
+    texte = PATTERN_ESPACES.sub(' ', texte)
+    return PATTERN_ESPACE_PONCTUATION.sub(r'\1', texte).strip()
+
+
+def pre_nettoyer(texte, modele="gpt-4o-mini"):
+    """Nettoyage local et déterministe d'une transcription, avant tout appel à l'IA
+
+    Retourne le texte nettoyé et le nombre de caractères et de tokens retirés.
+    """
+    propre = ' '.join(supprimer_repetitions(retirer_motifs(texte).split()))
+    propre = normaliser_espaces(propre)
+    return propre, statistiques_pre_nettoyage(texte, propre, modele)
+
+
+def pre_nettoyer_segments(transcription, modele="gpt-4o-mini"):
+    """Même nettoyage que pre_nettoyer, segment par segment pour garder les horodatages
+
+    Les répétitions sont cherchées sur l'ensemble des mots, car les sous-titres
+    déroulants répètent la fin d'un segment au début du suivant.
+    """
+    mots = []
+    origines = []
+    for index, (_, _, texte) in enumerate(transcription.segments()):
+        for mot in retirer_motifs(texte).split():
+            mots.append(mot)
+            origines.append(index)
+
+    mots_par_segment = [[] for _ in range(len(transcription))]
+    for i in indices_sans_repetitions(mots):
+        mots_par_segment[origines[i]].append(mots[i])
+
+    propre = TranscriptionIndexee.depuis_segments(
+        (transcription.debuts[index], transcription.durees[index], normaliser_espaces(' '.join(mots_segment)))
+        for index, mots_segment in enumerate(mots_par_segment)
+    )
+    return propre, statistiques_pre_nettoyage(transcription.texte, propre.texte, modele)
+
+
+def statistiques_pre_nettoyage(avant, apres, modele):
+    """Nombre de caractères et de tokens retirés par le pré-nettoyage"""
+    return {
+        "caracteres_retires": len(avant) - len(apres),
+        "tokens_retires": compter_tokens(avant, modele) - compter_tokens(apres, modele),
+    }
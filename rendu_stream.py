@@ -0,0 +1,64 @@
+import time
+
+# Rafraîchissement de l'affichage : au plus 10 fois par seconde...
+INTERVALLE_RAFRAICHISSEMENT = 0.1
+# ...ou dès que ce nombre de caractères est en attente d'affichage
+SEUIL_CARACTERES = 4000
+CURSEUR = "▌"
+
+
+def afficher_stream(response_stream, placeholder, intervalle=INTERVALLE_RAFRAICHISSEMENT,
+                    seuil=SEUIL_CARACTERES, curseur=CURSEUR):
+    """Affiche une réponse streamée dans un placeholder Streamlit à fréquence limitée
+
+    Les morceaux sont accumulés dans une liste et le placeholder n'est redessiné
+    qu'à intervalle régulier, au lieu de l'être à chaque chunk. Un chunk None
+    (battement d'un travail d'arrière-plan) redessine seulement si l'intervalle est écoulé.
+    Retourne le texte complet et des statistiques de temps.
+    """
+    debut = time.perf_counter()
+    premier_token = None
+    dernier_affichage = debut
+    morceaux = []
+    en_attente = 0
+    nb_chunks = 0
+    nb_affichages = 0
+
+    for chunk in response_stream:
+        if chunk is None:
+            maintenant = time.perf_counter()
+            if maintenant - dernier_affichage >= intervalle:
+                placeholder.markdown("".join(morceaux) + curseur)
+                dernier_affichage = maintenant
+                nb_affichages += 1
+            continue
+
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+
+        contenu = chunk.choices[0].delta.content
+        morceaux.append(contenu)
+        en_attente += len(contenu)
+        nb_chunks += 1
+
+        maintenant = time.perf_counter()
+        if premier_token is None:
+            premier_token = maintenant - debut
+
+        # Premier chunk affiché immédiatement, puis à fréquence limitée
+        if nb_affichages == 0 or maintenant - dernier_affichage >= intervalle or en_attente >= seuil:
+            placeholder.markdown("".join(morceaux) + curseur)
+            dernier_affichage = maintenant
+            en_attente = 0
+            nb_affichages += 1
+
+    texte = "".join(morceaux)
+    placeholder.markdown(texte)
+
+    return texte, {
+        "duree": time.perf_counter() - debut,
+        "temps_premier_token": premier_token,
+        "nb_chunks": nb_chunks,
+        "nb_affichages": nb_affichages + 1,
+        "caracteres": len(texte),
+    }
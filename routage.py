@@ -0,0 +1,207 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from budget_tokens import MODELES, estimer_cout, estimer_latence
+from client_openai import est_a_reprendre
+from decoupage import estimer_tokens
+from limiteur_debit import LimiteDebitDepassee, estimer_tokens_prompt, max_tokens_requete
+from metriques import ROUTE_APPELS, ROUTE_COUT, ROUTE_DUREE
+
+# Règles de routage, évaluées dans l'ordre : la première règle de la tâche dont
+# tokens_max (taille du prompt, ou de la question pour le chat) et latence
+# estimée conviennent choisit le modèle.
+# effort : reasoning_effort des modèles de raisonnement (None pour les autres).
+# secours : modèles essayés dans l'ordre si le modèle choisi est surchargé ou expire.
+ROUTES = [
+    {"nom": "analyse", "tache": "analyse", "tokens_max": None,
+     "modele": "gpt-4o-mini", "effort": None, "secours": ["gpt-4o"]},
+    {"nom": "nettoyage", "tache": "nettoyage", "tokens_max": None,
+     "modele": "gpt-4o-mini", "effort": None, "secours": ["gpt-4o"]},
+    # Une question courte n'est pas forcément simple : au moins medium
+    {"nom": "chat", "tache": "chat", "tokens_max": 300,
+     "modele": "o3-mini", "effort": "medium", "secours": ["gpt-4o"]},
+    {"nom": "chat_complexe", "tache": "chat", "tokens_max": None,
+     "modele": "o3-mini", "effort": "high", "secours": ["gpt-4o"]},
+]
+
+# Fichier JSON optionnel qui remplace la table ci-dessus (même format)
+if os.environ.get("ROUTES_MODELES"):
+    with open(os.environ["ROUTES_MODELES"], encoding="utf-8") as fichier:
+        ROUTES = json.load(fichier)
+
+# Tâches routées sur la dernière question posée : l'historique et la consigne
+# système grossissent à chaque tour sans rendre la question plus difficile
+TACHES_PAR_QUESTION = {"chat"}
+
+# Temps de réflexion des modèles de raisonnement : multiplicateur du délai avant
+# le premier token, et tokens de raisonnement à prévoir en plus de la réponse
+EFFORTS = {
+    "low": {"latence": 0.5, "tokens": 1000},
+    "medium": {"latence": 1.0, "tokens": 4000},
+    "high": {"latence": 3.0, "tokens": 16000},
+}
+
+
+def est_modele_raisonnement(modele):
+    return MODELES.get(modele, {}).get("raisonnement", False)
+
+
+def estimer_latence_route(modele, effort, tokens_entree, tokens_sortie):
+    """Latence estimée d'un appel, temps de réflexion compris"""
+    latence = estimer_latence(modele, tokens_entree, tokens_sortie)
+    if effort:
+        latence += MODELES[modele]["latence_premier_token"] * (EFFORTS[effort]["latence"] - 1)
+    return latence
+
+
+def taille_route(tache, params):
+    """Taille comparée à tokens_max : tout le prompt, ou la dernière question pour le chat"""
+    if tache not in TACHES_PAR_QUESTION:
+        return estimer_tokens_prompt(params)
+    for message in reversed(params.get("messages", [])):
+        if message.get("role") == "user":
+            return estimer_tokens(message.get("content") or "")
+    return 0
+
+
+def choisir_route(tache, tokens_entree, tokens_sortie, latence_cible=None, routes=None, taille=None):
+    """Première règle de la tâche adaptée à la taille et à la latence visée
+
+    taille (par défaut tokens_entree) est comparée à tokens_max ; la latence est
+    estimée sur tout le prompt. Si aucune règle ne tient la latence visée, la plus
+    rapide de celles qui acceptent cette taille est retenue. None si la tâche n'a
+    pas de règle.
+    """
+    if taille is None:
+        taille = tokens_entree
+    candidates = [
+        route for route in (routes or ROUTES)
+        if route["tache"] == tache and (route["tokens_max"] is None or taille <= route["tokens_max"])
+    ]
+    if not candidates:
+        return None
+    if latence_cible is None:
+        return candidates[0]
+
+    def latence(route):
+        return estimer_latence_route(route["modele"], route["effort"], tokens_entree, tokens_sortie)
+
+    for route in candidates:
+        if latence(route) <= latence_cible:
+            return route
+    return min(candidates, key=latence)
+
+
+def adapter_parametres(params, modele, effort):
+    """Paramètres de la requête pour le modèle choisi (les modèles de raisonnement
+    n'acceptent ni temperature ni max_tokens, mais reasoning_effort et max_completion_tokens)
+    """
+    params = dict(params, model=modele)
+    max_tokens = params.pop("max_tokens", None) or params.pop("max_completion_tokens", None)
+
+    if est_modele_raisonnement(modele):
+        params.pop("temperature", None)
+        if effort:
+            params["reasoning_effort"] = effort
+        if max_tokens:
+            # Les tokens de raisonnement sont décomptés de max_completion_tokens
+            params["max_completion_tokens"] = max_tokens + EFFORTS.get(effort or "medium")["tokens"]
+    else:
+        params.pop("reasoning_effort", None)
+        if max_tokens:
+            params["max_tokens"] = max_tokens
+    return params
+
+
+def choisir_route_requete(tache, params, latence_cible=None):
+    """Règle choisie pour une requête (None si la tâche n'a pas de règle)"""
+    return choisir_route(
+        tache, estimer_tokens_prompt(params), max_tokens_requete(params), latence_cible,
+        taille=taille_route(tache, params)
+    )
+
+
+def parametres_route(tache, params, latence_cible=None):
+    """Paramètres envoyés au modèle principal de la règle choisie (ex. requêtes d'un lot)"""
+    route = choisir_route_requete(tache, params, latence_cible)
+    if route is None:
+        return params
+    return adapter_parametres(params, route["modele"], route["effort"])
+
+
+def est_surcharge(erreur):
+    """Erreur qui justifie de passer au modèle de secours (délai, surcharge, limite de débit)"""
+    return isinstance(erreur, (LimiteDebitDepassee, TimeoutError)) or est_a_reprendre(erreur)
+
+
+def _mesurer_route(stream, route, modele, debut, tokens_entree):
+    morceaux = []
+    depuis_cache = False
+    try:
+        for chunk in stream:
+            depuis_cache = depuis_cache or getattr(chunk, "depuis_cache", False)
+            if chunk.choices and chunk.choices[0].delta.content:
+                morceaux.append(chunk.choices[0].delta.content)
+            yield chunk
+    finally:
+        _enregistrer(route, modele, debut, tokens_entree, estimer_tokens("".join(morceaux)), depuis_cache)
+
+
+def _enregistrer(route, modele, debut, tokens_entree, tokens_sortie, depuis_cache=False):
+    # Une réponse rejouée depuis le cache n'a rien coûté : seul l'appel est compté
+    ROUTE_APPELS.inc(route=route, modele=modele, resultat="cache" if depuis_cache else "ok")
+    if depuis_cache:
+        return
+    ROUTE_DUREE.observer(time.perf_counter() - debut, route=route, modele=modele)
+    if modele in MODELES:
+        ROUTE_COUT.inc(estimer_cout(modele, tokens_entree, tokens_sortie), route=route, modele=modele)
+
+
+class ClientRoute:
+    """Enveloppe un client OpenAI pour choisir le modèle selon la tâche, la taille et la latence visée
+
+    Le modèle demandé par l'appelant n'est gardé que si la tâche n'a pas de règle.
+    Placé au-dessus du cache des réponses : la clé du cache contient le modèle
+    réellement appelé, secours compris.
+    """
+
+    def __init__(self, client, tache, latence_cible=None):
+        self.client = client
+        self.tache = tache
+        self.latence_cible = latence_cible
+        # Même interface que le client OpenAI : client.chat.completions.create(...)
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        tokens_entree = estimer_tokens_prompt(params)
+        route = choisir_route_requete(self.tache, params, self.latence_cible)
+        if route is None:
+            return self.client.chat.completions.create(**params)
+
+        essais = [(route["modele"], route["effort"])] + [
+            (modele, route["effort"] if est_modele_raisonnement(modele) else None)
+            for modele in route["secours"]
+        ]
+        for numero, (modele, effort) in enumerate(essais):
+            debut = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(**adapter_parametres(params, modele, effort))
+            except Exception as e:
+                if numero + 1 < len(essais) and est_surcharge(e):
+                    ROUTE_APPELS.inc(route=route["nom"], modele=modele, resultat="secours")
+                    continue
+                ROUTE_APPELS.inc(route=route["nom"], modele=modele, resultat="erreur")
+                raise
+
+            if params.get("stream"):
+                return _mesurer_route(response, route["nom"], modele, debut, tokens_entree)
+            usage = getattr(response, "usage", None)
+            tokens_sortie = usage.completion_tokens if usage is not None else estimer_tokens(
+                response.choices[0].message.content or ""
+            )
+            _enregistrer(
+                route["nom"], modele, debut, tokens_entree, tokens_sortie, getattr(response, "depuis_cache", False)
+            )
+            return response
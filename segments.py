@@ -0,0 +1,137 @@
+import base64
+from array import array
+from bisect import bisect_right
+
+
+def formater_temps(secondes):
+    """Formate une durée en mm:ss ou h:mm:ss"""
+    secondes = int(secondes)
+    heures, reste = divmod(secondes, 3600)
+    minutes, secondes = divmod(reste, 60)
+    if heures:
+        return f"{heures}:{minutes:02d}:{secondes:02d}"
+    return f"{minutes:02d}:{secondes:02d}"
+
+
+def _encoder_tableau(tableau):
+    return base64.b64encode(tableau.tobytes()).decode("ascii")
+
+
+def _decoder_tableau(code, valeur):
+    tableau = array(code)
+    tableau.frombytes(base64.b64decode(valeur))
+    return tableau
+
+
+class TranscriptionIndexee:
+    """Transcription compacte : un seul texte et des tableaux parallèles par segment
+
+    debuts[i] et durees[i] sont en secondes, positions[i] est la position du
+    premier caractère du segment i dans texte.
+    """
+
+    __slots__ = ("texte", "debuts", "durees", "positions")
+
+    def __init__(self, texte, debuts, durees, positions):
+        self.texte = texte
+        self.debuts = debuts
+        self.durees = durees
+        self.positions = positions
+
+    @classmethod
+    def depuis_segments(cls, segments):
+        """Construit l'index depuis des (début, durée, texte) dans l'ordre chronologique"""
+        debuts = array('d')
+        durees = array('d')
+        positions = array('q')
+        morceaux = []
+        position = 0
+
+        for debut, duree, texte in segments:
+            texte = texte.strip()
+            if not texte:
+                continue
+            if morceaux:
+                position += 1  # espace de séparation
+            debuts.append(debut)
+            durees.append(duree)
+            positions.append(position)
+            morceaux.append(texte)
+            position += len(texte)
+
+        return cls(' '.join(morceaux), debuts, durees, positions)
+
+    @classmethod
+    def depuis_snippets(cls, snippets):
+        """Construit l'index depuis les FetchedTranscriptSnippet de youtube_transcript_api"""
+        return cls.depuis_segments(
+            (snippet.start, snippet.duration, snippet.text.replace('\n', ' '))
+            for snippet in snippets
+        )
+
+    @classmethod
+    def depuis_texte(cls, texte):
+        """Transcription sans horodatage : un seul segment à 0 s"""
+        return cls.depuis_segments([(0.0, 0.0, texte)])
+
+    def __len__(self):
+        return len(self.debuts)
+
+    def texte_segment(self, index):
+        """Texte du segment index (tranche du texte complet)"""
+        fin = self.positions[index + 1] - 1 if index + 1 < len(self) else len(self.texte)
+        return self.texte[self.positions[index]:fin]
+
+    def segments(self):
+        """Itère sur les (début, durée, texte) de chaque segment"""
+        for index in range(len(self)):
+            yield self.debuts[index], self.durees[index], self.texte_segment(index)
+
+    def index_au_temps(self, secondes):
+        """Index du segment en cours à l'instant donné"""
+        return max(0, bisect_right(self.debuts, secondes) - 1)
+
+    def index_a_la_position(self, position):
+        """Index du segment qui contient le caractère à la position donnée"""
+        return max(0, bisect_right(self.positions, position) - 1)
+
+    def temps_a_la_position(self, position):
+        """Début (en secondes) du segment qui contient la position donnée"""
+        if not len(self):
+            return 0.0
+        return self.debuts[self.index_a_la_position(position)]
+
+    def position_au_temps(self, secondes):
+        """Position dans le texte du segment en cours à l'instant donné"""
+        if not len(self):
+            return 0
+        return self.positions[self.index_au_temps(secondes)]
+
+    def texte_entre(self, debut, fin):
+        """Texte prononcé entre deux instants (en secondes), sans reconstruire de chaînes"""
+        if not len(self):
+            return ""
+        index_fin = bisect_right(self.debuts, fin)
+        position_fin = self.positions[index_fin] - 1 if index_fin < len(self) else len(self.texte)
+        return self.texte[self.position_au_temps(debut):position_fin]
+
+    def vers_dict(self):
+        """Sérialisation compacte (tableaux encodés en base64) pour le cache"""
+        return {
+            "texte": self.texte,
+            "debuts": _encoder_tableau(self.debuts),
+            "durees": _encoder_tableau(self.durees),
+            "positions": _encoder_tableau(self.positions),
+        }
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        """Inverse de vers_dict (accepte aussi les anciennes entrées sans segments)"""
+        if "debuts" not in donnees:
+            return cls.depuis_texte(donnees["texte"])
+        return cls(
+            donnees["texte"],
+            _decoder_tableau('d', donnees["debuts"]),
+            _decoder_tableau('d', donnees["durees"]),
+            _decoder_tableau('q', donnees["positions"])
+        )
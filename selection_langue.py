@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Ordre de préférence par défaut des langues de transcription
+LANGUES_PRIORITAIRES = ('fr', 'en')
+
+# Les listes de transcriptions contiennent des URL signées : durée de vie limitée
+TTL_LISTES = 3600
+MAX_LISTES_EN_CACHE = 1000
+
+_listes = OrderedDict()
+_verrou_listes = threading.Lock()
+
+
+def lister_transcriptions(api, video_id):
+    """Liste les transcriptions d'une vidéo (une seule requête YouTube par vidéo et par heure)"""
+    maintenant = time.time()
+    with _verrou_listes:
+        entree = _listes.get(video_id)
+        if entree is not None and maintenant - entree[0] < TTL_LISTES:
+            _listes.move_to_end(video_id)
+            return entree[1]
+
+    liste = api.list(video_id)
+
+    with _verrou_listes:
+        _listes[video_id] = (maintenant, liste)
+        _listes.move_to_end(video_id)
+        while len(_listes) > MAX_LISTES_EN_CACHE:
+            _listes.popitem(last=False)
+    return liste
+
+
+def _codes_traduction(transcription):
+    """Codes des langues vers lesquelles une transcription peut être traduite"""
+    codes = set()
+    for langue in transcription.translation_languages:
+        if isinstance(langue, dict):
+            codes.add(langue["language_code"])
+        else:
+            codes.add(langue.language_code)
+    return codes
+
+
+def choisir_transcription(liste, langues=LANGUES_PRIORITAIRES):
+    """Choisit la meilleure piste : manuelle puis automatique dans l'ordre des langues,
+    puis une traduction, et à défaut n'importe quelle piste disponible (manuelle d'abord)
+    """
+    # Pistes manuelles avant les pistes générées automatiquement
+    pistes = sorted(liste, key=lambda piste: piste.is_generated)
+    if not pistes:
+        return None
+
+    for generee in (False, True):
+        for code in langues:
+            for piste in pistes:
+                if piste.is_generated == generee and piste.language_code == code:
+                    return piste
+
+    for piste in pistes:
+        if piste.is_translatable:
+            codes = _codes_traduction(piste)
+            for code in langues:
+                if code in codes:
+                    return piste.translate(code)
+
+    return pistes[0]
+
+
+def lire_langues(texte):
+    """Transforme une saisie « fr, en » en liste ordonnée de codes de langue"""
+    langues = [code.strip().lower() for code in texte.replace(';', ',').split(',')]
+    return tuple(code for code in langues if code) or LANGUES_PRIORITAIRES
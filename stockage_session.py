@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# Budget mémoire des textes gardés pour les sessions (octets compressés, plus les copies
+# décompressées en cache, tous utilisateurs)
+BUDGET_MEMOIRE_SESSIONS = int(os.environ.get("BUDGET_MEMOIRE_SESSIONS", 256 * 1024 * 1024))
+
+# Une session inactive depuis plus longtemps est oubliée, même sous le budget
+TTL_SESSION_INACTIVE = 6 * 3600
+
+NIVEAU_COMPRESSION = 6
+
+# Derniers textes décompressés, partagés entre sessions (affichage à chaque rerun)
+MAX_TEXTES_DECOMPRESSES = 16
+
+
+class MagasinSessions:
+    """Textes des sessions (transcriptions, analyses...) compressés et dédupliqués
+
+    Chaque contenu n'est stocké qu'une fois, compressé, quel que soit le nombre
+    de sessions qui le gardent : dix sessions sur la même vidéo partagent la même
+    entrée. Les sessions inactives sont évincées (la plus ancienne d'abord) dès
+    que le budget est dépassé ; les copies décompressées, comptées dans le même
+    budget, sont abandonnées avant elles.
+    """
+
+    def __init__(self, budget=BUDGET_MEMOIRE_SESSIONS, ttl=TTL_SESSION_INACTIVE):
+        self.budget = budget
+        self.ttl = ttl
+        self._entrees = {}  # empreinte -> [données compressées, taille brute, est_texte, références]
+        self._sessions = OrderedDict()  # session -> [dernière activité, {nom: empreinte}]
+        self._decompresses = OrderedDict()
+        self._verrou = threading.Lock()
+        self.octets = 0
+        self.octets_decompresses = 0
+        self.evictions = 0
+
+    def _session(self, session, maintenant):
+        entree = self._sessions.get(session)
+        if entree is None:
+            entree = [maintenant, {}]
+            self._sessions[session] = entree
+        entree[0] = maintenant
+        self._sessions.move_to_end(session)
+        return entree
+
+    def _liberer(self, empreinte):
+        entree = self._entrees[empreinte]
+        entree[3] -= 1
+        if entree[3] == 0:
+            del self._entrees[empreinte]
+            if self._decompresses.pop(empreinte, None) is not None:
+                self.octets_decompresses -= entree[1]
+            self.octets -= len(entree[0])
+
+    def _oublier_session(self, session):
+        for empreinte in self._sessions.pop(session)[1].values():
+            self._liberer(empreinte)
+        self.evictions += 1
+
+    def _reduire_decompresses(self):
+        """Abandonne les plus anciennes copies décompressées au-delà de leur nombre maximal ou du budget"""
+        while self._decompresses and (
+            len(self._decompresses) > MAX_TEXTES_DECOMPRESSES
+            or self.octets + self.octets_decompresses > self.budget
+        ):
+            empreinte, _ = self._decompresses.popitem(last=False)
+            self.octets_decompresses -= self._entrees[empreinte][1]
+
+    def _evincer(self, maintenant, session_courante):
+        """Oublie les sessions expirées, puis les copies décompressées et les sessions
+        les moins récemment actives au-delà du budget
+        """
+        for session, (activite, _) in list(self._sessions.items()):
+            if maintenant - activite > self.ttl and session != session_courante:
+                self._oublier_session(session)
+
+        self._reduire_decompresses()
+        while self.octets > self.budget:
+            session = next((s for s in self._sessions if s != session_courante), None)
+            if session is None:
+                break
+            self._oublier_session(session)
+
+    def deposer(self, session, nom, valeur):
+        """Garde un texte (ou des octets) pour la session ; None retire la valeur"""
+        if valeur is None:
+            self.retirer(session, nom)
+            return
+
+        est_texte = isinstance(valeur, str)
+        brut = valeur.encode("utf-8") if est_texte else valeur
+        empreinte = hashlib.sha1(brut).hexdigest()
+        maintenant = time.time()
+
+        with self._verrou:
+            valeurs = self._session(session, maintenant)[1]
+            if valeurs.get(nom) == empreinte:
+                return
+
+            entree = self._entrees.get(empreinte)
+            if entree is None:
+                entree = [zlib.compress(brut, NIVEAU_COMPRESSION), len(brut), est_texte, 0]
+                self._entrees[empreinte] = entree
+                self.octets += len(entree[0])
+            entree[3] += 1
+
+            ancienne = valeurs.get(nom)
+            valeurs[nom] = empreinte
+            if ancienne is not None:
+                self._liberer(ancienne)
+
+            self._evincer(maintenant, session)
+
+    def lire(self, session, nom):
+        """Valeur gardée pour la session (décompressée), ou None si absente ou évincée"""
+        with self._verrou:
+            entree_session = self._sessions.get(session)
+            if entree_session is None or nom not in entree_session[1]:
+                return None
+            self._session(session, time.time())
+            empreinte = entree_session[1][nom]
+
+            valeur = self._decompresses.get(empreinte)
+            if valeur is not None:
+                self._decompresses.move_to_end(empreinte)
+                return valeur
+            donnees, _, est_texte, _ = self._entrees[empreinte]
+
+        # Décompression hors du verrou (les données compressées ne changent jamais)
+        brut = zlib.decompress(donnees)
+        valeur = brut.decode("utf-8") if est_texte else brut
+
+        with self._verrou:
+            # L'entrée a pu être libérée (ou déjà décompressée) pendant la décompression
+            entree = self._entrees.get(empreinte)
+            if entree is not None and empreinte not in self._decompresses:
+                self._decompresses[empreinte] = valeur
+                self.octets_decompresses += entree[1]
+                self._reduire_decompresses()
+        return valeur
+
+    def retirer(self, session, nom):
+        """Retire une valeur de la session"""
+        with self._verrou:
+            entree_session = self._sessions.get(session)
+            if entree_session is not None and nom in entree_session[1]:
+                self._liberer(entree_session[1].pop(nom))
+
+    def contient(self, session, nom):
+        with self._verrou:
+            entree_session = self._sessions.get(session)
+            return entree_session is not None and nom in entree_session[1]
+
+    def octets_session(self, session):
+        """Octets compressés des valeurs de la session (entrées partagées comptées en entier)"""
+        with self._verrou:
+            entree_session = self._sessions.get(session)
+            if entree_session is None:
+                return 0
+            return sum(len(self._entrees[empreinte][0]) for empreinte in entree_session[1].values())
+
+    def statistiques(self):
+        """Nombre de sessions et d'entrées, octets compressés / bruts, mémoire par session"""
+        with self._verrou:
+            par_session = [
+                sum(len(self._entrees[empreinte][0]) for empreinte in valeurs.values())
+                for _, valeurs in self._sessions.values()
+            ]
+            return {
+                "sessions": len(self._sessions),
+                "entrees": len(self._entrees),
+                "octets_compresses": self.octets,
+                "octets_bruts": sum(entree[1] for entree in self._entrees.values()),
+                "octets_decompresses": self.octets_decompresses,
+                "octets_par_session_moyenne": sum(par_session) / len(par_session) if par_session else 0,
+                "octets_par_session_max": max(par_session, default=0),
+                "evictions": self.evictions,
+            }
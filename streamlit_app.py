@@ -1,7 +1,14 @@
 import streamlit as st
-from openai import OpenAI
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from client_openai import ClientAvecReprise, obtenir_client
+from limiteur_debit import ClientLimite, obtenir_limiteur
+from routage import ClientRoute, choisir_route_requete
+from metriques import ClientMesure, RENDU_STREAM
+from rendu_stream import afficher_stream
 
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
@@ -16,11 +23,16 @@ st.set_page_config(
 # Mot de passe requis
 REQUIRED_PASSWORD = "honor55x"
 
+# Intervalle (s) de rafraîchissement de la position en file d'attente
+INTERVALLE_SUIVI = 0.05
+
 # Initialiser les variables de session
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'messages' not in st.session_state:
     st.session_state.messages = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Page d'authentification
 if not st.session_state.authenticated:
@@ -61,8 +73,16 @@ if not api_key:
     st.error("⚠️ La clé API OpenAI n'est pas configurée. Veuillez définir la variable d'environnement OPENAI_API_KEY")
     st.stop()
 
-# Initialiser le client OpenAI
-client = OpenAI(api_key=api_key)
+# Client OpenAI partagé du processus (pool de connexions et timeouts) ; chaque tentative,
+# reprises comprises, passe par le limiteur de débit commun à toutes les sessions. Le modèle
+# et l'effort de raisonnement sont choisis par la table de routage selon la longueur de la question
+client = ClientRoute(
+    ClientMesure(
+        ClientAvecReprise(ClientLimite(obtenir_client(api_key).client, st.session_state.session_id)),
+        "chat"
+    ),
+    "chat"
+)
 
 # Afficher l'historique des messages
 for message in st.session_state.messages:
@@ -81,26 +101,39 @@ if prompt := st.chat_input("Posez votre problème mathématique..."):
         message_placeholder = st.empty()
         full_response = ""
 
+        parametres = {
+            "model": "o3-mini",  # Utilisez "o3" si vous avez accès au modèle complet
+            "messages": [
+                {"role": "system",
+                 "content": "Tu es un expert en mathématiques. Résous les problèmes étape par étape avec des explications claires et détaillées."},
+                *[{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+            ],
+            "stream": True
+        }
+        # Limiteur du modèle réellement choisi par la table de routage
+        route = choisir_route_requete("chat", parametres)
+        limiteur = obtenir_limiteur(route["modele"] if route else parametres["model"])
+
         try:
-            # Appel au modèle O3 avec streaming
-            stream = client.chat.completions.create(
-                model="o3-mini",  # Utilisez "o3" si vous avez accès au modèle complet
-                messages=[
-                    {"role": "system",
-                     "content": "Tu es un expert en mathématiques. Résous les problèmes étape par étape avec des explications claires et détaillées."},
-                    *[{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
-                ],
-                reasoning_effort="high",  # Niveau de raisonnement élevé pour les maths
-                stream=True
-            )
-
-            # Afficher le texte mot par mot
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    full_response += chunk.choices[0].delta.content
-                    message_placeholder.markdown(full_response + "▌")
-
-            message_placeholder.markdown(full_response)
+            # Appel au modèle O3 avec streaming (effort de raisonnement choisi par le routage),
+            # en indiquant la position de la session tant que la demande attend son tour
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                appel = pool.submit(client.chat.completions.create, **parametres)
+                position_affichee = None
+                while not appel.done():
+                    position = limiteur.position(st.session_state.session_id)
+                    if position != position_affichee:
+                        position_affichee = position
+                        if position is None:
+                            message_placeholder.empty()
+                        else:
+                            message_placeholder.caption(f"⏳ En file d'attente OpenAI : position {position + 1}")
+                    time.sleep(INTERVALLE_SUIVI)
+                stream = appel.result()
+
+            # Afficher le texte au fil de l'eau (rafraîchissement limité)
+            full_response, stats_stream = afficher_stream(stream, message_placeholder)
+            RENDU_STREAM.observer(stats_stream["duree"], page="chat")
 
         except Exception as e:
             st.error(f"❌ Erreur lors de l'appel à l'API: {str(e)}")
@@ -1,10 +1,40 @@
 import streamlit as st
 import os
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-import re
-from openai import OpenAI
+import json
+import uuid
 import time
+from nettoyage_parallele import estimer_nettoyage, MAX_WORKERS_NETTOYAGE, MODE_EDITIONS, MODE_REECRITURE
+from traitement_lot import (
+    extraire_playlist_id, lister_videos_playlist, lire_liste_urls, traiter_lot, creer_archive,
+    MAX_WORKERS_TRANSCRIPTIONS, MAX_WORKERS_ANALYSES
+)
+from cache_llm import chunk_texte
+from limiteur_debit import position_en_file
+from metriques import (
+    REGISTRE, chronometre, demarrer_serveur_metriques,
+    LLM_PREMIER_TOKEN, LLM_DUREE, LLM_DEBIT, DUREE_ETAPES, CACHE_EVENEMENTS, RENDU_STREAM, COALESCENCE,
+    ROUTE_APPELS, ROUTE_DUREE, ROUTE_COUT, EDITIONS_NETTOYAGE
+)
+from rendu_stream import afficher_stream
+from analyse_longue import estimer_analyse, MODELE_ANALYSE, MODE_EXTRACTIF, MODE_MAP_REDUCE
+from budget_tokens import compter_tokens
+from pre_nettoyage import pre_nettoyer_segments
+from segments import TranscriptionIndexee, formater_temps
+from stockage_session import MagasinSessions
+from visionneuse import (
+    decouper_pages, bornes_page, texte_page, rechercher_occurrences, MAX_OCCURRENCES
+)
+from travaux import GestionnaireTravaux
+from selection_langue import lire_langues, LANGUES_PRIORITAIRES
+from pipeline_youtube import (
+    extraire_video_id, obtenir_cache_transcriptions, obtenir_cache_reponses, obtenir_index_recherche,
+    obtenir_transcription, analyser_transcription, nettoyer_transcription, lire_stream
+)
+
+# Pendant un travail d'arrière-plan, l'affichage est rafraîchi au moins toutes les 0,5 s
+BATTEMENT_AFFICHAGE = 0.5
+# Intervalle entre deux lectures des travaux suivis quand rien de nouveau n'est arrivé
+INTERVALLE_SUIVI = 0.05
 
 # Configuration de la page
 st.set_page_config(
@@ -14,121 +44,234 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialiser session_state
-if 'transcription' not in st.session_state:
-    st.session_state['transcription'] = None
+# Initialiser session_state (les textes longs sont dans le magasin partagé, voir garder_session)
 if 'video_id' not in st.session_state:
     st.session_state['video_id'] = None
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+
+
+# Métriques du processus : jauges des caches et export HTTP optionnel
+@st.cache_resource
+def initialiser_metriques():
+    """Déclare les jauges des caches et démarre /metrics si METRIQUES_PORT est défini"""
+    REGISTRE.jauge(
+        "youtube_analyzer_cache_entrees", "Nombre d'entrées dans les caches disque",
+        lambda: [
+            ({"cache": "transcriptions"}, obtenir_cache_transcriptions().statistiques()["entrees"]),
+            ({"cache": "reponses_llm"}, obtenir_cache_reponses().statistiques()["entrees"]),
+        ]
+    )
+    REGISTRE.jauge(
+        "youtube_analyzer_sessions", "Sessions dont les textes sont gardés en mémoire",
+        lambda: obtenir_magasin_sessions().statistiques()["sessions"]
+    )
+    REGISTRE.jauge(
+        "youtube_analyzer_sessions_memoire_octets", "Mémoire des textes de session",
+        lambda: [
+            ({"mesure": mesure}, valeur)
+            for mesure, valeur in obtenir_magasin_sessions().statistiques().items()
+            if mesure.startswith("octets")
+        ]
+    )
+    REGISTRE.jauge(
+        "youtube_analyzer_sessions_evincees", "Sessions évincées (inactivité ou budget mémoire)",
+        lambda: obtenir_magasin_sessions().statistiques()["evictions"]
+    )
+    if os.environ.get("METRIQUES_PORT"):
+        demarrer_serveur_metriques(int(os.environ["METRIQUES_PORT"]))
+    return REGISTRE
+
+
+# Textes des sessions compressés et dédupliqués, partagés par toutes les sessions
+@st.cache_resource
+def obtenir_magasin_sessions():
+    """Crée le magasin des textes de session (une seule instance par processus)"""
+    return MagasinSessions()
+
+
+def garder_session(nom, valeur):
+    """Garde un texte long de la session, compressé (None le retire)"""
+    obtenir_magasin_sessions().deposer(st.session_state['session_id'], nom, valeur)
+
+
+def lire_session(nom):
+    """Texte long de la session, décompressé à la demande (None si absent ou évincé)"""
+    return obtenir_magasin_sessions().lire(st.session_state['session_id'], nom)
+
 
+def transcription_session():
+    """Transcription indexée de la session, ou None"""
+    donnees = lire_session('segments')
+    if donnees is None:
+        return None
+    return TranscriptionIndexee.depuis_dict(json.loads(donnees))
 
-# Fonction pour extraire l'ID de la vidéo YouTube
-def extraire_video_id(url):
-    """Extrait l'ID de la vidéo depuis différents formats d'URL YouTube"""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:embed\/)([0-9A-Za-z_-]{11})',
-        r'^([0-9A-Za-z_-]{11})$'
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-
-# Fonction pour obtenir la transcription
-def obtenir_transcription(video_id):
-    """Récupère la transcription d'une vidéo YouTube"""
-    try:
-        # Créer une instance de l'API
-        api = YouTubeTranscriptApi()
-
-        # Essayer d'abord en français, puis en anglais
-        try:
-            fetched_transcript = api.fetch(video_id, languages=['fr', 'en'])
-        except:
-            # Si ça échoue, essayer avec la langue par défaut
-            fetched_transcript = api.fetch(video_id)
-
-        # Récupérer le texte complet
-        # Les objets FetchedTranscriptSnippet utilisent des attributs, pas des clés
-        texte_complet = ' '.join([entry.text for entry in fetched_transcript])
-
-        return texte_complet, None
-
-    except TranscriptsDisabled:
-        return None, "Les sous-titres sont désactivés pour cette vidéo."
-    except NoTranscriptFound:
-        return None, "Aucune transcription disponible pour cette vidéo."
-    except Exception as e:
-        return None, f"Erreur lors de la récupération : {str(e)}"
-
-
-# Fonction pour analyser le texte avec OpenAI
-def analyser_transcription(texte, api_key, max_tokens=1500):
-    """Utilise OpenAI pour extraire les idées principales"""
-    try:
-        # Initialiser le client OpenAI avec juste la clé API
-        client = OpenAI(api_key=api_key)
-
-        prompt = f"""Analyse la transcription suivante et extrais les idées essentielles.
-
-Organise ta réponse de la manière suivante :
-1. Résumé principal (2-3 phrases)
-2. Idées clés (liste à puces des points importants)
-3. Concepts principaux abordés
-4. Conclusions ou points à retenir
-
-Transcription :
-{texte[:15000]}"""  # Limiter la taille pour éviter de dépasser les tokens
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system",
-                 "content": "Tu es un assistant expert en analyse de contenu qui extrait les idées essentielles de manière claire et structurée."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=max_tokens,
-            stream=True  # Activer le streaming
+
+# Travaux IA exécutés en arrière-plan, partagés par toutes les sessions
+@st.cache_resource
+def obtenir_gestionnaire_travaux():
+    """Crée le gestionnaire de travaux d'arrière-plan (une seule instance par processus)"""
+    return GestionnaireTravaux()
+
+
+def obtenir_travail_session(nom):
+    """Retrouve le travail suivi par la session (clé gardée dans session_state entre les reruns)"""
+    cle = st.session_state.get(nom)
+    if cle is None:
+        return None
+    travail = obtenir_gestionnaire_travaux().obtenir(cle)
+    if travail is None:
+        del st.session_state[nom]
+    return travail
+
+
+def suivre_travaux(travaux, zones_file):
+    """Suit plusieurs travaux à la fois : produit (nom, morceau) dès qu'un travail avance
+
+    travaux : {nom: Travail}. Sans nouveau morceau, produit (None, None) à chaque
+    lecture (l'appelant peut rafraîchir l'affichage, ce qui permet à Streamlit
+    d'interrompre le script lors d'un rerun) et affiche la position dans la file
+    OpenAI toutes les BATTEMENT_AFFICHAGE secondes.
+    """
+    positions = dict.fromkeys(travaux, 0)
+    dernier_battement = time.perf_counter()
+    while True:
+        en_cours = False
+        recus = False
+        for nom, travail in travaux.items():
+            morceaux, termine = travail.nouveaux(positions[nom])
+            positions[nom] += len(morceaux)
+            en_cours = en_cours or not termine
+            for morceau in morceaux:
+                recus = True
+                yield nom, morceau
+        if not en_cours:
+            return
+        if recus:
+            continue
+
+        if time.perf_counter() - dernier_battement >= BATTEMENT_AFFICHAGE:
+            dernier_battement = time.perf_counter()
+            position = position_en_file(st.session_state['session_id'])
+            for zone_file in zones_file:
+                if position is None:
+                    zone_file.empty()
+                else:
+                    zone_file.caption(f"⏳ En file d'attente OpenAI : position {position + 1}")
+        yield None, None
+        time.sleep(INTERVALLE_SUIVI)
+
+
+def cle_travail(action, video_id, texte, *params):
+    """Identifie un travail par vidéo, action, contenu de la transcription et paramètres"""
+    return (action, video_id, hash(texte), *params)
+
+
+def lancer_analyse(video_id, texte, api_key, max_tokens, ignorer_cache, nb_tokens, transcription, session,
+                   mode_longue, latence_cible):
+    """Lance (ou retrouve) l'analyse en arrière-plan ; le travail produit des morceaux de texte"""
+    def produire():
+        response_stream, erreur = analyser_transcription(
+            texte, api_key, max_tokens, ignorer_cache, nb_tokens, transcription, session,
+            mode_longue=mode_longue, latence_cible=latence_cible
         )
+        if erreur:
+            raise RuntimeError(erreur)
+        for chunk in response_stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
-        return response, None
+    cle = cle_travail("analyse", video_id, texte, max_tokens, ignorer_cache, mode_longue, latence_cible)
+    # Cache ignoré : un travail déjà terminé n'est pas rejoué, seul celui en cours est repris
+    return obtenir_gestionnaire_travaux().soumettre(cle, produire, reutiliser_termine=not ignorer_cache)
 
-    except Exception as e:
-        return None, f"Erreur lors de l'analyse : {str(e)}"
 
+def lancer_nettoyage(video_id, texte, api_key, max_workers, ignorer_cache, session, mode_nettoyage,
+                     latence_cible):
+    """Lance (ou retrouve) le nettoyage en arrière-plan ; le travail produit des (index, total, texte)"""
+    def produire():
+        morceaux, erreur = nettoyer_transcription(
+            texte, api_key, max_workers, ignorer_cache, session, mode_nettoyage=mode_nettoyage,
+            latence_cible=latence_cible
+        )
+        if erreur:
+            raise RuntimeError(erreur)
+        with chronometre("nettoyer_transcription"):
+            yield from morceaux
 
-# Fonction pour nettoyer la transcription
-def nettoyer_transcription(texte, api_key):
-    """Nettoie la transcription sans modifier le contenu"""
-    try:
-        client = OpenAI(api_key=api_key)
+    cle = cle_travail("nettoyage", video_id, texte, max_workers, ignorer_cache, mode_nettoyage, latence_cible)
+    # Cache ignoré : un travail déjà terminé n'est pas rejoué, seul celui en cours est repris
+    return obtenir_gestionnaire_travaux().soumettre(cle, produire, reutiliser_termine=not ignorer_cache)
 
-        prompt = f"""Nettoie cette transcription YouTube sans modifier le contenu(
-         Ne modifie PAS le contenu, ne résume PAS, ne traduis pas, enlève juste les détails qui ne font pas partie du texte)
 
-, Voici la transcription :
-{texte}"""
+def aller_a_occurrence(transcription, pages, nouvelle_recherche=False):
+    """Place la visionneuse sur la page de l'occurrence choisie (la première après une nouvelle recherche)"""
+    if nouvelle_recherche:
+        st.session_state.pop('occurrence_transcription', None)
+    occurrences = rechercher_occurrences(
+        transcription, pages, st.session_state.get('recherche_transcription', '')
+    )
+    if not occurrences:
+        return
+    choix = st.session_state.get('occurrence_transcription') or 0
+    st.session_state['page_transcription'] = occurrences[min(choix, len(occurrences) - 1)]['page'] + 1
+
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system",
-                 "content": "Tu es un assistant qui nettoie et formate des transcriptions sans en modifier le contenu."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=4000,
-            stream=True
+def afficher_visionneuse(transcription, video_id):
+    """Affiche la transcription page par page, avec recherche et horodatage optionnel"""
+    pages = decouper_pages(transcription)
+    if st.session_state.get('page_transcription', 1) > len(pages):
+        st.session_state['page_transcription'] = 1
+
+    col_recherche, col_page, col_horodatage = st.columns([3, 1, 1])
+    with col_recherche:
+        recherche = st.text_input(
+            "🔍 Rechercher dans la transcription",
+            key="recherche_transcription",
+            on_change=aller_a_occurrence,
+            args=(transcription, pages, True)
+        )
+    with col_page:
+        page = st.number_input(
+            f"Page (sur {len(pages)})", min_value=1, max_value=len(pages), step=1, key="page_transcription"
         )
+    with col_horodatage:
+        horodatage = st.checkbox("🕒 Horodatage", value=True, key="horodatage_transcription")
 
-        return response, None
+    if recherche:
+        occurrences = rechercher_occurrences(transcription, pages, recherche)
+        if not occurrences:
+            st.caption("Aucune occurrence.")
+        else:
+            st.selectbox(
+                f"{len(occurrences)}{'+' if len(occurrences) >= MAX_OCCURRENCES else ''} occurrence(s)",
+                options=range(len(occurrences)),
+                format_func=lambda i: (
+                    f"[{formater_temps(occurrences[i]['temps'])}] p. {occurrences[i]['page'] + 1} "
+                    f"· …{occurrences[i]['extrait']}…"
+                ),
+                key="occurrence_transcription",
+                on_change=aller_a_occurrence,
+                args=(transcription, pages)
+            )
 
-    except Exception as e:
-        return None, f"Erreur lors du nettoyage : {str(e)}"
+    debut, fin = bornes_page(transcription, pages, page - 1)
+    temps_debut = transcription.temps_a_la_position(debut)
+    st.caption(
+        f"{formater_temps(temps_debut)} → {formater_temps(transcription.temps_a_la_position(max(debut, fin - 1)))}"
+        f" · [▶️ Voir ce passage](https://www.youtube.com/watch?v={video_id}&t={int(temps_debut)}s)"
+    )
+    st.code(texte_page(transcription, pages, page - 1, horodatage), language=None, wrap_lines=True)
+
+    # Copie intégrale par téléchargement, depuis l'unique copie gardée en session
+    st.download_button(
+        label="📥 Télécharger la transcription complète",
+        data=transcription.texte,
+        file_name=f"transcription_{video_id}.txt",
+        mime="text/plain",
+        key="download_transcription"
+    )
 
 
 # Interface Streamlit
@@ -146,6 +289,13 @@ except:
 with st.sidebar:
     st.header("⚙️ Paramètres")
 
+    # Choix du mode : une vidéo ou un lot de vidéos
+    mode = st.radio(
+        "Mode",
+        ["🎬 Vidéo unique", "📚 Analyse par lot", "🔎 Recherche"],
+        key="mode_selector"
+    )
+
     # Toggle mode sombre/clair
     st.markdown("### 🎨 Apparence")
     theme = st.radio(
@@ -260,6 +410,181 @@ with st.sidebar:
         help="Plus de tokens = réponse plus détaillée (mais plus lent et coûteux)"
     )
 
+    # Transcriptions trop longues pour un seul appel
+    mode_longue = {
+        "Extraits représentatifs (1 appel)": MODE_EXTRACTIF,
+        "Résumés par parties (map-reduce)": MODE_MAP_REDUCE,
+    }[st.radio(
+        "Transcriptions longues",
+        ["Extraits représentatifs (1 appel)", "Résumés par parties (map-reduce)"],
+        help="Au-delà d'environ 12 000 tokens : les phrases les plus informatives de toute la vidéo "
+             "en un seul appel, ou un résumé par partie puis une synthèse (plus complet, plus lent et plus cher)"
+    )]
+
+    # Le modèle renvoie la liste des corrections (appliquées localement) ou réécrit tout le texte
+    mode_nettoyage = {
+        "Corrections appliquées localement": MODE_EDITIONS,
+        "Réécriture complète": MODE_REECRITURE,
+    }[st.radio(
+        "Nettoyage par l'IA",
+        ["Corrections appliquées localement", "Réécriture complète"],
+        help="Corrections : le modèle ne renvoie que les suppressions, remplacements et ponctuations, "
+             "vérifiés avant d'être appliqués (bien plus rapide et moins cher). "
+             "Réécriture : le modèle recopie toute la transcription nettoyée"
+    )]
+
+    # Latence visée : parmi les règles de routage de la tâche, la première qui la tient
+    latence_cible = st.number_input(
+        "Latence visée (secondes)",
+        min_value=0,
+        max_value=120,
+        value=0,
+        step=5,
+        help="0 = pas de contrainte. N'a d'effet que si la table de routage (ROUTES_MODELES) "
+             "propose plusieurs modèles pour l'analyse ou le nettoyage"
+    ) or None
+
+    # Nombre de requêtes simultanées pour le nettoyage
+    max_workers_nettoyage = st.slider(
+        "Requêtes de nettoyage en parallèle",
+        min_value=1,
+        max_value=8,
+        value=MAX_WORKERS_NETTOYAGE,
+        help="Plus de requêtes simultanées = nettoyage plus rapide (mais plus de risque de limite de débit)"
+    )
+
+    # Langues de transcription par ordre de préférence
+    langues = lire_langues(st.text_input(
+        "Langues préférées",
+        value=", ".join(LANGUES_PRIORITAIRES),
+        help="Codes de langue par ordre de préférence (pistes manuelles, puis automatiques, puis traductions)"
+    ))
+
+    # Nettoyage local (annotations, répétitions, mots de remplissage) sans appel à l'IA
+    pre_nettoyage_actif = st.checkbox(
+        "Pré-nettoyage local de la transcription",
+        value=True,
+        help="Retire [Musique], les répétitions des sous-titres automatiques et les « euh » avant tout appel à l'IA"
+    )
+
+    # Lancer l'analyse et le nettoyage dès que la transcription est récupérée
+    speculation_active = st.checkbox(
+        "Préparer l'analyse et le nettoyage en avance",
+        value=False,
+        help="Démarre les deux traitements en arrière-plan dès la récupération : les boutons affichent ensuite le résultat presque instantanément (mais chaque vidéo est facturée même sans clic)"
+    )
+
+    # Estimation du coût et de la durée (remplie une fois la transcription chargée)
+    zone_estimation = st.empty()
+
+    # Forcer un nouvel appel à l'IA même si la réponse est déjà en cache
+    ignorer_cache = st.checkbox(
+        "Ignorer le cache des réponses IA",
+        value=False,
+        help="Relance l'IA au lieu de réutiliser une réponse identique déjà obtenue"
+    )
+
+    st.markdown("---")
+
+    # Statistiques des caches
+    st.markdown("### 🗄️ Caches")
+    stats_cache = obtenir_cache_transcriptions().statistiques()
+    st.caption(
+        f"Transcriptions : {stats_cache['entrees']} vidéos · "
+        f"{stats_cache['hits']} hits / {stats_cache['misses']} misses "
+        f"({stats_cache['taux_hit']:.0%})"
+    )
+    stats_reponses = obtenir_cache_reponses().statistiques()
+    st.caption(
+        f"Réponses IA : {stats_reponses['entrees']} réponses · "
+        f"{stats_reponses['hits']} hits / {stats_reponses['misses']} misses "
+        f"({stats_reponses['taux_hit']:.0%})"
+    )
+
+    # Diagnostics : latences et débits mesurés dans ce processus
+    with st.expander("🩺 Diagnostics", expanded=False):
+        registre = initialiser_metriques()
+
+        # Appels OpenAI par opération et par modèle
+        debits = LLM_DEBIT.series()
+        for cle, duree in sorted(LLM_DUREE.series().items()):
+            labels = dict(cle)
+            p50 = LLM_PREMIER_TOKEN.quantile(0.5, **labels)
+            p95 = LLM_PREMIER_TOKEN.quantile(0.95, **labels)
+            debit = debits.get(cle)
+            st.caption(
+                f"**{labels['operation']}** ({labels['modele']}) · {duree['nombre']} appels · "
+                f"durée moy. {duree['somme'] / duree['nombre']:.1f} s · "
+                f"1er token p50 ≤ {p50 if p50 is not None else '-'} s, p95 ≤ {p95 if p95 is not None else '-'} s"
+                + (f" · {debit['somme'] / debit['nombre']:.0f} tokens/s" if debit else "")
+            )
+
+        # Récupérations YouTube et taux de hit des caches
+        fetch = DUREE_ETAPES.series().get((("etape", "fetch_youtube"),))
+        if fetch:
+            st.caption(f"**YouTube** · {fetch['nombre']} récupérations · moy. {fetch['somme'] / fetch['nombre']:.2f} s")
+        # Routage : appels (servis, depuis le cache, passés au secours, en erreur),
+        # durée moyenne et coût estimé par route et modèle
+        appels = {}
+        for cle, nombre in ROUTE_APPELS.valeurs().items():
+            labels = dict(cle)
+            appels.setdefault((labels["route"], labels["modele"]), {})[labels["resultat"]] = nombre
+        couts = ROUTE_COUT.valeurs()
+        durees = ROUTE_DUREE.series()
+        for (route, modele), resultats in sorted(appels.items()):
+            cle = (("modele", modele), ("route", route))
+            duree = durees.get(cle)
+            st.caption(
+                f"**Route {route}** ({modele}) · {resultats.get('ok', 0)} appels · "
+                f"{resultats.get('cache', 0)} depuis le cache · {resultats.get('secours', 0)} passés au secours · "
+                f"{resultats.get('erreur', 0)} en erreur"
+                + (f" · moy. {duree['somme'] / duree['nombre']:.1f} s · ~{couts.get(cle, 0):.4f} $" if duree else "")
+            )
+
+        editions = EDITIONS_NETTOYAGE.valeurs()
+        if editions:
+            st.caption(
+                f"**Corrections** · {editions.get((('resultat', 'appliquee'),), 0)} appliquées · "
+                f"{editions.get((('resultat', 'rejetee'),), 0)} rejetées · "
+                f"{editions.get((('resultat', 'morceau_refuse'),), 0)} morceaux gardés tels quels"
+            )
+
+        coalescence = COALESCENCE.valeurs()
+        for type_requete in ("transcription", "llm"):
+            meneurs = coalescence.get((("role", "meneur"), ("type", type_requete)), 0)
+            abonnes = coalescence.get((("role", "abonne"), ("type", type_requete)), 0)
+            if abonnes:
+                st.caption(f"**Partage {type_requete}** · {abonnes} demandes servies par {meneurs} appels en cours")
+        stats_sessions = obtenir_magasin_sessions().statistiques()
+        st.caption(
+            f"**Sessions** · {stats_sessions['sessions']} en mémoire · "
+            f"{stats_sessions['octets_compresses'] / 1e6:.1f} Mo compressés "
+            f"({stats_sessions['octets_bruts'] / 1e6:.1f} Mo bruts) · "
+            f"cette session : {obtenir_magasin_sessions().octets_session(st.session_state['session_id']) / 1e3:.0f} Ko · "
+            f"{stats_sessions['evictions']} évincées"
+        )
+        evenements_cache = CACHE_EVENEMENTS.valeurs()
+        for nom_cache in ("transcriptions", "reponses_llm"):
+            hits = evenements_cache.get((("cache", nom_cache), ("resultat", "hit")), 0)
+            misses = evenements_cache.get((("cache", nom_cache), ("resultat", "miss")), 0)
+            if hits + misses:
+                st.caption(f"**Cache {nom_cache}** · {hits / (hits + misses):.0%} de hits ({hits + misses} accès)")
+
+        st.download_button(
+            "📥 Métriques (Prometheus)",
+            data=registre.exporter_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+            key="download_metriques_prometheus"
+        )
+        st.download_button(
+            "📥 Métriques (JSON lines)",
+            data=json.dumps(registre.instantane(), ensure_ascii=False) + "\n",
+            file_name="metriques.jsonl",
+            mime="application/json",
+            key="download_metriques_jsonl"
+        )
+
     st.markdown("---")
     st.header("ℹ️ À propos")
     st.markdown("""
@@ -278,6 +603,143 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("**Note :** La vidéo doit avoir des sous-titres disponibles.")
 
+# Mode recherche : retrouver une vidéo et un passage parmi toutes les transcriptions
+if mode == "🔎 Recherche":
+    st.markdown("### 🔎 Recherche dans les transcriptions")
+    stats_index = obtenir_index_recherche().statistiques()
+    st.caption(f"{stats_index['videos']} vidéos indexées · {stats_index['passages']} passages")
+
+    recherche = st.text_input("Mots recherchés :", placeholder="ex. transition énergétique")
+
+    if recherche:
+        debut_recherche = time.perf_counter()
+        resultats_recherche = obtenir_index_recherche().rechercher(recherche)
+        st.caption(f"{len(resultats_recherche)} vidéos trouvées en {(time.perf_counter() - debut_recherche) * 1000:.0f} ms")
+
+        for resultat in resultats_recherche:
+            url_video = f"https://www.youtube.com/watch?v={resultat['video_id']}"
+            st.markdown(f"#### [{resultat['video_id']}]({url_video})")
+            for passage in resultat["passages"]:
+                st.markdown(
+                    f"- [{formater_temps(passage['debut'])}]({url_video}&t={int(passage['debut'])}s) "
+                    f"{passage['extrait']}"
+                )
+
+    st.stop()
+
+# Mode lot : plusieurs vidéos, playlist ou fichier
+if mode == "📚 Analyse par lot":
+    st.markdown("### 📚 Analyse par lot")
+
+    urls_collees = st.text_area(
+        "URLs ou identifiants de vidéos (un par ligne) :",
+        height=150,
+        placeholder="https://www.youtube.com/watch?v=...\nhttps://youtu.be/..."
+    )
+    fichier_urls = st.file_uploader("Ou importer un fichier (.txt, .csv)", type=["txt", "csv"])
+    playlist = st.text_input(
+        "Ou une playlist :",
+        placeholder="https://www.youtube.com/playlist?list=..."
+    )
+
+    col_lot1, col_lot2 = st.columns(2)
+    with col_lot1:
+        max_workers_transcriptions = st.slider(
+            "Récupérations en parallèle", min_value=1, max_value=16, value=MAX_WORKERS_TRANSCRIPTIONS
+        )
+    with col_lot2:
+        max_workers_analyses = st.slider(
+            "Analyses IA en parallèle", min_value=1, max_value=8, value=MAX_WORKERS_ANALYSES
+        )
+
+    if st.button("🚀 Lancer l'analyse du lot", type="primary"):
+        entrees = lire_liste_urls(urls_collees)
+        if fichier_urls is not None:
+            entrees += lire_liste_urls(fichier_urls.getvalue().decode("utf-8", errors="replace"))
+
+        video_ids = []
+        for entree in entrees:
+            video_id = extraire_video_id(entree)
+            if video_id:
+                video_ids.append(video_id)
+            else:
+                st.warning(f"⚠️ Entrée ignorée (URL invalide) : {entree}")
+
+        if playlist:
+            playlist_id = extraire_playlist_id(playlist)
+            if not playlist_id:
+                st.error("❌ Identifiant de playlist invalide.")
+            else:
+                try:
+                    with st.spinner("📃 Lecture de la playlist..."):
+                        video_ids += lister_videos_playlist(playlist_id)
+                except Exception as e:
+                    st.error(f"❌ Erreur lors de la lecture de la playlist : {str(e)}")
+
+        video_ids = list(dict.fromkeys(video_ids))
+
+        if not video_ids:
+            st.warning("Veuillez fournir au moins une vidéo.")
+        else:
+            def recuperer_pour_lot(video_id):
+                transcription, erreur = obtenir_transcription(video_id, langues)
+                if erreur:
+                    return None, erreur
+                if pre_nettoyage_actif:
+                    transcription, _ = pre_nettoyer_segments(transcription)
+                return transcription.texte, None
+
+            # Les fonctions du lot tournent dans des threads sans accès à session_state
+            session_lot = st.session_state['session_id']
+
+            def analyser_pour_lot(texte):
+                response_stream, erreur = analyser_transcription(
+                    texte, api_key, max_tokens, ignorer_cache, session=session_lot, mode_longue=mode_longue,
+                    latence_cible=latence_cible
+                )
+                if erreur:
+                    return None, erreur
+                return lire_stream(response_stream), None
+
+            progression = st.progress(0.0, text=f"0 / {len(video_ids)} vidéos traitées")
+            suivi = st.empty()
+            resultats = []
+
+            for resultat in traiter_lot(
+                video_ids,
+                recuperer_pour_lot,
+                analyser_pour_lot,
+                max_workers_transcriptions,
+                max_workers_analyses
+            ):
+                resultats.append(resultat)
+                progression.progress(
+                    len(resultats) / len(video_ids),
+                    text=f"{len(resultats)} / {len(video_ids)} vidéos traitées"
+                )
+                suivi.dataframe(
+                    [{"Vidéo": r["video_id"],
+                      "Statut": "✅" if r["statut"] == "ok" else "❌",
+                      "Erreur": r["erreur"] or ""} for r in resultats],
+                    use_container_width=True
+                )
+
+            garder_session('archive_lot', creer_archive(resultats))
+            nb_erreurs = sum(1 for r in resultats if r["statut"] != "ok")
+            st.success(f"✅ Lot terminé : {len(resultats) - nb_erreurs} réussies, {nb_erreurs} en échec.")
+
+    archive_lot = lire_session('archive_lot')
+    if archive_lot:
+        st.download_button(
+            label="📥 Télécharger les résultats (ZIP)",
+            data=archive_lot,
+            file_name="analyses_youtube.zip",
+            mime="application/zip",
+            key="download_lot"
+        )
+
+    st.stop()
+
 # Champ pour l'URL
 url_youtube = st.text_input(
     "🔗 Entrez l'URL de la vidéo YouTube :",
@@ -297,35 +759,84 @@ if st.button("🚀 Récupérer la transcription", type="primary"):
         else:
             # Étape 1 : Récupération de la transcription
             with st.spinner("📝 Récupération de la transcription..."):
-                transcription, erreur = obtenir_transcription(video_id)
+                transcription, erreur = obtenir_transcription(video_id, langues)
 
             if erreur:
                 st.error(f"❌ {erreur}")
             else:
                 st.success("✅ Transcription récupérée avec succès !")
 
-                # Stocker la transcription dans session_state
-                st.session_state['transcription'] = transcription
+                if pre_nettoyage_actif:
+                    transcription, stats_pre_nettoyage = pre_nettoyer_segments(transcription)
+                    st.caption(
+                        f"🧽 Pré-nettoyage local : {stats_pre_nettoyage['caracteres_retires']:,} caractères "
+                        f"et {stats_pre_nettoyage['tokens_retires']:,} tokens retirés"
+                    )
+
+                # Garder la transcription (texte et segments horodatés), compressée
+                garder_session('segments', json.dumps(transcription.vers_dict()))
                 st.session_state['video_id'] = video_id
 
+                # Ne plus suivre les travaux lancés pour la vidéo précédente
+                st.session_state.pop('travail_analyse', None)
+                st.session_state.pop('travail_nettoyage', None)
+
+                # Visionneuse : revenir à la première page, sans recherche
+                st.session_state.pop('page_transcription', None)
+                st.session_state.pop('recherche_transcription', None)
+                st.session_state.pop('occurrence_transcription', None)
+
+                # Compter les tokens une seule fois par vidéo
+                st.session_state['nb_tokens'] = compter_tokens(transcription.texte, MODELE_ANALYSE)
+
+                # Mode spéculatif : démarrer les deux traitements sans attendre les clics
+                if speculation_active:
+                    lancer_analyse(
+                        video_id, transcription.texte, api_key, max_tokens, ignorer_cache,
+                        st.session_state['nb_tokens'], transcription, st.session_state['session_id'],
+                        mode_longue, latence_cible
+                    )
+                    lancer_nettoyage(
+                        video_id, transcription.texte, api_key, max_workers_nettoyage, ignorer_cache,
+                        st.session_state['session_id'], mode_nettoyage, latence_cible
+                    )
+
+# Transcription de la session, décompressée pour ce rerun
+transcription = transcription_session()
+
+# Session évincée pour libérer de la mémoire : recharger depuis le cache disque
+if transcription is None and st.session_state['video_id']:
+    transcription, erreur = obtenir_transcription(st.session_state['video_id'], langues)
+    if erreur:
+        st.session_state['video_id'] = None
+    else:
+        if pre_nettoyage_actif:
+            transcription, _ = pre_nettoyer_segments(transcription)
+        garder_session('segments', json.dumps(transcription.vers_dict()))
+        st.session_state.pop('nb_tokens', None)
+
 # Si une transcription existe, afficher la vidéo et les options
-if st.session_state['transcription']:
+if transcription is not None:
+    # Estimation avant de cliquer sur les actions
+    nb_tokens = st.session_state.get('nb_tokens')
+    if nb_tokens is None:
+        nb_tokens = compter_tokens(transcription.texte, MODELE_ANALYSE)
+        st.session_state['nb_tokens'] = nb_tokens
+    cout_analyse, duree_analyse = estimer_analyse(nb_tokens, max_tokens, mode_longue=mode_longue, latence_cible=latence_cible)
+    cout_nettoyage, duree_nettoyage = estimer_nettoyage(nb_tokens, max_workers_nettoyage, mode_nettoyage)
+    zone_estimation.info(
+        f"📏 {nb_tokens:,} tokens\n\n"
+        f"💡 Analyse : ~{cout_analyse:.4f} $ · ~{duree_analyse:.0f} s\n\n"
+        f"🧹 Nettoyage : ~{cout_nettoyage:.4f} $ · ~{duree_nettoyage:.0f} s"
+    )
+
     # Afficher la vidéo
     if st.session_state['video_id']:
         st.video(f"https://www.youtube.com/watch?v={st.session_state['video_id']}")
 
-    # Afficher la transcription dans un expander
+    # Afficher la transcription page par page : seule la page visible est envoyée au navigateur
     with st.expander("📄 Voir la transcription brute", expanded=False):
-        st.text_area(
-            "Transcription",
-            st.session_state['transcription'],
-            height=300,
-            disabled=True,
-            key="raw_transcript"
-        )
-
-        # Bouton copier
-        st.code(st.session_state['transcription'], language=None)
+        afficher_visionneuse(transcription, st.session_state['video_id'])
 
     st.markdown("---")
 
@@ -336,29 +847,119 @@ if st.session_state['transcription']:
     with col1:
         # Bouton pour nettoyer la transcription
         if st.button("🧹 Nettoyer la transcription", use_container_width=True, key="btn_clean"):
-            with st.spinner("🤖 Nettoyage en cours..."):
-                response_stream, erreur_nettoyage = nettoyer_transcription(
-                    st.session_state['transcription'],
-                    api_key
-                )
+            # Se rattache au nettoyage déjà lancé en avance s'il existe
+            travail_nettoyage = lancer_nettoyage(
+                st.session_state['video_id'],
+                transcription.texte,
+                api_key,
+                max_workers_nettoyage,
+                ignorer_cache,
+                st.session_state['session_id'],
+                mode_nettoyage,
+                latence_cible
+            )
+            st.session_state['travail_nettoyage'] = travail_nettoyage.cle
+
+        # Nettoyage en cours : réaffiché à chaque rerun jusqu'à la fin du travail
+        travail_nettoyage = obtenir_travail_session('travail_nettoyage')
+        if travail_nettoyage is not None:
+            # Chaque morceau est affiché à sa place dès qu'il est nettoyé
+            st.markdown("## 🧹 Transcription Nettoyée")
+            etat_nettoyage = st.empty()
+            etat_nettoyage.caption("🤖 Nettoyage en cours...")
+            progression_nettoyage = st.empty()
+            zone_file_nettoyage = st.empty()
+            transcription_nettoyee_container = st.container()
 
-            if erreur_nettoyage:
-                st.error(f"❌ {erreur_nettoyage}")
+    with col2:
+        # Bouton pour analyser
+        if st.button("💡 Extraire les idées essentielles", use_container_width=True, key="btn_analyze"):
+            # Se rattache à l'analyse déjà lancée en avance s'il existe
+            travail_analyse = lancer_analyse(
+                st.session_state['video_id'],
+                transcription.texte,
+                api_key,
+                max_tokens,
+                ignorer_cache,
+                st.session_state['nb_tokens'],
+                transcription,
+                st.session_state['session_id'],
+                mode_longue,
+                latence_cible
+            )
+            st.session_state['travail_analyse'] = travail_analyse.cle
+
+        # Analyse en cours : réaffichée à chaque rerun jusqu'à la fin du travail
+        travail_analyse = obtenir_travail_session('travail_analyse')
+        if travail_analyse is not None:
+            # Afficher l'analyse avec streaming
+            st.markdown("## 💡 Idées Essentielles")
+            etat_analyse = st.empty()
+            etat_analyse.caption("🤖 Analyse en cours avec l'IA...")
+            zone_file_analyse = st.empty()
+            analyse_container = st.empty()
+
+    # Les deux travaux sont suivis dans la même boucle : l'analyse s'affiche pendant
+    # que le nettoyage avance, et inversement
+    travaux_suivis = {}
+    zones_file = []
+    morceaux_containers = []
+    morceaux_nettoyes = []
+    if travail_nettoyage is not None:
+        travaux_suivis["nettoyage"] = travail_nettoyage
+        zones_file.append(zone_file_nettoyage)
+    if travail_analyse is not None:
+        travaux_suivis["analyse"] = travail_analyse
+        zones_file.append(zone_file_analyse)
+
+    def recevoir_nettoyage(resultat):
+        index, total, morceau = resultat
+        if not morceaux_containers:
+            morceaux_containers[:] = [transcription_nettoyee_container.empty() for _ in range(total)]
+            morceaux_nettoyes[:] = [""] * total
+        morceaux_nettoyes[index] = morceau
+        morceaux_containers[index].markdown(morceau)
+        progression_nettoyage.caption(
+            f"{sum(1 for m in morceaux_nettoyes if m)} / {len(morceaux_nettoyes)} morceaux nettoyés"
+        )
+
+    def flux_travaux(suivi):
+        """Chunks de l'analyse (None aux battements) pour afficher_stream ; les morceaux du
+        nettoyage sont affichés au passage
+        """
+        for nom, morceau in suivi:
+            if nom == "nettoyage":
+                recevoir_nettoyage(morceau)
+            elif nom == "analyse":
+                yield chunk_texte(morceau)
             else:
-                st.success("✅ Transcription nettoyée !")
+                yield None
 
-                # Afficher avec streaming
-                st.markdown("## 🧹 Transcription Nettoyée")
-                transcription_nettoyee_container = st.empty()
-                transcription_nettoyee = ""
+    if travaux_suivis:
+        suivi = suivre_travaux(travaux_suivis, zones_file)
+        if travail_analyse is not None:
+            analyse_complete, stats_stream = afficher_stream(flux_travaux(suivi), analyse_container)
+        else:
+            for _ in flux_travaux(suivi):
+                pass
 
-                for chunk in response_stream:
-                    if chunk.choices[0].delta.content:
-                        transcription_nettoyee += chunk.choices[0].delta.content
-                        transcription_nettoyee_container.markdown(transcription_nettoyee)
+    with col1:
+        if travail_nettoyage is not None:
+            etat_nettoyage.empty()
+            zone_file_nettoyage.empty()
+            del st.session_state['travail_nettoyage']
 
-                # Stocker dans session state
-                st.session_state['transcription_nettoyee'] = transcription_nettoyee
+            # Un morceau en échec (ou manquant) : pas de transcription nettoyée incomplète
+            if travail_nettoyage.erreur:
+                st.error(f"❌ Erreur lors du nettoyage : {travail_nettoyage.erreur}")
+            elif morceaux_nettoyes and not all(morceaux_nettoyes):
+                st.error("❌ Nettoyage incomplet : certains morceaux n'ont pas été nettoyés.")
+            elif morceaux_nettoyes:
+                transcription_nettoyee = "\n\n".join(morceaux_nettoyes)
+                st.success("✅ Transcription nettoyée !")
+
+                # Garder pour les reruns suivants, compressée
+                garder_session('transcription_nettoyee', transcription_nettoyee)
 
                 # Bouton de téléchargement
                 st.download_button(
@@ -370,32 +971,24 @@ if st.session_state['transcription']:
                 )
 
     with col2:
-        # Bouton pour analyser
-        if st.button("💡 Extraire les idées essentielles", use_container_width=True, key="btn_analyze"):
-            with st.spinner("🤖 Analyse en cours avec l'IA..."):
-                response_stream, erreur_analyse = analyser_transcription(
-                    st.session_state['transcription'],
-                    api_key,
-                    max_tokens
-                )
+        if travail_analyse is not None:
+            etat_analyse.empty()
+            zone_file_analyse.empty()
+            del st.session_state['travail_analyse']
 
-            if erreur_analyse:
-                st.error(f"❌ {erreur_analyse}")
+            RENDU_STREAM.observer(stats_stream['duree'], page="analyse")
+
+            if travail_analyse.erreur:
+                st.error(f"❌ {travail_analyse.erreur}")
             else:
                 st.success("✅ Analyse terminée !")
+                st.caption(
+                    f"⏱️ {stats_stream['duree']:.1f} s · "
+                    f"premier token après {stats_stream['temps_premier_token'] or 0:.2f} s"
+                )
 
-                # Afficher l'analyse avec streaming
-                st.markdown("## 💡 Idées Essentielles")
-                analyse_container = st.empty()
-                analyse_complete = ""
-
-                for chunk in response_stream:
-                    if chunk.choices[0].delta.content:
-                        analyse_complete += chunk.choices[0].delta.content
-                        analyse_container.markdown(analyse_complete)
-
-                # Stocker dans session state
-                st.session_state['analyse'] = analyse_complete
+                # Garder pour les reruns suivants, compressée
+                garder_session('analyse', analyse_complete)
 
                 # Bouton de téléchargement
                 st.download_button(
@@ -407,23 +1000,25 @@ if st.session_state['transcription']:
                 )
 
     # Afficher les résultats précédents s'ils existent
-    if 'transcription_nettoyee' in st.session_state and st.session_state['transcription_nettoyee']:
+    derniere_transcription_nettoyee = lire_session('transcription_nettoyee')
+    if derniere_transcription_nettoyee:
         with st.expander("📋 Dernière transcription nettoyée", expanded=False):
-            st.markdown(st.session_state['transcription_nettoyee'])
+            st.markdown(derniere_transcription_nettoyee)
             st.download_button(
                 label="📥 Télécharger",
-                data=st.session_state['transcription_nettoyee'],
+                data=derniere_transcription_nettoyee,
                 file_name="transcription_nettoyee.txt",
                 mime="text/plain",
                 key="download_clean_prev"
             )
 
-    if 'analyse' in st.session_state and st.session_state['analyse']:
+    derniere_analyse = lire_session('analyse')
+    if derniere_analyse:
         with st.expander("📊 Dernière analyse", expanded=False):
-            st.markdown(st.session_state['analyse'])
+            st.markdown(derniere_analyse)
             st.download_button(
                 label="📥 Télécharger",
-                data=st.session_state['analyse'],
+                data=derniere_analyse,
                 file_name="analyse_youtube.txt",
                 mime="text/plain",
                 key="download_analyze_prev"
@@ -1,7 +1,7 @@
 # Test OpenAI - À exécuter pour vérifier la connexion
 
 import streamlit as st
-from openai import OpenAI
+from client_openai import obtenir_client
 
 st.title("Test de connexion OpenAI")
 
@@ -17,7 +17,7 @@ except:
 if st.button("Tester OpenAI"):
     try:
         st.info("Tentative de connexion...")
-        client = OpenAI(api_key=api_key)
+        client = obtenir_client(api_key)
 
         st.info("Client créé, envoi d'une requête test...")
         response = client.chat.completions.create(
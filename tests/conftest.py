@@ -0,0 +1,16 @@
+import os
+import sys
+
+# Les modules du projet sont à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmark.faux_services import FauxServeurOpenAI
+
+
+@pytest.fixture
+def serveur_openai():
+    """Faux serveur OpenAI local et rapide (pas de clé ni de réseau)"""
+    with FauxServeurOpenAI(premier_token=0.02, tokens_par_seconde=2000, tokens_reponse=20, duree_lot=0.1) as serveur:
+        yield serveur
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from cache_llm import ClientEnCache, cle_requete
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Bonjour"}], "max_tokens": 10}
+
+
+class CacheMemoire(dict):
+    def lire(self, cle):
+        return self.get(cle)
+
+    def ecrire(self, cle, valeur):
+        self[cle] = valeur
+
+
+class FauxClient:
+    def __init__(self, texte, fin):
+        self.texte = texte
+        self.fin = fin
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        if params.get("stream"):
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.texte), finish_reason=None)]),
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=self.fin)]),
+            ])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.texte), finish_reason=self.fin)])
+
+
+def appeler(texte, fin, stream):
+    cache = CacheMemoire()
+    client = ClientEnCache(FauxClient(texte, fin), cache)
+    response = client.chat.completions.create(**PARAMS, stream=stream)
+    if stream:
+        list(response)
+    return cache
+
+
+def test_reponse_complete_mise_en_cache():
+    for stream in (False, True):
+        assert appeler("Salut", "stop", stream) == {cle_requete(PARAMS): "Salut"}
+
+
+def test_reponse_tronquee_ou_vide_pas_en_cache():
+    for stream in (False, True):
+        assert appeler("Sal", "length", stream) == {}
+        assert appeler("", "stop", stream) == {}
+
+
+def test_hit_marque_depuis_cache():
+    cache = CacheMemoire({cle_requete(PARAMS): "Salut"})
+    response = ClientEnCache(FauxClient("autre", "stop"), cache).create(**PARAMS)
+    assert response.choices[0].message.content == "Salut"
+    assert response.depuis_cache
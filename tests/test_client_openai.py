@@ -0,0 +1,24 @@
+import email.utils
+import time
+from types import SimpleNamespace
+
+from client_openai import lire_retry_after
+
+
+def erreur_avec_entetes(**entetes):
+    return SimpleNamespace(response=SimpleNamespace(headers=entetes))
+
+
+def test_retry_after_en_secondes_et_millisecondes():
+    assert lire_retry_after(erreur_avec_entetes(**{"retry-after": "3"})) == 3.0
+    assert lire_retry_after(erreur_avec_entetes(**{"retry-after-ms": "250"})) == 0.25
+
+
+def test_retry_after_date_http():
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= lire_retry_after(erreur_avec_entetes(**{"retry-after": date})) <= 60
+
+
+def test_retry_after_illisible():
+    assert lire_retry_after(erreur_avec_entetes(**{"retry-after": "bientôt"})) is None
+    assert lire_retry_after(SimpleNamespace(response=None)) is None
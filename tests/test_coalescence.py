@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from client_openai import obtenir_client
+from coalescence import ClientCoalescent, UnSeulVol, requetes_en_vol
+
+MESSAGES = [{"role": "user", "content": "Quelles sont les idées principales ?"}]
+
+
+def appeler_ensemble(vol, nombre, fonction):
+    """nombre appels simultanés de la même clé ; fonction n'est libérée qu'une fois
+    les abonnés arrivés. Retourne (nombre d'exécutions, résultats ou exceptions)
+    """
+    arrives = threading.Barrier(nombre)
+    libere = threading.Event()
+    executions = []
+
+    def executer():
+        executions.append(1)
+        libere.wait(5)
+        return fonction()
+
+    def appeler():
+        arrives.wait(5)
+        return vol.executer("cle", executer)
+
+    with ThreadPoolExecutor(max_workers=nombre) as executor:
+        futures = [executor.submit(appeler) for _ in range(nombre)]
+        while vol.en_vol() == 0:
+            time.sleep(0.001)
+        # Les abonnés arrivent pendant que le meneur attend
+        time.sleep(0.1)
+        libere.set()
+        resultats = []
+        for future in futures:
+            try:
+                resultats.append(future.result(5))
+            except Exception as e:
+                resultats.append(e)
+    return len(executions), resultats
+
+
+def test_un_seul_vol_partage_le_resultat():
+    vol = UnSeulVol("test")
+    resultat = object()
+    executions, resultats = appeler_ensemble(vol, 5, lambda: resultat)
+    assert executions == 1
+    assert all(r is resultat for r in resultats)
+    assert vol.en_vol() == 0
+
+
+def test_un_seul_vol_partage_l_exception():
+    vol = UnSeulVol("test")
+
+    def echouer():
+        raise ValueError("transcription indisponible")
+
+    executions, resultats = appeler_ensemble(vol, 4, echouer)
+    assert executions == 1
+    assert all(isinstance(r, ValueError) for r in resultats)
+    assert vol.en_vol() == 0
+
+    # Une fois le vol terminé, un nouvel appel est exécuté de nouveau
+    assert vol.executer("cle", lambda: "ok") == "ok"
+
+
+def test_un_seul_vol_cles_differentes_independantes():
+    vol = UnSeulVol("test")
+    assert vol.executer("a", lambda: 1) == 1
+    assert vol.executer("b", lambda: 2) == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_client_coalescent_une_requete_pour_plusieurs_lecteurs(serveur_openai, stream):
+    client = ClientCoalescent(obtenir_client("cle-test", base_url=serveur_openai.base_url))
+    arrives = threading.Barrier(4)
+
+    def lire(_):
+        arrives.wait(5)
+        response = client.chat.completions.create(
+            model="gpt-4o-mini", messages=MESSAGES, max_tokens=50, stream=stream
+        )
+        if not stream:
+            return response.choices[0].message.content
+        return "".join(chunk.choices[0].delta.content or "" for chunk in response if chunk.choices)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        contenus = list(executor.map(lire, range(4)))
+
+    assert len(set(contenus)) == 1 and contenus[0]
+    assert serveur_openai.nb_requetes == 1
+    assert requetes_en_vol() == 0
+
+
+def test_client_coalescent_cle_distingue_les_requetes(serveur_openai):
+    # Même requête, mais l'une ignore le cache : elles ne doivent pas être partagées
+    clients = [
+        ClientCoalescent(obtenir_client("cle-test", base_url=serveur_openai.base_url),
+                         lambda params, ignorer=ignorer: (params["model"], ignorer))
+        for ignorer in (False, True)
+    ]
+    arrives = threading.Barrier(2)
+
+    def lire(client):
+        arrives.wait(5)
+        return client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES, max_tokens=50)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lire, clients))
+
+    assert serveur_openai.nb_requetes == 2
+    assert requetes_en_vol() == 0
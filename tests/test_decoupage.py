@@ -0,0 +1,26 @@
+import budget_tokens
+from decoupage import decouper_en_phrases, decouper_en_positions
+
+TEXTE = " ".join(f"Phrase numéro {numero} de la transcription." for numero in range(400))
+
+
+def test_taille_des_morceaux_suit_le_ratio_mesure():
+    # Un texte qui coûte deux fois plus de tokens donne des morceaux deux fois plus courts
+    longs = decouper_en_phrases(TEXTE, 200, caracteres_par_token=4)
+    courts = decouper_en_phrases(TEXTE, 200, caracteres_par_token=2)
+    assert all(len(morceau) <= 800 for morceau in longs)
+    assert all(len(morceau) <= 400 for morceau in courts)
+    assert len(courts) >= 2 * len(longs) - 1
+    assert " ".join(courts) == TEXTE
+
+
+def test_positions_avec_ratio_mesure():
+    positions = decouper_en_positions(TEXTE, 100, 10, caracteres_par_token=2.5)
+    assert all(fin - debut <= 250 for debut, fin in positions)
+    assert positions[0][0] == 0 and positions[-1][1] == len(TEXTE)
+
+
+def test_caracteres_par_token_mesure_sur_le_texte(monkeypatch):
+    monkeypatch.setattr(budget_tokens, "compter_tokens", lambda texte, modele="gpt-4o-mini": len(texte) // 3)
+    assert budget_tokens.caracteres_par_token("x" * 300) == 3
+    assert budget_tokens.caracteres_par_token("") == 4
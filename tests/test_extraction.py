@@ -0,0 +1,26 @@
+from budget_tokens import compter_tokens
+from decoupage import decouper_phrases
+from extraction import resume_extractif, selectionner_phrases
+
+TEXTE = " ".join(
+    f"Le volcan numéro {numero} se trouve en Islande près du glacier. Euh. Um, uh. "
+    f"Les géologues mesurent chaque année la température du magma {numero}."
+    for numero in range(200)
+)
+
+
+def test_hesitations_jamais_retenues():
+    assert resume_extractif("euh. um. uh. " * 1000, 10) == ""
+
+
+def test_phrases_sans_mot_porteur_ignorees():
+    phrases = decouper_phrases(TEXTE)
+    retenues = selectionner_phrases(TEXTE, phrases, 300)
+    assert retenues
+    assert all("volcan" in TEXTE[phrases[i][0]:phrases[i][1]] or "magma" in TEXTE[phrases[i][0]:phrases[i][1]]
+               for i in retenues)
+
+
+def test_budget_compte_comme_l_appel():
+    resume = resume_extractif(TEXTE, 500)
+    assert 0 < compter_tokens(resume) <= 500
@@ -0,0 +1,103 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import client_openai
+from client_openai import ClientAvecReprise, obtenir_client
+from limiteur_debit import ClientLimite, LimiteDebitDepassee, LimiteurDebit, LIMITES_MODELES, obtenir_limiteur
+
+MESSAGES = [{"role": "user", "content": "Bonjour, peux-tu résumer cette vidéo ?"}]
+
+
+def attendre_file(limiteur, taille):
+    limite = time.monotonic() + 5
+    while limiteur.taille_file() < taille:
+        assert time.monotonic() < limite
+        time.sleep(0.005)
+
+
+def test_file_equitable_entre_sessions():
+    # 10 requêtes par seconde, seau vide : les demandes sont servies une à une
+    limiteur = LimiteurDebit(600, 1_000_000)
+    limiteur.requetes.jetons = 0.0
+    servies = []
+
+    def demander(nom, session):
+        limiteur.acquerir(10, session)
+        servies.append(nom)
+
+    threads = []
+    for nom, session in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")]:
+        thread = threading.Thread(target=demander, args=(nom, session))
+        thread.start()
+        threads.append(thread)
+        attendre_file(limiteur, len(threads))
+    for thread in threads:
+        thread.join(5)
+
+    # La première demande de b passe avant la deuxième de a
+    assert servies == ["a1", "b1", "a2", "a3"]
+
+
+def test_remboursement_plafonne_a_la_capacite():
+    limiteur = LimiteurDebit(1000, 6000)
+    limiteur.acquerir(4000)
+    assert limiteur.tokens.jetons == pytest.approx(2000, abs=5)
+
+    limiteur.rembourser(1500)
+    assert limiteur.tokens.jetons == pytest.approx(3500, abs=5)
+    limiteur.rembourser(10_000)
+    assert limiteur.tokens.jetons == 6000
+    limiteur.rembourser(-100)
+    assert limiteur.tokens.jetons == 6000
+
+
+def test_limite_depassee_apres_attente_max():
+    limiteur = LimiteurDebit(60, 1_000_000, attente_max=0.1)
+    limiteur.requetes.jetons = 0.0
+    debut = time.monotonic()
+    with pytest.raises(LimiteDebitDepassee):
+        limiteur.acquerir(10, "session")
+    assert 0.1 <= time.monotonic() - debut < 1.0
+    assert limiteur.taille_file() == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_client_limite_rembourse_les_tokens_non_consommes(serveur_openai, monkeypatch, stream):
+    # 100 tokens par seconde : la recharge pendant l'appel reste négligeable
+    modele = f"modele-rembourse-{stream}"
+    monkeypatch.setitem(LIMITES_MODELES, modele, (500, 6000))
+    client = ClientLimite(obtenir_client("cle-test", base_url=serveur_openai.base_url).client, "session")
+
+    response = client.chat.completions.create(model=modele, messages=MESSAGES, max_tokens=2000, stream=stream)
+    if stream:
+        list(response)
+
+    # Sans remboursement, les 2000 tokens réservés pour la réponse resteraient décomptés
+    assert obtenir_limiteur(modele).tokens.jetons > 5500
+
+
+def test_chaque_reprise_passe_par_le_limiteur(monkeypatch):
+    modele = "modele-reprises"
+    monkeypatch.setitem(LIMITES_MODELES, modele, (600, 1_000_000))
+    monkeypatch.setattr(client_openai, "calculer_delai", lambda tentative, retry_after=None: 0)
+    reponse_429 = httpx.Response(429, request=httpx.Request("POST", "http://localhost/v1/chat/completions"))
+    tentatives = []
+
+    def create(**params):
+        tentatives.append(obtenir_limiteur(modele).requetes.jetons)
+        if len(tentatives) < 3:
+            raise openai.RateLimitError("limite", response=reponse_429, body=None)
+        return SimpleNamespace(usage=None)
+
+    brut = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    client = ClientAvecReprise(ClientLimite(brut, "session"))
+    client.chat.completions.create(model=modele, messages=MESSAGES, max_tokens=10)
+
+    # Une requête du seau consommée par tentative
+    assert len(tentatives) == 3
+    assert tentatives[0] - tentatives[2] == pytest.approx(2, abs=0.1)
@@ -0,0 +1,124 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from nettoyage_editions import EditionsInexploitables, appliquer_edition, lire_editions, nettoyer_par_editions
+from nettoyage_parallele import nettoyer_chunk_avec_repli
+
+
+def appliquer(phrase, edition):
+    phrases = [phrase]
+    paragraphes = set()
+    return appliquer_edition(phrases, paragraphes, edition), phrases[0], paragraphes
+
+
+def test_supprimer_ne_coupe_pas_les_mots():
+    appliquee, phrase, _ = appliquer("un humain um apprend", {"op": "supprimer", "p": 0, "texte": "um"})
+    assert appliquee
+    assert phrase.split() == ["un", "humain", "apprend"]
+
+
+def test_supprimer_passage_introuvable_en_mot_entier():
+    appliquee, phrase, _ = appliquer("un humain apprend", {"op": "supprimer", "p": 0, "texte": "um"})
+    assert not appliquee
+    assert phrase == "un humain apprend"
+
+
+def test_ponctuer_ne_coupe_pas_les_mots():
+    appliquee, phrase, _ = appliquer("les langues vivantes", {"op": "ponctuer", "p": 0, "apres": "lang", "signe": "."})
+    assert not appliquee
+    assert phrase == "les langues vivantes"
+
+
+def test_ponctuer_apres_un_mot_entier():
+    appliquee, phrase, _ = appliquer("les langues vivantes", {"op": "ponctuer", "p": 0, "apres": "langues", "signe": ","})
+    assert appliquee
+    assert phrase == "les langues, vivantes"
+
+
+def test_ponctuer_sans_doubler():
+    appliquee, _, _ = appliquer("fin. suite", {"op": "ponctuer", "p": 0, "apres": "fin", "signe": "."})
+    assert not appliquee
+
+
+def test_remplacement_qui_reformule_rejete():
+    appliquee, phrase, _ = appliquer(
+        "dans le débat public", {"op": "remplacer", "p": 0, "texte": "débat public", "par": "la politique nationale"}
+    )
+    assert not appliquee
+    assert phrase == "dans le débat public"
+
+
+def test_editions_invalides_rejetees():
+    for edition in (
+        "supprimer",
+        {"op": "supprimer", "p": 3, "texte": "un"},
+        {"op": "supprimer", "p": "0", "texte": "un"},
+        {"op": "inventer", "p": 0, "texte": "un"},
+        {"op": "ponctuer", "p": 0, "apres": "un", "signe": "#"},
+        {"op": "supprimer", "p": 0, "texte": "  "},
+    ):
+        assert not appliquer("un humain", edition)[0]
+
+
+def test_paragraphe():
+    appliquee, _, paragraphes = appliquer("un humain", {"op": "paragraphe", "p": 0})
+    assert appliquee
+    assert paragraphes == {0}
+
+
+def test_nettoyer_par_editions():
+    texte = ("alors euh aujourd'hui on va parler de de l'économie c'est important. "
+             "Ensuite la transition energetique est un sujet qui revient souvent. voila merci")
+    editions = [
+        {"op": "supprimer", "p": 0, "texte": "euh"},
+        {"op": "supprimer", "p": 0, "texte": "de"},
+        {"op": "ponctuer", "p": 0, "apres": "l'économie", "signe": ","},
+        {"op": "remplacer", "p": 0, "texte": "alors", "par": "Alors"},
+        {"op": "remplacer", "p": 1, "texte": "energetique", "par": "énergétique"},
+        {"op": "paragraphe", "p": 2},
+        {"op": "remplacer", "p": 2, "texte": "voila", "par": "Voilà"},
+    ]
+    assert nettoyer_par_editions(texte, json.dumps({"editions": editions})) == (
+        "Alors aujourd'hui on va parler de l'économie, c'est important. "
+        "Ensuite la transition énergétique est un sujet qui revient souvent.\n\nVoilà merci"
+    )
+
+
+def test_json_invalide_signale():
+    texte = "un humain um apprend. la suite"
+    for contenu in ("pas du json", '{"editions": ', '{"autre": []}', '["editions"]', "", None):
+        with pytest.raises(EditionsInexploitables):
+            nettoyer_par_editions(texte, contenu)
+
+
+def test_aucune_edition_garde_le_morceau():
+    texte = "un humain apprend. la suite"
+    assert nettoyer_par_editions(texte, '{"editions": []}') == texte
+
+
+def test_lire_editions_dans_un_bloc_de_code():
+    assert lire_editions('```json\n{"editions": [{"op": "paragraphe", "p": 1}]}\n```') == [{"op": "paragraphe", "p": 1}]
+
+
+def test_morceau_trop_modifie_signale():
+    texte = "un deux trois quatre cinq six sept huit neuf dix"
+    editions = [{"op": "supprimer", "p": 0, "texte": mot} for mot in ("un", "deux", "trois", "quatre")]
+    with pytest.raises(EditionsInexploitables):
+        nettoyer_par_editions(texte, json.dumps({"editions": editions}))
+
+
+def test_repli_en_reecriture_si_reponse_inexploitable():
+    reponses = iter(["pas du json", "Un humain apprend."])
+    appels = []
+
+    def create(**params):
+        appels.append(params)
+        message = SimpleNamespace(content=next(reponses))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    assert nettoyer_chunk_avec_repli(client, "un humain um apprend.") == "Un humain apprend."
+    # Corrections puis réécriture complète du même morceau
+    assert "response_format" in appels[0] and "response_format" not in appels[1]
@@ -0,0 +1,61 @@
+import json
+
+from segments import TranscriptionIndexee, formater_temps
+
+SEGMENTS = [(0.0, 2.0, "Bonjour à tous"), (2.5, 3.0, "  "), (5.0, 1.5, " aujourd'hui\n"), (7.0, 4.0, "les volcans")]
+
+
+def test_segments_vides_ignores_et_positions():
+    transcription = TranscriptionIndexee.depuis_segments(SEGMENTS)
+    assert transcription.texte == "Bonjour à tous aujourd'hui les volcans"
+    assert list(transcription.positions) == [0, 15, 27]
+    assert list(transcription.segments()) == [
+        (0.0, 2.0, "Bonjour à tous"), (5.0, 1.5, "aujourd'hui"), (7.0, 4.0, "les volcans")
+    ]
+
+
+def test_aller_retour_dict():
+    transcription = TranscriptionIndexee.depuis_segments(SEGMENTS)
+    copie = TranscriptionIndexee.depuis_dict(json.loads(json.dumps(transcription.vers_dict())))
+    assert copie.texte == transcription.texte
+    assert copie.debuts == transcription.debuts
+    assert copie.durees == transcription.durees
+    assert copie.positions == transcription.positions
+
+
+def test_ancienne_entree_sans_segments():
+    transcription = TranscriptionIndexee.depuis_dict({"texte": "texte seul"})
+    assert len(transcription) == 1
+    assert transcription.temps_a_la_position(5) == 0.0
+
+
+def test_recherche_par_temps():
+    transcription = TranscriptionIndexee.depuis_segments(SEGMENTS)
+    assert transcription.index_au_temps(-1) == 0
+    assert transcription.index_au_temps(4.99) == 0
+    assert transcription.index_au_temps(5.0) == 1
+    assert transcription.index_au_temps(100) == 2
+    assert transcription.position_au_temps(6.0) == 15
+    assert transcription.texte_entre(5.0, 6.0) == "aujourd'hui"
+    assert transcription.texte_entre(0.0, 100) == transcription.texte
+
+
+def test_recherche_par_position():
+    transcription = TranscriptionIndexee.depuis_segments(SEGMENTS)
+    assert transcription.index_a_la_position(0) == 0
+    assert transcription.index_a_la_position(14) == 0  # espace de séparation
+    assert transcription.index_a_la_position(15) == 1
+    assert transcription.temps_a_la_position(len(transcription.texte) - 1) == 7.0
+
+
+def test_transcription_vide():
+    transcription = TranscriptionIndexee.depuis_segments([])
+    assert transcription.texte == ""
+    assert transcription.temps_a_la_position(3) == 0.0
+    assert transcription.position_au_temps(3) == 0
+    assert transcription.texte_entre(0, 10) == ""
+
+
+def test_formater_temps():
+    assert formater_temps(65) == "01:05"
+    assert formater_temps(3725.9) == "1:02:05"
@@ -0,0 +1,36 @@
+import os
+import zlib
+
+import stockage_session
+from stockage_session import MagasinSessions
+
+
+def test_lire_apres_liberation_ne_ressuscite_pas_l_entree(monkeypatch):
+    magasin = MagasinSessions()
+    magasin.deposer("s1", "transcription", "texte de la vidéo")
+    decompresser = zlib.decompress
+
+    def decompresser_puis_liberer(donnees):
+        # Une autre session retire la valeur pendant la décompression, hors du verrou
+        magasin.retirer("s1", "transcription")
+        return decompresser(donnees)
+
+    monkeypatch.setattr(stockage_session.zlib, "decompress", decompresser_puis_liberer)
+    assert magasin.lire("s1", "transcription") == "texte de la vidéo"
+    assert magasin.statistiques()["entrees"] == 0
+    assert magasin.octets_decompresses == 0
+
+
+def test_copies_decompressees_comptees_dans_le_budget():
+    valeurs = [os.urandom(1000) for _ in range(3)]
+    magasin = MagasinSessions(budget=3 * len(zlib.compress(valeurs[0])) + 1500)
+    for numero, valeur in enumerate(valeurs):
+        magasin.deposer(f"s{numero}", "audio", valeur)
+
+    for numero, valeur in enumerate(valeurs):
+        assert magasin.lire(f"s{numero}", "audio") == valeur
+
+    # Une seule copie décompressée tient dans le budget restant : les sessions sont gardées
+    assert magasin.statistiques()["sessions"] == 3
+    assert magasin.octets_decompresses == 1000
+    assert magasin.octets + magasin.octets_decompresses <= magasin.budget
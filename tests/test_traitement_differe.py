@@ -0,0 +1,113 @@
+import json
+
+from client_openai import obtenir_client
+from nettoyage_parallele import MODE_EDITIONS, MODE_REECRITURE, decouper_nettoyage
+from traitement_differe import (
+    creer_custom_id, ecrire_fichiers_lot, executer_lots, lire_custom_id, regrouper_par_video
+)
+
+
+def requetes(nombre, taille=10):
+    return [
+        (creer_custom_id("video", "nettoyage", index), {"model": "gpt-4o-mini", "messages": [
+            {"role": "user", "content": "x" * taille}
+        ]})
+        for index in range(nombre)
+    ]
+
+
+def lignes(contenu):
+    return [json.loads(ligne) for ligne in contenu.decode("utf-8").splitlines()]
+
+
+def test_custom_id_aller_retour():
+    assert lire_custom_id(creer_custom_id("abc_DEF-123", "analyse")) == ("abc_DEF-123", "analyse", 0)
+
+
+def test_fichiers_lot_decoupes_par_nombre_de_requetes():
+    fichiers = list(ecrire_fichiers_lot(requetes(7), max_requetes=3))
+    assert [len(custom_ids) for custom_ids, _ in fichiers] == [3, 3, 1]
+    for custom_ids, contenu in fichiers:
+        assert [ligne["custom_id"] for ligne in lignes(contenu)] == custom_ids
+        assert all(ligne["url"] == "/v1/chat/completions" for ligne in lignes(contenu))
+
+
+def test_fichiers_lot_decoupes_par_taille():
+    taille_ligne = len(next(ecrire_fichiers_lot(requetes(1, 100)))[1])
+    fichiers = list(ecrire_fichiers_lot(requetes(5, 100), max_octets=2 * taille_ligne))
+    assert [len(custom_ids) for custom_ids, _ in fichiers] == [2, 2, 1]
+    assert all(len(contenu) <= 2 * taille_ligne for _, contenu in fichiers)
+
+    # Une requête plus grosse que la limite part seule dans son fichier
+    assert [len(ids) for ids, _ in ecrire_fichiers_lot(requetes(2, 100), max_octets=10)] == [1, 1]
+    assert list(ecrire_fichiers_lot([])) == []
+
+
+def test_regrouper_remet_les_morceaux_dans_l_ordre():
+    resultats = {
+        "v1|nettoyage|2": ("trois", None, "stop"),
+        "v1|analyse|0": ("analyse v1", None, "stop"),
+        "v1|nettoyage|0": ("un", None, "stop"),
+        "v1|nettoyage|1": ("deux", None, "stop"),
+        "inconnue|analyse|0": ("ignorée", None, "stop"),
+    }
+    videos = regrouper_par_video({"v1": "texte"}, resultats, MODE_REECRITURE)
+    assert videos == {"v1": {
+        "analyse": "analyse v1", "transcription_nettoyee": "un\n\ndeux\n\ntrois",
+        "erreur": None, "erreur_nettoyage": None,
+    }}
+
+
+def test_regrouper_separe_les_erreurs_d_analyse_et_de_nettoyage():
+    resultats = {
+        "v1|analyse|0": ("analyse v1", None, "stop"),
+        "v1|nettoyage|0": ("un", None, "stop"),
+        "v1|nettoyage|1": (None, "Erreur 500 : surcharge", None),
+        "v2|analyse|0": (None, "Lot expiré", None),
+        "v2|nettoyage|0": ("seul", None, "stop"),
+    }
+    videos = regrouper_par_video({"v1": "a", "v2": "b"}, resultats, MODE_REECRITURE)
+
+    # Un morceau en échec invalide le nettoyage, pas l'analyse
+    assert videos["v1"]["analyse"] == "analyse v1"
+    assert videos["v1"]["erreur"] is None
+    assert videos["v1"]["erreur_nettoyage"] == "Erreur 500 : surcharge"
+    assert videos["v1"]["transcription_nettoyee"] is None
+
+    assert videos["v2"]["erreur"] == "Lot expiré"
+    assert videos["v2"]["erreur_nettoyage"] is None
+    assert videos["v2"]["transcription_nettoyee"] == "seul"
+
+
+def test_regrouper_applique_les_editions():
+    texte = "Bonjour à tous. Euh on commence. Les volcans sont actifs."
+    assert len(decouper_nettoyage(texte)) == 1
+    editions = json.dumps({"editions": [
+        {"op": "supprimer", "p": 1, "texte": "Euh"},
+        {"op": "paragraphe", "p": 2},
+    ]})
+    videos = regrouper_par_video({"v1": texte}, {"v1|nettoyage|0": (editions, None, "stop")}, MODE_EDITIONS)
+    assert videos["v1"]["transcription_nettoyee"] == "Bonjour à tous. on commence.\n\nLes volcans sont actifs."
+
+
+def test_regrouper_signale_les_editions_inexploitables():
+    texte = "Bonjour à tous. Euh on commence. Les volcans sont actifs."
+    resultats = {
+        "v1|analyse|0": ("analyse v1", None, "stop"),
+        "v1|nettoyage|0": ("pas du json", None, "stop"),
+    }
+    videos = regrouper_par_video({"v1": texte}, resultats, MODE_EDITIONS)
+
+    # Le morceau brut n'est jamais présenté comme nettoyé
+    assert videos["v1"]["transcription_nettoyee"] is None
+    assert videos["v1"]["erreur_nettoyage"].startswith("Morceau non nettoyé")
+    assert videos["v1"]["analyse"] == "analyse v1"
+
+
+def test_executer_lots_hors_ligne(serveur_openai):
+    client = obtenir_client("cle-test", base_url=serveur_openai.base_url).client
+    resultats = executer_lots(client, requetes(3, 200), intervalle=0.05)
+
+    assert set(resultats) == {creer_custom_id("video", "nettoyage", index) for index in range(3)}
+    for contenu, erreur, fin in resultats.values():
+        assert contenu and erreur is None and fin == "stop"
@@ -0,0 +1,40 @@
+import time
+
+from traitement_lot import traiter_lot
+
+
+def recuperer(video_id):
+    time.sleep(0.05)
+    return f"texte {video_id}", None
+
+
+def test_lot_complet_dans_l_ordre_de_fin():
+    resultats = list(traiter_lot(["a", "b", "c"], recuperer, lambda texte: (texte[::-1], None), 2, 2))
+    assert sorted(r["video_id"] for r in resultats) == ["a", "b", "c"]
+    assert all(r["statut"] == "ok" and r["analyse"] == f"texte {r['video_id']}"[::-1] for r in resultats)
+
+
+def test_erreur_de_recuperation_signalee():
+    resultats = list(traiter_lot(["a"], lambda video_id: (None, "indisponible"), lambda texte: (texte, None)))
+    assert resultats == [{
+        "video_id": "a", "statut": "erreur", "etape": "transcription", "erreur": "indisponible",
+        "transcription": None, "analyse": None,
+    }]
+
+
+def test_lot_abandonne_n_attend_pas_les_videos_restantes():
+    analyses = []
+
+    def analyser(texte):
+        analyses.append(texte)
+        return texte, None
+
+    lot = traiter_lot([f"v{i}" for i in range(40)], recuperer, analyser, 1, 1)
+    next(lot)
+    debut = time.perf_counter()
+    lot.close()
+
+    # Les récupérations en file sont annulées : seule celle en cours se termine
+    assert time.perf_counter() - debut < 0.5
+    time.sleep(0.2)
+    assert len(analyses) < 5
@@ -0,0 +1,68 @@
+import threading
+
+from travaux import GestionnaireTravaux
+
+
+def test_travail_termine_reutilise_par_defaut():
+    gestionnaire = GestionnaireTravaux(max_workers=2)
+    premier = gestionnaire.soumettre("cle", lambda: iter(["a"]))
+    assert premier.attendre(5)
+    assert gestionnaire.soumettre("cle", lambda: iter(["b"])) is premier
+
+
+def test_travail_termine_relance_sans_reutilisation():
+    gestionnaire = GestionnaireTravaux(max_workers=2)
+    premier = gestionnaire.soumettre("cle", lambda: iter(["a"]))
+    assert premier.attendre(5)
+
+    second = gestionnaire.soumettre("cle", lambda: iter(["b"]), reutiliser_termine=False)
+    assert second is not premier
+    assert second.attendre(5)
+    assert second.morceaux == ["b"]
+
+
+def test_travail_en_cours_toujours_repris():
+    gestionnaire = GestionnaireTravaux(max_workers=2)
+    libere = threading.Event()
+
+    def produire():
+        libere.wait(5)
+        yield "a"
+
+    premier = gestionnaire.soumettre("cle", produire)
+    assert gestionnaire.soumettre("cle", produire, reutiliser_termine=False) is premier
+    libere.set()
+    assert premier.attendre(5)
+
+
+def test_travail_en_erreur_relance():
+    gestionnaire = GestionnaireTravaux(max_workers=2)
+
+    def echouer():
+        raise RuntimeError("panne")
+        yield
+
+    premier = gestionnaire.soumettre("cle", echouer)
+    assert premier.attendre(5)
+    assert premier.erreur == "panne"
+    assert gestionnaire.soumettre("cle", lambda: iter(["b"])) is not premier
+
+
+def test_nouveaux_sans_attendre():
+    libere = threading.Event()
+
+    def produire():
+        yield "a"
+        libere.wait(5)
+        yield "b"
+
+    gestionnaire = GestionnaireTravaux(max_workers=2)
+    travail = gestionnaire.soumettre("cle", produire)
+    while not travail.nouveaux()[0]:
+        pass
+    assert travail.nouveaux() == (["a"], False)
+    assert travail.nouveaux(1) == ([], False)
+
+    libere.set()
+    assert travail.attendre(5)
+    assert travail.nouveaux(1) == (["b"], True)
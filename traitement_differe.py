@@ -0,0 +1,232 @@
+"""Analyse et nettoyage en différé avec l'API Batch d'OpenAI
+
+Les requêtes sont les mêmes que celles du mode interactif (requete_analyse_*,
+requete_nettoyage), écrites dans des fichiers JSON lines, soumises en lots puis
+relues par custom_id et regroupées par vidéo. Pas de streaming : le résultat
+arrive sous 24 h, pour un coût réduit de moitié et sur un quota de débit séparé.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyse_longue import (
+    requete_analyse_directe, requete_analyse_extractive, BUDGET_ANALYSE_DIRECTE, MODELE_ANALYSE
+)
+from budget_tokens import compter_tokens
+from client_openai import est_a_reprendre, calculer_delai
+from metriques import LOT_REQUETES
+from nettoyage_editions import numeroter_phrases, requete_editions, nettoyer_par_editions, EditionsInexploitables
+from nettoyage_parallele import requete_nettoyage, decouper_nettoyage, MODE_EDITIONS
+from routage import parametres_route
+
+POINT_ACCES = "/v1/chat/completions"
+FENETRE_LOT = "24h"
+
+# Limites de l'API Batch par fichier d'entrée (50 000 requêtes, 200 Mo)
+MAX_REQUETES_PAR_LOT = 50000
+MAX_OCTETS_PAR_LOT = 190 * 1024 * 1024
+
+# Intervalle entre deux lectures de l'état d'un lot (secondes)
+INTERVALLE_SONDAGE = 30.0
+
+STATUTS_TERMINES = {"completed", "failed", "expired", "cancelled"}
+
+TACHE_ANALYSE = "analyse"
+TACHE_NETTOYAGE = "nettoyage"
+
+
+def creer_custom_id(video_id, tache, index=0):
+    """Identifiant d'une requête du lot : vidéo, tâche et numéro du morceau"""
+    return f"{video_id}|{tache}|{index}"
+
+
+def lire_custom_id(custom_id):
+    video_id, tache, index = custom_id.split("|")
+    return video_id, tache, int(index)
+
+
+def requetes_video(video_id, transcription, max_tokens=1500, nettoyage=False, mode_nettoyage=MODE_EDITIONS):
+    """(custom_id, paramètres) des requêtes d'une vidéo (TranscriptionIndexee) : analyse, puis
+    nettoyage par morceaux
+
+    Au-delà de BUDGET_ANALYSE_DIRECTE tokens, l'analyse porte sur les phrases les plus
+    informatives, horodatées comme en mode interactif (le map-reduce demanderait un
+    second lot). Le modèle est celui que la table de routage choisit en mode
+    interactif : les requêtes sont identiques et partagent le cache des réponses.
+    """
+    texte = transcription.texte
+    nb_tokens = compter_tokens(texte, MODELE_ANALYSE)
+    if nb_tokens > BUDGET_ANALYSE_DIRECTE:
+        params = requete_analyse_extractive(texte, max_tokens, transcription)
+    else:
+        params = requete_analyse_directe(texte, max_tokens, nb_tokens)
+    yield creer_custom_id(video_id, TACHE_ANALYSE), parametres_route(TACHE_ANALYSE, params)
+
+    if nettoyage:
+        for index, chunk in enumerate(decouper_nettoyage(texte)):
+            if mode_nettoyage == MODE_EDITIONS:
+                params = requete_editions(numeroter_phrases(chunk)[1])
+            else:
+                params = requete_nettoyage(chunk)
+            yield creer_custom_id(video_id, TACHE_NETTOYAGE, index), parametres_route(TACHE_NETTOYAGE, params)
+
+
+def ecrire_fichiers_lot(requetes, max_requetes=MAX_REQUETES_PAR_LOT, max_octets=MAX_OCTETS_PAR_LOT):
+    """(custom_ids, contenu JSON lines) des fichiers d'entrée, dans les limites de l'API Batch"""
+    custom_ids = []
+    lignes = []
+    taille = 0
+    for custom_id, params in requetes:
+        ligne = (json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": POINT_ACCES,
+            "body": params,
+        }, ensure_ascii=False) + "\n").encode("utf-8")
+
+        if lignes and (len(lignes) >= max_requetes or taille + len(ligne) > max_octets):
+            yield custom_ids, b"".join(lignes)
+            custom_ids = []
+            lignes = []
+            taille = 0
+        custom_ids.append(custom_id)
+        lignes.append(ligne)
+        taille += len(ligne)
+
+    if lignes:
+        yield custom_ids, b"".join(lignes)
+
+
+def soumettre_lot(client, contenu):
+    """Envoie un fichier d'entrée et crée le lot correspondant"""
+    fichier = client.files.create(file=("requetes.jsonl", contenu), purpose="batch")
+    return client.batches.create(
+        input_file_id=fichier.id,
+        endpoint=POINT_ACCES,
+        completion_window=FENETRE_LOT
+    )
+
+
+def attendre_lot(client, lot_id, intervalle=INTERVALLE_SONDAGE, suivi=None):
+    """Lit l'état du lot jusqu'à ce qu'il soit terminé ; suivi(lot) est appelé à chaque lecture"""
+    tentative = 0
+    while True:
+        try:
+            lot = client.batches.retrieve(lot_id)
+        except Exception as e:
+            # Une erreur réseau pendant l'attente ne doit pas faire perdre le lot
+            if not est_a_reprendre(e):
+                raise
+            time.sleep(calculer_delai(tentative))
+            tentative += 1
+            continue
+
+        tentative = 0
+        if suivi is not None:
+            suivi(lot)
+        if lot.status in STATUTS_TERMINES:
+            return lot
+        time.sleep(intervalle)
+
+
+def lire_resultats_lot(client, lot):
+    """{custom_id: (contenu, erreur, fin)} d'après les fichiers de sortie et d'erreurs du lot"""
+    resultats = {}
+    for fichier_id in (lot.output_file_id, lot.error_file_id):
+        if not fichier_id:
+            continue
+        for ligne in client.files.content(fichier_id).text.splitlines():
+            if not ligne.strip():
+                continue
+            donnees = json.loads(ligne)
+            resultats[donnees["custom_id"]] = lire_reponse(donnees)
+    return resultats
+
+
+def lire_reponse(donnees):
+    """(contenu, erreur, fin) d'une ligne du fichier de sortie ou d'erreurs
+
+    fin est le finish_reason de la réponse (None en cas d'erreur).
+    """
+    if donnees.get("error"):
+        return None, donnees["error"].get("message") or str(donnees["error"]), None
+
+    reponse = donnees.get("response") or {}
+    corps = reponse.get("body") or {}
+    if reponse.get("status_code") != 200:
+        erreur = corps.get("error") or {}
+        return None, f"Erreur {reponse.get('status_code')} : {erreur.get('message', 'réponse invalide')}", None
+    choix = corps["choices"][0]
+    return choix["message"]["content"] or "", None, choix.get("finish_reason")
+
+
+def executer_lots(client, requetes, intervalle=INTERVALLE_SONDAGE, suivi=None):
+    """Soumet toutes les requêtes (un ou plusieurs lots traités en même temps) et attend les résultats
+
+    Retourne {custom_id: (contenu, erreur, fin)} ; une requête absente des résultats
+    (lot expiré, annulé ou en échec) est en erreur.
+    """
+    lots = [
+        (custom_ids, soumettre_lot(client, contenu))
+        for custom_ids, contenu in ecrire_fichiers_lot(requetes)
+    ]
+
+    def terminer(lot):
+        lot = attendre_lot(client, lot.id, intervalle, suivi)
+        return lot, lire_resultats_lot(client, lot)
+
+    resultats = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(lots))) as executor:
+        termines = executor.map(terminer, [lot for _, lot in lots])
+        for (custom_ids, _), (lot, resultats_lot) in zip(lots, termines):
+            resultats.update(resultats_lot)
+            for custom_id in custom_ids:
+                if custom_id not in resultats:
+                    resultats[custom_id] = (None, f"Lot {lot.id} terminé sans résultat (état : {lot.status})", None)
+                _, tache, _ = lire_custom_id(custom_id)
+                LOT_REQUETES.inc(tache=tache, resultat="erreur" if resultats[custom_id][1] else "ok")
+    return resultats
+
+
+def regrouper_par_video(transcriptions, resultats, mode_nettoyage=MODE_EDITIONS):
+    """{video_id: {"analyse", "transcription_nettoyee", "erreur", "erreur_nettoyage"}} à partir
+    des résultats du lot
+
+    transcriptions : {video_id: texte}. erreur concerne l'analyse, erreur_nettoyage le
+    nettoyage. Les morceaux nettoyés sont remis dans l'ordre (en MODE_EDITIONS, après
+    application des corrections) ; un seul morceau en échec (ou dont les corrections
+    sont inexploitables) invalide le nettoyage de la vidéo, sans toucher à son analyse.
+    """
+    videos = {
+        video_id: {
+            "analyse": None, "transcription_nettoyee": None, "erreur": None, "erreur_nettoyage": None,
+            "morceaux": {}
+        }
+        for video_id in transcriptions
+    }
+    for custom_id, (contenu, erreur, _) in resultats.items():
+        video_id, tache, index = lire_custom_id(custom_id)
+        video = videos.get(video_id)
+        if video is None:
+            continue
+        if erreur:
+            champ = "erreur" if tache == TACHE_ANALYSE else "erreur_nettoyage"
+            video[champ] = video[champ] or erreur
+        elif tache == TACHE_ANALYSE:
+            video["analyse"] = contenu
+        else:
+            video["morceaux"][index] = contenu
+
+    for video_id, video in videos.items():
+        morceaux = video.pop("morceaux")
+        if not morceaux or video["erreur_nettoyage"]:
+            continue
+        if mode_nettoyage == MODE_EDITIONS:
+            chunks = decouper_nettoyage(transcriptions[video_id])
+            try:
+                morceaux = {index: nettoyer_par_editions(chunks[index], contenu) for index, contenu in morceaux.items()}
+            except EditionsInexploitables as e:
+                video["erreur_nettoyage"] = f"Morceau non nettoyé : {e}"
+                continue
+        video["transcription_nettoyee"] = "\n\n".join(morceaux[i] for i in sorted(morceaux))
+    return videos
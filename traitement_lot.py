@@ -0,0 +1,126 @@
+import io
+import json
+import re
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+MAX_WORKERS_TRANSCRIPTIONS = 4
+MAX_WORKERS_ANALYSES = 2
+
+# Identifiant de playlist (paramètre list= ou identifiant seul)
+PATTERN_PLAYLIST = re.compile(r'(?:list=)?((?:PL|UU|LL|FL|OL|RD)[0-9A-Za-z_-]{10,})')
+PATTERN_VIDEO_PLAYLIST = re.compile(r'"videoId":"([0-9A-Za-z_-]{11})"')
+
+
+def extraire_playlist_id(texte):
+    """Extrait l'identifiant d'une playlist depuis une URL ou un identifiant brut"""
+    match = PATTERN_PLAYLIST.search(texte.strip())
+    if match:
+        return match.group(1)
+    return None
+
+
+def lister_videos_playlist(playlist_id, timeout=15):
+    """Récupère les identifiants des vidéos d'une playlist depuis sa page publique
+
+    Seule la première page de la playlist est lue (environ 100 vidéos).
+    """
+    requete = urllib.request.Request(
+        f"https://www.youtube.com/playlist?list={playlist_id}",
+        headers={"Accept-Language": "fr,en;q=0.8", "User-Agent": "Mozilla/5.0"}
+    )
+    with urllib.request.urlopen(requete, timeout=timeout) as reponse:
+        html = reponse.read().decode("utf-8", errors="replace")
+
+    # Dédupliquer en conservant l'ordre de la playlist
+    return list(dict.fromkeys(PATTERN_VIDEO_PLAYLIST.findall(html)))
+
+
+def lire_liste_urls(texte):
+    """Découpe une liste collée ou un fichier (une URL par ligne, virgules acceptées)"""
+    return [ligne.strip() for ligne in re.split(r'[\n,;]+', texte) if ligne.strip()]
+
+
+def traiter_lot(video_ids, recuperer, analyser,
+                max_workers_transcriptions=MAX_WORKERS_TRANSCRIPTIONS,
+                max_workers_analyses=MAX_WORKERS_ANALYSES):
+    """Traite une liste de vidéos avec deux pools séparés (récupération et analyse IA)
+
+    recuperer(video_id) et analyser(texte) retournent (resultat, erreur).
+    Produit un dictionnaire par vidéo dès qu'elle est terminée, y compris en cas d'échec.
+    """
+    pool_transcriptions = ThreadPoolExecutor(max_workers=max_workers_transcriptions)
+    pool_analyses = ThreadPoolExecutor(max_workers=max_workers_analyses)
+    termine = False
+    try:
+        en_cours = {
+            pool_transcriptions.submit(recuperer, video_id): ("transcription", video_id)
+            for video_id in dict.fromkeys(video_ids)
+        }
+        transcriptions = {}
+
+        while en_cours:
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for future in termines:
+                etape, video_id = en_cours.pop(future)
+
+                try:
+                    resultat, erreur = future.result()
+                except Exception as e:
+                    resultat, erreur = None, str(e)
+
+                if erreur:
+                    yield {
+                        "video_id": video_id,
+                        "statut": "erreur",
+                        "etape": etape,
+                        "erreur": erreur,
+                        "transcription": transcriptions.pop(video_id, None),
+                        "analyse": None,
+                    }
+                elif etape == "transcription":
+                    # Transcription prête : passer la vidéo au pool d'analyse
+                    transcriptions[video_id] = resultat
+                    en_cours[pool_analyses.submit(analyser, resultat)] = ("analyse", video_id)
+                else:
+                    yield {
+                        "video_id": video_id,
+                        "statut": "ok",
+                        "etape": etape,
+                        "erreur": None,
+                        "transcription": transcriptions.pop(video_id),
+                        "analyse": resultat,
+                    }
+        termine = True
+    finally:
+        # Lot abandonné (rerun Streamlit, boucle interrompue) : les récupérations
+        # et analyses pas encore commencées sont annulées au lieu d'être attendues
+        pool_transcriptions.shutdown(wait=termine, cancel_futures=not termine)
+        pool_analyses.shutdown(wait=termine, cancel_futures=not termine)
+
+
+def creer_archive(resultats):
+    """Construit une archive ZIP avec un dossier par vidéo et un récapitulatif JSON"""
+    tampon = io.BytesIO()
+    with zipfile.ZipFile(tampon, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        recapitulatif = []
+        for resultat in resultats:
+            video_id = resultat["video_id"]
+            if resultat["transcription"]:
+                archive.writestr(f"{video_id}/transcription.txt", resultat["transcription"])
+            if resultat["analyse"]:
+                archive.writestr(f"{video_id}/analyse.md", resultat["analyse"])
+            recapitulatif.append({
+                "video_id": video_id,
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "statut": resultat["statut"],
+                "etape": resultat["etape"],
+                "erreur": resultat["erreur"],
+            })
+
+        archive.writestr(
+            "resultats.json",
+            json.dumps(recapitulatif, ensure_ascii=False, indent=2)
+        )
+    return tampon.getvalue()
@@ -0,0 +1,127 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Nombre de travaux exécutés simultanément en arrière-plan
+MAX_WORKERS_TRAVAUX = 8
+
+# Les travaux terminés restent disponibles un moment pour être rattachés
+TTL_TRAVAUX_TERMINES = 1800
+MAX_TRAVAUX = 200
+
+
+class Travail:
+    """Exécute une fonction génératrice dans un thread et garde tout ce qu'elle produit
+
+    Plusieurs lecteurs peuvent suivre le même travail, chacun depuis sa position.
+    """
+
+    def __init__(self, cle, fonction):
+        self.cle = cle
+        self.fonction = fonction
+        self.morceaux = []
+        self.termine = False
+        self.erreur = None
+        self.exception = None
+        self.cree = time.time()
+        self.fini = None
+        self._condition = threading.Condition()
+
+    def executer(self):
+        try:
+            for morceau in self.fonction():
+                with self._condition:
+                    self.morceaux.append(morceau)
+                    self._condition.notify_all()
+        except Exception as e:
+            self.erreur = str(e)
+            self.exception = e
+        finally:
+            with self._condition:
+                self.termine = True
+                self.fini = time.time()
+                self._condition.notify_all()
+
+    def lire(self, position=0, battement=None):
+        """Produit les morceaux à partir de position, en attendant les suivants jusqu'à la fin
+
+        Avec battement (en secondes), produit None après chaque attente sans nouveau
+        morceau : l'appelant peut alors rafraîchir l'affichage, ce qui permet à
+        Streamlit d'interrompre le script lors d'un rerun.
+        """
+        while True:
+            with self._condition:
+                if position >= len(self.morceaux) and not self.termine:
+                    self._condition.wait(battement)
+                nouveaux = self.morceaux[position:]
+                termine = self.termine
+
+            if not nouveaux and not termine:
+                if battement is not None:
+                    yield None
+                continue
+
+            for morceau in nouveaux:
+                yield morceau
+            position += len(nouveaux)
+
+            if termine and position >= len(self.morceaux):
+                return
+
+    def nouveaux(self, position=0):
+        """Morceaux produits depuis position, sans attendre, et indicateur de fin
+
+        Permet de suivre plusieurs travaux dans une même boucle.
+        """
+        with self._condition:
+            return self.morceaux[position:], self.termine
+
+    def attendre(self, timeout=None):
+        """Attend la fin du travail ; retourne True s'il est terminé"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.termine, timeout)
+
+
+class GestionnaireTravaux:
+    """Travaux d'arrière-plan du processus, identifiés par une clé (vidéo, action, paramètres)"""
+
+    def __init__(self, max_workers=MAX_WORKERS_TRAVAUX):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="travail")
+        self._travaux = {}
+        self._verrou = threading.Lock()
+
+    def soumettre(self, cle, fonction, reutiliser_termine=True):
+        """Lance un travail, ou retourne celui déjà en cours / terminé pour la même clé
+
+        reutiliser_termine=False : seul un travail encore en cours est repris, un
+        travail terminé est relancé (ex. quand le cache des réponses est ignoré).
+        """
+        with self._verrou:
+            self._nettoyer()
+            travail = self._travaux.get(cle)
+            if travail is not None and travail.erreur is None and (reutiliser_termine or not travail.termine):
+                return travail
+
+            travail = Travail(cle, fonction)
+            self._travaux[cle] = travail
+        self._executor.submit(travail.executer)
+        return travail
+
+    def obtenir(self, cle):
+        """Retourne le travail associé à la clé, ou None"""
+        with self._verrou:
+            return self._travaux.get(cle)
+
+    def _nettoyer(self):
+        """Oublie les travaux terminés trop anciens, puis les plus anciens au-delà de MAX_TRAVAUX"""
+        maintenant = time.time()
+        for cle, travail in list(self._travaux.items()):
+            if travail.termine and maintenant - travail.fini > TTL_TRAVAUX_TERMINES:
+                del self._travaux[cle]
+
+        termines = sorted(
+            (travail for travail in self._travaux.values() if travail.termine),
+            key=lambda travail: travail.fini
+        )
+        for travail in termines[:max(0, len(self._travaux) - MAX_TRAVAUX)]:
+            del self._travaux[travail.cle]
@@ -0,0 +1,85 @@
+import re
+from bisect import bisect_left, bisect_right
+
+from segments import formater_temps
+
+# Taille visée d'une page de la visionneuse (caractères)
+CARACTERES_PAR_PAGE = 6000
+
+# Nombre maximal d'occurrences proposées par la recherche
+MAX_OCCURRENCES = 100
+LONGUEUR_EXTRAIT = 60
+
+
+def decouper_pages(transcription, taille=CARACTERES_PAR_PAGE):
+    """Positions de début de chaque page, alignées sur les débuts de segments
+
+    Un segment plus long qu'une page (transcription sans horodatage) est coupé
+    sur une espace.
+    """
+    texte = transcription.texte
+    positions = transcription.positions
+    debuts = [0]
+    while debuts[-1] + taille < len(texte):
+        debut = debuts[-1]
+        # Premier segment qui commence après la taille visée
+        index = bisect_left(positions, debut + taille)
+        if index < len(positions) and positions[index] - debut <= 2 * taille:
+            suivant = positions[index]
+        else:
+            espace = texte.rfind(' ', debut + 1, debut + taille)
+            suivant = espace + 1 if espace > debut else debut + taille
+        debuts.append(suivant)
+    return debuts
+
+
+def bornes_page(transcription, pages, page):
+    """(début, fin) dans le texte de la page demandée"""
+    fin = pages[page + 1] if page + 1 < len(pages) else len(transcription.texte)
+    return pages[page], fin
+
+
+def page_a_la_position(pages, position):
+    """Index de la page qui contient le caractère à la position donnée"""
+    return max(0, bisect_right(pages, position) - 1)
+
+
+def texte_page(transcription, pages, page, horodatage=False):
+    """Texte de la page, avec l'horodatage de chaque segment en début de ligne si demandé"""
+    debut, fin = bornes_page(transcription, pages, page)
+    if not horodatage:
+        return transcription.texte[debut:fin].strip()
+
+    lignes = []
+    index = transcription.index_a_la_position(debut)
+    while index < len(transcription) and transcription.positions[index] < fin:
+        # Tranche du segment limitée à la page (segments coupés entre deux pages)
+        debut_segment = max(debut, transcription.positions[index])
+        fin_segment = transcription.positions[index + 1] if index + 1 < len(transcription) else len(transcription.texte)
+        morceau = transcription.texte[debut_segment:min(fin, fin_segment)].strip()
+        if morceau:
+            lignes.append(f"[{formater_temps(transcription.debuts[index])}] {morceau}")
+        index += 1
+    return "\n".join(lignes)
+
+
+def rechercher_occurrences(transcription, pages, recherche, max_occurrences=MAX_OCCURRENCES):
+    """Occurrences (sans casse) du texte recherché : position, page, instant et extrait"""
+    recherche = recherche.strip()
+    if not recherche:
+        return []
+
+    texte = transcription.texte
+    occurrences = []
+    for match in re.finditer(re.escape(recherche), texte, re.IGNORECASE):
+        position = match.start()
+        debut_extrait = max(0, position - LONGUEUR_EXTRAIT // 2)
+        occurrences.append({
+            "position": position,
+            "page": page_a_la_position(pages, position),
+            "temps": transcription.temps_a_la_position(position),
+            "extrait": texte[debut_extrait:position + len(recherche) + LONGUEUR_EXTRAIT // 2].strip(),
+        })
+        if len(occurrences) >= max_occurrences:
+            break
+    return occurrences